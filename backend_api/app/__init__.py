@@ -15,6 +15,28 @@ def create_app():
     # Database configuration
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///./backend.db"
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["FRONTEND_API_URL"] = "http://frontend_api:5000"  # Used in Docker
+    # Keep-alive connection pool and timeouts (seconds) for frontend calls
+    app.config["FRONTEND_POOL_SIZE"] = 10
+    app.config["FRONTEND_POOL_TIMEOUT"] = 1.0
+    app.config["FRONTEND_CONNECT_TIMEOUT"] = 3.0
+    app.config["FRONTEND_READ_TIMEOUT"] = 10.0
+    app.config["FRONTEND_SYNC_READ_TIMEOUT"] = 30.0
+    app.config["FRONTEND_RETRIES"] = 2
+    # Background workers, run by `flask run-workers` (or `python run.py`):
+    # delivery of queued catalogue changes to the frontend
+    app.config["OUTBOX_DISPATCHER_ENABLED"] = False
+    # kombu URL of the event bus (e.g. memory://, filesystem://, amqp://...);
+    # when unset, events travel over HTTP instead
+    app.config["EVENT_BUS_URL"] = None
+    app.config["EVENT_BUS_TRANSPORT_OPTIONS"] = {}
+    app.config["EVENT_BUS_PARTITIONS"] = 4
+    app.config["EVENT_BUS_BATCH_SIZE"] = 500
+    app.config["EVENT_BUS_PREFETCH"] = 20
+    # and applying loan events from the event bus
+    app.config["LOAN_CONSUMER_ENABLED"] = False
+    # Any of the above can be overridden with FLASK_<NAME> environment variables
+    app.config.from_prefixed_env()
 
     db.init_app(app)
     migrate.init_app(app, db)
@@ -23,4 +45,16 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_error_handler(LibraryError, handle_library_error)
 
+    from app.utils.stats import backfill_command
+    from app.workers.runner import run_workers_command
+
+    app.cli.add_command(backfill_command)
+    app.cli.add_command(run_workers_command)
+
+    from app.utils.bus import create_event_bus
+    from app.utils.frontend import create_frontend_client
+
+    app.extensions["frontend_client"] = create_frontend_client(app.config)
+    app.extensions["event_bus"] = create_event_bus(app.config)
+
     return app
@@ -11,7 +11,10 @@ class Book(db.Model):
     publisher = db.Column(db.String(100), nullable=False)
     category = db.Column(db.String(50), nullable=False, index=True)
     available = db.Column(db.Boolean, default=True, index=True)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    # The loan that currently has the book out, kept up to date by the loan
+    # sync so reports never have to search a book's loan history.
+    current_loan_id = db.Column(db.Integer, nullable=True, index=True)
     borrowed_records = db.relationship("BorrowedBook", backref="book", lazy=True)
 
 
@@ -23,9 +26,26 @@ class BorrowedBook(db.Model):
     )  # Add index
     user_email = db.Column(db.String(120), nullable=False, index=True)  # Add index
     borrow_date = db.Column(
-        db.DateTime, default=datetime.now(), index=True
+        db.DateTime, default=datetime.now, index=True
     )  # Add index
     return_date = db.Column(db.DateTime, nullable=False, index=True)  # Add index
+    returned_at = db.Column(db.DateTime, nullable=True)
+    # The frontend outbox epoch the loan was synced from and its id there;
+    # a rebuilt frontend numbers its loans from 1 again under a new epoch.
+    source = db.Column(db.String(32), nullable=False, default="", server_default="")
+    source_loan_id = db.Column(db.Integer, nullable=True)
+
+    # Walks loans that are still out by due date without touching history.
+    __table_args__ = (
+        db.UniqueConstraint(
+            "source", "source_loan_id", name="uq_borrowedbooks_source_loan"
+        ),
+        db.Index(
+            "ix_borrowedbooks_active_return_date",
+            "return_date",
+            sqlite_where=returned_at.is_(None),
+        ),
+    )
 
     def get_id(self):
         return self.id
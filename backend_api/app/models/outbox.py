@@ -0,0 +1,25 @@
+from app import db
+from datetime import datetime
+
+
+class SyncOutbox(db.Model):
+    """Catalogue changes waiting to be delivered to the frontend API.
+
+    Rows are written in the same transaction as the change they describe and
+    delivered in id order by the outbox dispatcher, so a committed change is
+    never lost and never overtakes an earlier one.
+    """
+
+    __tablename__ = "sync_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    dispatched_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_sync_outbox_pending", "id", sqlite_where=dispatched_at.is_(None)),
+    )
@@ -0,0 +1,20 @@
+from app import db
+
+
+class LoanStat(db.Model):
+    """Daily borrowing totals per category and publisher.
+
+    Kept up to date as loan events are applied: a borrow counts towards the
+    day it started, a return towards the day it ended, along with how long
+    the loan lasted. Reports read these rows instead of the loan history.
+    """
+
+    __tablename__ = "loan_stats"
+
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    publisher = db.Column(db.String(100), primary_key=True)
+    borrows = db.Column(db.Integer, default=0, nullable=False)
+    returns = db.Column(db.Integer, default=0, nullable=False)
+    # Summed over this row's returns; divide by ``returns`` for the average.
+    loan_seconds = db.Column(db.BigInteger, default=0, nullable=False)
@@ -0,0 +1,19 @@
+from app import db
+from datetime import datetime
+
+
+class SyncState(db.Model):
+    """Highest sequence number applied from each incoming event stream.
+
+    Producers number their events in commit order, so anything at or below
+    ``last_seq`` has already been applied and can be dropped; this is what
+    makes redelivered batches harmless.
+    """
+
+    __tablename__ = "sync_state"
+
+    stream = db.Column(db.String(50), primary_key=True)
+    last_seq = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
+    )
@@ -0,0 +1,18 @@
+from app import db
+
+
+class User(db.Model):
+    """The backend's copy of the users enrolled on the frontend.
+
+    Rows are only written by applying enrollment events from the frontend's
+    loan stream. Frontend user ids restart when the frontend is rebuilt, so
+    users are matched on ``email`` and numbered here.
+    """
+
+    __tablename__ = "users"
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    firstname = db.Column(db.String(80), nullable=False)
+    lastname = db.Column(db.String(80), nullable=False)
+    enrolled_at = db.Column(db.DateTime, nullable=False)
@@ -1,29 +1,57 @@
+from datetime import datetime
+
 import requests
 from flask import Blueprint, jsonify, request
 from app.utils.errors import LibraryError, ResourceNotFoundError, ValidationError
 from app import db
-from app.models.book import Book, BorrowedBook
+from app.models.book import Book
+from app.utils.digest import catalogue_digest
+from app.utils.frontend import get_frontend_client
+from app.utils.imports import import_books, import_format, read_import_rows
+from app.utils.loans import LOAN_STREAM, apply_loan_events
+from app.utils.outbox import (
+    enqueue_sync_event,
+    notify_outbox_dispatcher,
+    sync_events_after,
+)
+from app.utils.pagination import next_page_link, parse_limit
+from app.utils.reconcile import reconcile_catalogue
+from app.utils.snapshot import catalogue_snapshot
+from app.utils.stats import SECONDS_PER_DAY, loan_stats_query
+from app.utils.reports import (
+    after_cursor,
+    borrowed_books_query,
+    cursor_for,
+    iter_overdue_loans,
+    iter_unavailable_books,
+    iter_user_loans,
+    stream_watermark,
+    unavailable_books_page,
+    user_loans_page,
+    users_query,
+)
+from app.utils.streaming import (
+    STREAM_BATCH_SIZE,
+    stream_csv,
+    stream_gzip_ndjson,
+    stream_json_array,
+    stream_ndjson,
+    wants_stream,
+)
 
 admin_bp = Blueprint("admin_routes", __name__)
 
-FRONTEND_API_URL = "http://frontend_api:5000"  # Will be used in Docker
-
-
-def sync_with_frontend(action, data):
-    try:
-        response = requests.post(
-            f"{FRONTEND_API_URL}/sync/books", json={"action": action, "book": data}
-        )
-        response.raise_for_status()
-    except requests.exceptions.RequestException as exc:
-        raise LibraryError("sync failed", 500)
-
 
 @admin_bp.route("/", methods=["GET"])
 def index():
     return jsonify({"health": "healthy"})
 
 
+@admin_bp.route("/metrics/frontend-client", methods=["GET"])
+def frontend_client_metrics():
+    return jsonify(get_frontend_client().stats())
+
+
 @admin_bp.route("/books", methods=["POST"])
 def add_book():
     data = request.get_json()
@@ -40,24 +68,24 @@ def add_book():
     )
 
     db.session.add(book)
-    db.session.commit()
+    db.session.flush()
 
-    # Sync with frontend API
-    try:
-        # Make sync asynchronous
-        sync_with_frontend(
-            "add",
-            {
+    # The frontend learns about the book from the outbox, which commits
+    # together with the book itself.
+    enqueue_sync_event(
+        {
+            "action": "add",
+            "book": {
                 "id": book.id,
                 "title": book.title,
                 "author": book.author,
                 "publisher": book.publisher,
                 "category": book.category,
             },
-        )
-    except requests.exceptions.RequestException:
-        # Log the error but don't fail the request
-        pass
+        }
+    )
+    db.session.commit()
+    notify_outbox_dispatcher()
 
     return (
         jsonify(
@@ -76,6 +104,14 @@ def add_book():
     )
 
 
+@admin_bp.route("/books/import", methods=["POST"])
+def import_books_upload():
+    # The upload is read while the response streams back, so progress and
+    # row errors reach the client without the file ever being held whole.
+    rows = read_import_rows(request.stream, import_format(request))
+    return stream_ndjson(import_books(rows))
+
+
 @admin_bp.route("/books/<int:book_id>", methods=["DELETE"])
 def remove_book(book_id):
     book = db.session.get(Book, book_id)
@@ -83,72 +119,250 @@ def remove_book(book_id):
         raise ResourceNotFoundError("Book", book_id)
 
     db.session.delete(book)
+    enqueue_sync_event({"action": "delete", "book_id": book_id})
     db.session.commit()
+    notify_outbox_dispatcher()
+
+    return jsonify({"message": "Book removed successfully"})
 
-    # Sync with frontend API
+
+@admin_bp.route("/books/digest", methods=["GET"])
+def books_digest():
+    return jsonify(catalogue_digest(Book, request.args))
+
+
+@admin_bp.route("/books/snapshot", methods=["GET"])
+def books_snapshot():
+    seq, items = catalogue_snapshot()
+    return stream_gzip_ndjson(items, headers={"X-Snapshot-Seq": str(seq)})
+
+
+@admin_bp.route("/sync/books/events", methods=["GET"])
+def list_sync_events():
+    after = request.args.get("after", "0")
+    if not after.isdigit():
+        raise ValidationError("after must be a sequence number")
+    events = sync_events_after(int(after), parse_limit(request.args.get("limit")))
+    return jsonify(
+        {"events": events, "last_seq": events[-1]["seq"] if events else int(after)}
+    )
+
+
+@admin_bp.route("/sync/reconcile", methods=["POST"])
+def reconcile_with_frontend():
     try:
-        requests.post(
-            f"{FRONTEND_API_URL}/sync/books",
-            json={"action": "delete", "book_id": book_id},
-        )
+        summary = reconcile_catalogue()
     except requests.exceptions.RequestException:
-        pass
+        db.session.rollback()
+        raise LibraryError("Unable to reach the frontend", 502)
+    return jsonify({"message": "Reconcile complete", **summary})
 
-    return jsonify({"message": "Book removed successfully"})
+
+@admin_bp.route("/sync/loans", methods=["POST"])
+def sync_loans():
+    data = request.get_json()
+    if not data or not isinstance(data.get("events"), list):
+        raise ValidationError("Missing required field: events")
+
+    try:
+        summary = apply_loan_events(data["events"])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return jsonify({"message": "Sync successful", **summary})
+
+
+def serialize_user(row):
+    return {
+        "id": row.id,
+        "email": row.email,
+        "firstname": row.firstname,
+        "lastname": row.lastname,
+    }
 
 
 @admin_bp.route("/users", methods=["GET"])
 def list_users():
-    # Fetch users from frontend API
-    try:
-        response = requests.get(f"{FRONTEND_API_URL}/users")
-        return jsonify(response.json())
-    except requests.exceptions.RequestException:
-        raise LibraryError("Unable to fetch users")
+    statement, order = users_query(request.args)
+    # How far the local directory has caught up with the frontend.
+    last_seq, synced_at = stream_watermark(LOAN_STREAM)
+    headers = {"X-Synced-Seq": str(last_seq)}
+    if synced_at is not None:
+        headers["X-Synced-At"] = synced_at.isoformat()
+
+    if wants_stream(request.args):
+        rows = db.session.execute(
+            statement.execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        response = stream_json_array(rows, serialize_user)
+        response.headers.update(headers)
+        return response
+
+    limit = parse_limit(request.args.get("limit"))
+    after = request.args.get("after")
+    if after:
+        statement = after_cursor(statement, order, after)
+
+    rows = db.session.execute(statement.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = jsonify([serialize_user(row) for row in rows])
+    response.headers.update(headers)
+    if has_more:
+        cursor = cursor_for(rows[-1], order)
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = next_page_link(request.path, request.args, cursor)
+    return response
+
+
+@admin_bp.route("/users/loans", methods=["GET"])
+def list_user_loans():
+    if wants_stream(request.args):
+        return stream_json_array(iter_user_loans(STREAM_BATCH_SIZE), lambda user: user)
+
+    limit = parse_limit(request.args.get("limit"))
+    users, cursor = user_loans_page(request.args.get("after"), limit)
+
+    response = jsonify(users)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = next_page_link(request.path, request.args, cursor)
+    return response
+
+
+def serialize_loan(row):
+    return {
+        "book_id": row.book_id,
+        "book_title": row.title,
+        "category": row.category,
+        "user_email": row.user_email,
+        "borrow_date": row.borrow_date.isoformat(),
+        "return_date": row.return_date.isoformat(),
+    }
 
 
 @admin_bp.route("/borrowed-books", methods=["GET"])
 def list_borrowed_books():
-    try:
-        borrowed_books = BorrowedBook.query.all()
-        return jsonify(
-            [
-                {
-                    "book_id": record.book_id,
-                    "book_title": record.book.title,
-                    "user_email": record.user_email,
-                    "borrow_date": record.borrow_date.isoformat(),
-                    "return_date": record.return_date.isoformat(),
-                }
-                for record in borrowed_books
-            ]
+    statement, order = borrowed_books_query(request.args)
+    if wants_stream(request.args):
+        rows = db.session.execute(
+            statement.execution_options(yield_per=STREAM_BATCH_SIZE)
         )
-    except Exception as e:
-        raise LibraryError(f"Failed to fetch borrowed books: {str(e)}", 500)
+        return stream_json_array(rows, serialize_loan)
+
+    limit = parse_limit(request.args.get("limit"))
+    after = request.args.get("after")
+    if after:
+        statement = after_cursor(statement, order, after)
+
+    # One extra row tells us whether there is another page.
+    rows = db.session.execute(statement.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = jsonify([serialize_loan(row) for row in rows])
+    if has_more:
+        cursor = cursor_for(rows[-1], order)
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = next_page_link(request.path, request.args, cursor)
+    return response
+
+
+OVERDUE_FIELDS = (
+    "loan_id",
+    "book_id",
+    "book_title",
+    "category",
+    "user_email",
+    "borrow_date",
+    "return_date",
+    "days_overdue",
+)
+
+
+def serialize_overdue_loan(row, now):
+    return {
+        "loan_id": row.id,
+        **serialize_loan(row),
+        "days_overdue": (now - row.return_date).days,
+    }
+
+
+@admin_bp.route("/loans/overdue", methods=["GET"])
+def export_overdue_loans():
+    fmt = request.args.get("format", "csv")
+    if fmt not in ("csv", "ndjson"):
+        raise ValidationError("format must be csv or ndjson")
+
+    # One cut-off for the whole export, however long it takes to stream.
+    now = datetime.now()
+    rows = iter_overdue_loans(request.args, now)
+    headers = {
+        "X-Overdue-As-Of": now.isoformat(),
+        "Content-Disposition": (
+            f"attachment; filename=overdue-loans-{now.date().isoformat()}.{fmt}"
+        ),
+    }
+    if fmt == "csv":
+        return stream_csv(
+            rows,
+            OVERDUE_FIELDS,
+            lambda row: serialize_overdue_loan(row, now),
+            headers=headers,
+        )
+    return stream_ndjson(
+        (serialize_overdue_loan(row, now) for row in rows),
+        batch_size=STREAM_BATCH_SIZE,
+        headers=headers,
+    )
+
+
+def serialize_unavailable_book(row):
+    return {
+        "id": row.id,
+        "title": row.title,
+        "borrowed_by": row.user_email,
+        "available_date": row.return_date.isoformat() if row.return_date else None,
+    }
 
 
 @admin_bp.route("/unavailable-books", methods=["GET"])
 def list_unavailable_books():
-    try:
-        unavailable_books = Book.query.filter_by(available=False).all()
-        return jsonify(
-            [
-                {
-                    "id": book.id,
-                    "title": book.title,
-                    "borrowed_by": (
-                        book.borrowed_records[-1].user_email
-                        if book.borrowed_records
-                        else None
-                    ),
-                    "available_date": (
-                        book.borrowed_records[-1].return_date.isoformat()
-                        if book.borrowed_records
-                        else None
-                    ),
-                }
-                for book in unavailable_books
-            ]
+    sort = request.args.get("sort", "id")
+    if wants_stream(request.args):
+        return stream_json_array(
+            iter_unavailable_books(sort, STREAM_BATCH_SIZE),
+            serialize_unavailable_book,
         )
-    except Exception as e:
-        raise LibraryError(f"Failed to fetch unavailable books: {str(e)}", 500)
+
+    limit = parse_limit(request.args.get("limit"))
+    rows, cursor = unavailable_books_page(sort, request.args.get("after"), limit)
+
+    response = jsonify([serialize_unavailable_book(row) for row in rows])
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = next_page_link(request.path, request.args, cursor)
+    return response
+
+
+def serialize_loan_stat(row):
+    stat = {
+        key: value.isoformat() if key == "day" else value
+        for key, value in row._mapping.items()
+        if key != "loan_seconds"
+    }
+    stat["average_loan_days"] = (
+        round(row.loan_seconds / row.returns / SECONDS_PER_DAY, 2)
+        if row.returns
+        else None
+    )
+    return stat
+
+
+@admin_bp.route("/stats", methods=["GET"])
+def loan_stats():
+    rows = db.session.execute(loan_stats_query(request.args))
+    return jsonify([serialize_loan_stat(row) for row in rows])
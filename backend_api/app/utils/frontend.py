@@ -0,0 +1,52 @@
+from flask import current_app
+
+from app.utils.bus import get_event_bus
+from app.utils.http import ServiceClient
+
+
+def create_frontend_client(config):
+    return ServiceClient(
+        config["FRONTEND_API_URL"],
+        pool_size=config["FRONTEND_POOL_SIZE"],
+        pool_timeout=config["FRONTEND_POOL_TIMEOUT"],
+        timeout=(config["FRONTEND_CONNECT_TIMEOUT"], config["FRONTEND_READ_TIMEOUT"]),
+        retries=config["FRONTEND_RETRIES"],
+    )
+
+
+def get_frontend_client():
+    return current_app.extensions["frontend_client"]
+
+
+def sync_with_frontend(events):
+    """Deliver a batch of catalogue events to the frontend API.
+
+    Returns the frontend's per-event results. Network and HTTP failures are
+    raised as ``requests`` exceptions so the caller can retry.
+    """
+    client = get_frontend_client()
+    # Applying a large batch takes a while, so allow a longer read.
+    response = client.post(
+        "/sync/books",
+        json={"events": events},
+        timeout=(client.timeout[0], current_app.config["FRONTEND_SYNC_READ_TIMEOUT"]),
+    )
+    response.raise_for_status()
+    return response.json()["results"]
+
+
+def catalogue_event_key(event):
+    """Events about the same book share a partition, and so keep their order."""
+    if event.get("book_id") is not None:
+        return event["book_id"]
+    return (event.get("book") or {}).get("id")
+
+
+def publish_catalogue_events(events):
+    """Hand a batch of catalogue events to the event bus for the frontend.
+
+    The frontend's consumers apply them asynchronously, so there are no
+    per-event results to return.
+    """
+    get_event_bus().publish("catalogue", events, key=catalogue_event_key)
+    return []
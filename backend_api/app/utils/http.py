@@ -0,0 +1,205 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Gateway errors are worth retrying; the request most likely never reached
+# the application.
+RETRY_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling a service that has been failing."""
+
+
+class PoolExhaustedError(requests.exceptions.ConnectionError):
+    """Raised when no pooled connection frees up within ``pool_timeout``."""
+
+
+class CircuitBreaker:
+    """Stops calling a service after ``threshold`` consecutive failures.
+
+    Once open, calls fail fast until ``reset_timeout`` seconds have passed;
+    then a single trial call is let through and its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+
+class ServiceClient:
+    """Keep-alive HTTP client for calls to another service.
+
+    All calls share one ``requests.Session`` whose connection pool holds at
+    most ``pool_size`` connections; callers wait at most ``pool_timeout``
+    seconds for a free one. Every call gets connect/read timeouts, failed
+    connections and gateway errors are retried a bounded number of times, and
+    a circuit breaker stops a struggling service from tying up our workers.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        pool_size=10,
+        pool_timeout=1.0,
+        timeout=(3.0, 10.0),
+        retries=2,
+        backoff_factor=0.2,
+        breaker=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.requests = 0
+        self.failures = 0
+        self.pool_waits = 0
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+
+        # Failed connections are retried for any method and gateway errors
+        # only for GET, since a POST may already have been applied. Read
+        # timeouts are never retried: the service is slow, and asking again
+        # would only hold the worker longer.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=False,
+            status=retries,
+            other=0,
+            allowed_methods=frozenset({"GET"}),
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+    def request(self, method, path, timeout=None, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {self.base_url}")
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.pool_waits += 1
+            if not self._slots.acquire(timeout=self.pool_timeout):
+                # Running out of connections means the service is answering
+                # too slowly to keep up, which counts against it.
+                self._record(success=False)
+                raise PoolExhaustedError(f"No free connection to {self.base_url}")
+
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+        success = False
+        try:
+            response = self.session.request(
+                method,
+                f"{self.base_url}{path}",
+                timeout=timeout or self.timeout,
+                **kwargs,
+            )
+            # Client errors are the caller's problem, not a sign of an
+            # unhealthy service.
+            success = response.status_code < 500
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+            # Recorded whatever was raised, so a half-open trial always
+            # ends and cannot leave the circuit stuck open.
+            self._record(success)
+        return response
+
+    def _record(self, success):
+        if success:
+            self.breaker.record_success()
+            return
+        with self._lock:
+            self.failures += 1
+        self.breaker.record_failure()
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def _pool_stats(self):
+        connections = idle = 0
+        for key in self.adapter.poolmanager.pools.keys():
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            # Unopened slots are queued as None placeholders.
+            idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        return connections, idle
+
+    def stats(self):
+        connections_opened, idle = self._pool_stats()
+        with self._lock:
+            return {
+                "base_url": self.base_url,
+                "pool_size": self.pool_size,
+                "in_flight": self.in_flight,
+                "idle_connections": idle,
+                "utilisation": round(self.in_flight / self.pool_size, 4),
+                "connections_opened": connections_opened,
+                "requests": self.requests,
+                "failures": self.failures,
+                "pool_waits": self.pool_waits,
+                "circuit": {
+                    "state": self.breaker.state,
+                    "consecutive_failures": self.breaker.failures,
+                    "rejected": self.breaker.rejected,
+                },
+            }
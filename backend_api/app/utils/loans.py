@@ -0,0 +1,309 @@
+import logging
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import bindparam, insert, or_, select, update
+
+from app import db
+from app.models.book import Book, BorrowedBook
+from app.models.sync_state import SyncState
+from app.models.user import User
+from app.utils.errors import LibraryError, ValidationError
+from app.utils.stats import count_borrows, count_returns
+
+logger = logging.getLogger(__name__)
+
+LOAN_STREAM = "frontend_loans"
+# Events from before the frontend tagged them with its outbox epoch.
+LEGACY_SOURCE = ""
+MAX_LOAN_EVENTS = 5000
+# Keeps IN (...) lists well below SQLite's bound-parameter limit.
+CHUNK_SIZE = 500
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _parse_datetime(event, field):
+    try:
+        return datetime.fromisoformat(event[field])
+    except (KeyError, TypeError, ValueError):
+        raise ValidationError(f"Invalid or missing {field}")
+
+
+def loan_stream(source):
+    """The ``SyncState`` key for loan events from one frontend outbox epoch."""
+    return f"{LOAN_STREAM}/{source}" if source else LOAN_STREAM
+
+
+def _event_source(event):
+    source = event.get("source", LEGACY_SOURCE) if isinstance(event, dict) else None
+    if not isinstance(source, str) or len(source) > 32:
+        raise ValidationError("Loan event source must be a string of at most 32")
+    return source
+
+
+def _parse_enrollment(event):
+    if not isinstance(event.get("user_id"), int):
+        raise ValidationError("Enroll events need an integer user_id")
+    values = {}
+    for field in ("email", "firstname", "lastname"):
+        if not isinstance(event.get(field), str) or not event[field]:
+            raise ValidationError("Enroll events need email, firstname and lastname")
+        values[field] = event[field]
+    values["enrolled_at"] = _parse_datetime(event, "enrolled_at")
+    return values
+
+
+def _parse_event(event):
+    """Return ``(action, values)`` for a borrow, return or enroll event."""
+    action = event.get("action")
+    if action not in _APPLIERS:
+        raise ValidationError(f"Unknown loan action: {action}")
+    if action == "enroll":
+        return action, _parse_enrollment(event)
+    if not isinstance(event.get("loan_id"), int) or not isinstance(
+        event.get("book_id"), int
+    ):
+        raise ValidationError("Loan events need integer loan_id and book_id")
+
+    values = {"source_loan_id": event["loan_id"], "book_id": event["book_id"]}
+    if action == "borrow":
+        if not isinstance(event.get("user_email"), str):
+            raise ValidationError("Borrow events need a user_email")
+        values["user_email"] = event["user_email"]
+        values["borrow_date"] = _parse_datetime(event, "borrow_date")
+        values["return_date"] = _parse_datetime(event, "return_date")
+    else:
+        values["returned_at"] = _parse_datetime(event, "returned_at")
+    return action, values
+
+
+def _existing_ids(column, ids):
+    existing = set()
+    for chunk in _chunks(ids):
+        existing.update(db.session.scalars(select(column).where(column.in_(chunk))))
+    return existing
+
+
+def _loan_ids(source, source_loan_ids):
+    """Map the frontend's ids for loans from ``source`` to ours."""
+    ids = {}
+    for chunk in _chunks(source_loan_ids):
+        ids.update(
+            db.session.execute(
+                select(BorrowedBook.source_loan_id, BorrowedBook.id).where(
+                    BorrowedBook.source == source,
+                    BorrowedBook.source_loan_id.in_(chunk),
+                )
+            ).all()
+        )
+    return ids
+
+
+def _apply_borrows(loans, source):
+    ids = _loan_ids(source, [loan["source_loan_id"] for loan in loans])
+    rows = [
+        {**loan, "source": source}
+        for loan in loans
+        if loan["source_loan_id"] not in ids
+    ]
+    for chunk in _chunks(rows):
+        ids.update(
+            db.session.execute(
+                insert(BorrowedBook).returning(
+                    BorrowedBook.source_loan_id,
+                    BorrowedBook.id,
+                    sort_by_parameter_order=True,
+                ),
+                chunk,
+            ).all()
+        )
+    count_borrows(rows)
+    books = Book.__table__
+    db.session.execute(
+        update(books)
+        .where(books.c.id == bindparam("loan_book_id"))
+        .values(available=False, current_loan_id=bindparam("loan_id")),
+        [
+            {"loan_book_id": loan["book_id"], "loan_id": ids[loan["source_loan_id"]]}
+            for loan in loans
+        ],
+    )
+
+
+def _apply_returns(loans, source):
+    # The reaper returns a whole batch at one instant, so grouping by the
+    # return time keeps this to a statement or two per batch.
+    for returned_at, group in groupby(loans, key=lambda loan: loan["returned_at"]):
+        for chunk in _chunks(list(group)):
+            returning = (
+                BorrowedBook.source == source,
+                BorrowedBook.source_loan_id.in_(
+                    [loan["source_loan_id"] for loan in chunk]
+                ),
+            )
+            # Only loans this return actually closes come back, so a repeat
+            # never counts twice in the stats.
+            returned = db.session.execute(
+                update(BorrowedBook)
+                .where(*returning, BorrowedBook.returned_at.is_(None))
+                .values(returned_at=returned_at)
+                .returning(BorrowedBook.book_id, BorrowedBook.borrow_date)
+                .execution_options(synchronize_session=False)
+            ).all()
+            count_returns(returned_at, returned)
+            # A book whose pointer has already moved on to a newer loan stays
+            # out; one with no known loan is simply released.
+            db.session.execute(
+                update(Book)
+                .where(
+                    Book.id.in_([loan["book_id"] for loan in chunk]),
+                    or_(
+                        Book.current_loan_id.is_(None),
+                        Book.current_loan_id.in_(
+                            select(BorrowedBook.id).where(*returning)
+                        ),
+                    ),
+                )
+                .values(available=True, current_loan_id=None)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def _apply_enrollments(users, source):
+    # Ids are only unique within one frontend database, so users are
+    # matched on email and numbered here.
+    existing = _existing_ids(User.email, [user["email"] for user in users])
+    rows = []
+    for user in users:
+        if user["email"] not in existing:
+            existing.add(user["email"])
+            rows.append(user)
+    for chunk in _chunks(rows):
+        db.session.execute(insert(User), chunk)
+
+
+_APPLIERS = {
+    "borrow": _apply_borrows,
+    "return": _apply_returns,
+    "enroll": _apply_enrollments,
+}
+
+
+def apply_loan_events(events):
+    """Apply sequenced borrow, return and enroll events in one transaction.
+
+    Events carry the frontend's outbox epoch as ``source``, and sequence
+    numbers and loan ids are only unique within one: a rebuilt frontend
+    starts both again at 1 under a new epoch, so each source keeps its own
+    high-water mark and loans are stored by ``(source, source_loan_id)``.
+    A batch must come from a single source with strictly increasing ``seq``
+    numbers. Anything at or below the source's mark was applied by an
+    earlier delivery and is skipped; the rest is applied with bulk
+    statements, one run of same-action events at a time, and the mark is
+    moved to the last sequence number. Enrollments fill the local ``User``
+    directory, and borrows and returns are added to the ``LoanStat``
+    rollup. Malformed events are reported and passed over so they cannot
+    block the stream. The caller commits.
+    """
+    if len(events) > MAX_LOAN_EVENTS:
+        raise ValidationError(f"Cannot sync more than {MAX_LOAN_EVENTS} events")
+
+    seqs = [event.get("seq") if isinstance(event, dict) else None for event in events]
+    if not all(isinstance(seq, int) and seq > 0 for seq in seqs):
+        raise ValidationError("Every loan event needs a positive integer seq")
+    if any(earlier >= later for earlier, later in zip(seqs, seqs[1:])):
+        raise ValidationError("Loan events must be in increasing seq order")
+    sources = {_event_source(event) for event in events} or {LEGACY_SOURCE}
+    if len(sources) > 1:
+        raise ValidationError("Loan events in one batch must share a source")
+    source = sources.pop()
+    stream = loan_stream(source)
+
+    state = db.session.get(SyncState, stream)
+    if state is None:
+        logger.info("Starting loan stream %s", stream)
+        state = SyncState(stream=stream, last_seq=0)
+        db.session.add(state)
+        db.session.flush()
+    last_seq = state.last_seq
+
+    parsed = []
+    rejected = []
+    for seq, event in zip(seqs, events):
+        if seq <= last_seq:
+            continue
+        try:
+            parsed.append(_parse_event(event))
+        except ValidationError as e:
+            rejected.append({"seq": seq, "error": e.message})
+
+    for action, run in groupby(parsed, key=lambda event: event[0]):
+        _APPLIERS[action]([values for _, values in run], source)
+
+    if seqs and seqs[-1] > last_seq:
+        # Moving the mark only from the value we read means two overlapping
+        # deliveries cannot both apply the same events.
+        moved = db.session.execute(
+            update(SyncState)
+            .where(SyncState.stream == stream, SyncState.last_seq == last_seq)
+            .values(last_seq=seqs[-1], updated_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        if moved.rowcount != 1:
+            raise LibraryError("Loan events were applied concurrently", 409)
+        last_seq = seqs[-1]
+
+    return {
+        "applied": len(parsed),
+        "skipped": len(seqs) - len(parsed) - len(rejected),
+        "rejected": rejected,
+        "last_seq": last_seq,
+    }
+
+
+def apply_loan_batch(events):
+    """Apply and commit a batch of loan events taken off the event bus.
+
+    A batch the frontend had to publish twice shows up with its sequence
+    numbers repeated; only the first copy of each is kept. Events from
+    different sources, such as an old and a rebuilt frontend, are applied
+    as separate streams. Returns a summary per source.
+    """
+    streams = {}
+    for event in events:
+        seq = event.get("seq") if isinstance(event, dict) else None
+        try:
+            source = _event_source(event)
+        except ValidationError:
+            source = None
+        if source is None or not isinstance(seq, int) or seq <= 0:
+            # Retrying would never make it valid, so don't block on it.
+            logger.error(
+                "Dropping loan event without a valid seq and source: %r", event
+            )
+            continue
+        ordered = streams.setdefault(source, [])
+        if not ordered or seq > ordered[-1]["seq"]:
+            ordered.append(event)
+
+    try:
+        summaries = {
+            source: apply_loan_events(ordered) for source, ordered in streams.items()
+        }
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    for source, summary in summaries.items():
+        for rejected in summary["rejected"]:
+            logger.error(
+                "Rejected loan event %s from %s: %s",
+                rejected["seq"],
+                loan_stream(source),
+                rejected["error"],
+            )
+    return summaries
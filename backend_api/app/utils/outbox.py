@@ -0,0 +1,34 @@
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models.outbox import SyncOutbox
+
+
+def enqueue_sync_event(payload):
+    """Queue a catalogue event for the frontend in the caller's transaction."""
+    entry = SyncOutbox(payload=payload)
+    db.session.add(entry)
+    return entry
+
+
+def notify_outbox_dispatcher():
+    """Wake the in-process dispatcher, if any, once new events are committed."""
+    dispatcher = current_app.extensions.get("outbox_dispatcher")
+    if dispatcher is not None:
+        dispatcher.wake()
+
+
+def sync_events_after(after_seq, limit):
+    """Return up to ``limit`` catalogue events newer than ``after_seq``.
+
+    Every outbox row is kept once delivered, so a new frontend replica can
+    catch up from the sequence number of the snapshot it was built from.
+    """
+    entries = db.session.scalars(
+        select(SyncOutbox)
+        .where(SyncOutbox.id > after_seq)
+        .order_by(SyncOutbox.id)
+        .limit(limit)
+    )
+    return [{**entry.payload, "seq": entry.id} for entry in entries]
@@ -0,0 +1,85 @@
+from sqlalchemy import func, select
+
+from app import db
+from app.models.book import Book
+from app.utils.digest import (
+    DEFAULT_DIGEST_PARTS,
+    DIGEST_FIELDS,
+    MAX_DIGEST_ROWS,
+    range_digests,
+    row_digests,
+)
+from app.utils.frontend import get_frontend_client
+from app.utils.outbox import enqueue_sync_event, notify_outbox_dispatcher
+
+
+def fetch_frontend_digest(**params):
+    response = get_frontend_client().get("/sync/books/digest", params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def _queue_repairs(start, end, summary):
+    """Queue the events that make the frontend's ``[start, end)`` match ours."""
+    remote = dict(fetch_frontend_digest(start=start, end=end, rows="true")["rows"])
+    local = row_digests(Book, start, end)
+    changed = [
+        book_id for book_id, digest in local.items() if remote.get(book_id) != digest
+    ]
+
+    books = db.session.execute(
+        select(Book.id, *(Book.__table__.c[field] for field in DIGEST_FIELDS)).where(
+            Book.id.in_(changed)
+        )
+    )
+    for book in books:
+        if book.id in remote:
+            enqueue_sync_event({"action": "update", "book": book._asdict()})
+            summary["updated"] += 1
+        else:
+            enqueue_sync_event({"action": "add", "book": book._asdict()})
+            summary["added"] += 1
+    for book_id in sorted(remote.keys() - local.keys()):
+        enqueue_sync_event({"action": "delete", "book_id": book_id})
+        summary["deleted"] += 1
+
+
+def reconcile_catalogue(parts=DEFAULT_DIGEST_PARTS, leaf_size=MAX_DIGEST_ROWS):
+    """Find and repair differences between our catalogue and the frontend's.
+
+    Both sides hash the catalogue in id ranges. Ranges whose digests match
+    are skipped; the rest are split again, until a range is small enough to
+    compare row by row, and only the rows that differ are sent to the
+    frontend through the outbox. A check of a catalogue that agrees stops
+    after comparing the two root digests. Repairs follow anything already queued, so
+    changes still on their way are never undone.
+    """
+    remote_root = fetch_frontend_digest(parts=1)
+    local_end = (db.session.scalar(select(func.max(Book.id))) or 0) + 1
+    summary = {"ranges": 1, "rows": 0, "added": 0, "updated": 0, "deleted": 0}
+
+    # Both roots cover every id, so they agree exactly when the catalogues do.
+    (theirs,) = remote_root["ranges"]
+    (ours,) = range_digests(Book, 0, local_end, parts=1)
+    if (ours["count"], ours["digest"]) == (theirs["count"], theirs["digest"]):
+        return summary
+
+    pending = [(0, max(local_end, remote_root["end"]))]
+    while pending:
+        start, end = pending.pop()
+        remote = fetch_frontend_digest(start=start, end=end, parts=parts)["ranges"]
+        local = range_digests(Book, start, end, parts)
+        summary["ranges"] += len(local)
+        for ours, theirs in zip(local, remote):
+            if ours == theirs:
+                continue
+            if max(ours["count"], theirs["count"]) <= leaf_size:
+                summary["rows"] += max(ours["count"], theirs["count"])
+                _queue_repairs(ours["start"], ours["end"], summary)
+            else:
+                pending.append((ours["start"], ours["end"]))
+
+    db.session.commit()
+    if summary["added"] or summary["updated"] or summary["deleted"]:
+        notify_outbox_dispatcher()
+    return summary
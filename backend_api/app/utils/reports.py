@@ -0,0 +1,370 @@
+from datetime import datetime
+from itertools import chain, groupby
+
+from sqlalchemy import func, null, or_, select, tuple_
+
+from app import db
+from app.models.book import Book, BorrowedBook
+from app.models.sync_state import SyncState
+from app.models.user import User
+from app.utils.errors import ValidationError
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def parse_flag(args, name):
+    value = args.get(name, "").lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("", "0", "false", "no"):
+        return False
+    raise ValidationError(f"{name} must be true or false")
+
+
+def parse_datetime_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValidationError(f"{name} must be an ISO 8601 date or datetime")
+
+
+def borrowed_books_query(args, now=None):
+    """Build the active-loan report query from request filters.
+
+    Returns ``(statement, order)``. Every column comes from one join, so a
+    page costs a single query. Loans are walked in ``id`` order, or in
+    ``(return_date, id)`` order when filtering by due date, so the report
+    can follow ``ix_borrowedbooks_return_date`` (and ``user_email`` lookups
+    ``ix_borrowedbooks_user_email``) instead of sorting the matches.
+    """
+    statement = (
+        select(
+            BorrowedBook.id,
+            BorrowedBook.book_id,
+            Book.title,
+            Book.category,
+            BorrowedBook.user_email,
+            BorrowedBook.borrow_date,
+            BorrowedBook.return_date,
+        )
+        .join(Book, Book.id == BorrowedBook.book_id)
+        .where(BorrowedBook.returned_at.is_(None))
+    )
+
+    if args.get("user_email"):
+        statement = statement.where(BorrowedBook.user_email == args["user_email"])
+    if args.get("category"):
+        statement = statement.where(Book.category == args["category"])
+
+    due_before = parse_datetime_arg(args, "return_before")
+    if parse_flag(args, "overdue"):
+        now = now or datetime.now()
+        due_before = min(due_before, now) if due_before else now
+
+    if due_before is None:
+        order = (BorrowedBook.id,)
+    else:
+        statement = statement.where(BorrowedBook.return_date < due_before)
+        order = (BorrowedBook.return_date, BorrowedBook.id)
+    return statement.order_by(*order), order
+
+
+def _cursor_value(column, value):
+    if column.key == "id":
+        if not isinstance(value, int):
+            raise ValidationError("Invalid cursor")
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid cursor")
+
+
+def after_cursor(statement, order, cursor):
+    """Restrict ``statement`` to rows that sort after ``cursor``."""
+    position = decode_cursor(cursor)
+    values = [_cursor_value(column, position.get(column.key)) for column in order]
+    return statement.where(tuple_(*order) > tuple_(*values))
+
+
+def cursor_for(row, order):
+    position = {}
+    for column in order:
+        value = getattr(row, column.key)
+        position[column.key] = value.isoformat() if column.key != "id" else value
+    return encode_cursor(**position)
+
+
+OVERDUE_EXPORT_CHUNK_SIZE = 5000
+
+
+def iter_overdue_loans(args, now, chunk_size=OVERDUE_EXPORT_CHUNK_SIZE):
+    """Yield every loan still out past its due date at ``now``, oldest first.
+
+    The active-loan ``return_date`` index is read ``chunk_size`` rows at a
+    time, each chunk picking up after the last ``(return_date, id)`` seen,
+    so memory stays flat however many loans are overdue. The read
+    transaction is closed between chunks so a long export never holds up
+    the loan sync. ``category`` and ``user_email`` narrow the export.
+    """
+    filters = {name: args.get(name) for name in ("category", "user_email")}
+    statement, order = borrowed_books_query({**filters, "overdue": "true"}, now)
+    last = None
+    while True:
+        chunk = statement
+        if last is not None:
+            chunk = chunk.where(
+                tuple_(*order) > tuple_(*(getattr(last, c.key) for c in order))
+            )
+        rows = db.session.execute(chunk.limit(chunk_size)).all()
+        db.session.rollback()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
+
+
+UNAVAILABLE_SORTS = ("id", "available_date")
+
+
+def _unavailable_book_phases(sort):
+    """The queries that list unavailable books in ``sort`` order, in turn.
+
+    Each book's current loan is reached through ``Book.current_loan_id``,
+    so the cost never depends on how long its loan history is. Sorted by
+    id, one query walks ``ix_books_available``. Sorted by available date,
+    books that are out on a loan come first, straight off the active-loan
+    index on ``return_date``, followed by books with no known loan in id
+    order.
+    """
+    if sort not in UNAVAILABLE_SORTS:
+        raise ValidationError(f"Sort must be one of: {', '.join(UNAVAILABLE_SORTS)}")
+
+    if sort == "id":
+        return [
+            select(
+                Book.id,
+                Book.title,
+                BorrowedBook.user_email,
+                BorrowedBook.return_date,
+                BorrowedBook.id.label("loan_id"),
+            )
+            .outerjoin(BorrowedBook, BorrowedBook.id == Book.current_loan_id)
+            .where(Book.available.is_(False))
+            .order_by(Book.id)
+        ]
+
+    on_loan = (
+        select(
+            Book.id,
+            Book.title,
+            BorrowedBook.user_email,
+            BorrowedBook.return_date,
+            BorrowedBook.id.label("loan_id"),
+        )
+        .select_from(BorrowedBook)
+        # Only loans set current_loan_id, and they clear it along with
+        # marking the book available, so it implies the book is out.
+        .join(Book, Book.current_loan_id == BorrowedBook.id)
+        .where(BorrowedBook.returned_at.is_(None))
+        .order_by(BorrowedBook.return_date, BorrowedBook.id)
+    )
+    no_loan = (
+        select(
+            Book.id,
+            Book.title,
+            null().label("user_email"),
+            null().label("return_date"),
+            null().label("loan_id"),
+        )
+        .where(Book.available.is_(False), Book.current_loan_id.is_(None))
+        .order_by(Book.id)
+    )
+    return [on_loan, no_loan]
+
+
+def iter_unavailable_books(sort, batch_size):
+    # Not a generator itself, so a bad sort is rejected before streaming.
+    phases = _unavailable_book_phases(sort)
+    return chain.from_iterable(
+        db.session.execute(statement.execution_options(yield_per=batch_size))
+        for statement in phases
+    )
+
+
+def unavailable_books_page(sort, after, limit):
+    """Return ``(rows, next_cursor)`` for one page of unavailable books."""
+    phases = _unavailable_book_phases(sort)
+    position = decode_cursor(after) if after else {}
+    if after and "id" not in position and "loan_id" not in position:
+        raise ValidationError("Invalid cursor")
+    if sort == "available_date" and "id" in position:
+        # The cursor is already past every book that is out on a loan.
+        phases = phases[1:]
+
+    rows = []
+    for statement in phases:
+        if "loan_id" in position:
+            statement = statement.where(
+                tuple_(BorrowedBook.return_date, BorrowedBook.id)
+                > tuple_(
+                    _cursor_value(
+                        BorrowedBook.return_date, position.get("return_date")
+                    ),
+                    _cursor_value(BorrowedBook.id, position.get("loan_id")),
+                )
+            )
+        elif "id" in position:
+            statement = statement.where(
+                Book.id > _cursor_value(Book.id, position.get("id"))
+            )
+        rows += db.session.execute(statement.limit(limit + 1 - len(rows))).all()
+        if len(rows) > limit:
+            break
+        # Later phases start from their own beginning.
+        position = {}
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if sort == "available_date" and last.loan_id is not None:
+        cursor = encode_cursor(
+            return_date=last.return_date.isoformat(), loan_id=last.loan_id
+        )
+    else:
+        cursor = encode_cursor(id=last.id)
+    return rows, cursor
+
+
+def users_query(args):
+    """Build the user directory query, in id order, from request filters.
+
+    ``q`` matches any part of a user's email or name.
+    """
+    statement = select(User.id, User.email, User.firstname, User.lastname)
+    search = args.get("q", "").strip()
+    if search:
+        statement = statement.where(
+            or_(
+                User.email.contains(search, autoescape=True),
+                User.firstname.contains(search, autoescape=True),
+                User.lastname.contains(search, autoescape=True),
+            )
+        )
+    return statement.order_by(User.id), (User.id,)
+
+
+def stream_watermark(stream):
+    """Return ``(last_seq, updated_at)`` for an incoming event stream.
+
+    A stream kept per source (``<stream>/<source>``) reports whichever
+    source was applied most recently.
+    """
+    state = db.session.scalars(
+        select(SyncState)
+        .where(
+            or_(SyncState.stream == stream, SyncState.stream.startswith(f"{stream}/"))
+        )
+        .order_by(SyncState.updated_at.desc())
+        .limit(1)
+    ).first()
+    if state is None:
+        return 0, None
+    return state.last_seq, state.updated_at
+
+
+def user_loans_query(after_id, limit):
+    """A page of users who have books out, joined with those loans.
+
+    The page is picked first, walking the users table in id order and keeping
+    users with an open loan; their loans are then looked up by email. Rows
+    come back in user and loan order straight off the indexes, so a page of
+    ``limit`` users is one query however many loans each of them has. Loans
+    of books the backend does not know come back with a null title, and
+    every row carries ``borrowers``, the number of users the page picked.
+    """
+    borrowers = select(User.id).where(
+        select(BorrowedBook.id)
+        .where(
+            BorrowedBook.user_email == User.email,
+            BorrowedBook.returned_at.is_(None),
+        )
+        .exists()
+    )
+    if after_id is not None:
+        borrowers = borrowers.where(User.id > after_id)
+    borrowers = borrowers.order_by(User.id).limit(limit)
+    picked = (
+        select(func.count())
+        .select_from(borrowers.subquery())
+        .scalar_subquery()
+        .label("borrowers")
+    )
+
+    return (
+        select(
+            picked,
+            User.id,
+            User.email,
+            User.firstname,
+            User.lastname,
+            BorrowedBook.book_id,
+            Book.title,
+            BorrowedBook.borrow_date,
+            BorrowedBook.return_date,
+        )
+        .join(BorrowedBook, BorrowedBook.user_email == User.email)
+        .outerjoin(Book, Book.id == BorrowedBook.book_id)
+        .where(User.id.in_(borrowers), BorrowedBook.returned_at.is_(None))
+        .order_by(User.id, BorrowedBook.id)
+    )
+
+
+def group_user_loans(rows):
+    """Fold ``user_loans_query`` rows into one dict per user."""
+    for _, user_rows in groupby(rows, key=lambda row: row.id):
+        user_rows = list(user_rows)
+        first = user_rows[0]
+        yield {
+            "id": first.id,
+            "email": first.email,
+            "firstname": first.firstname,
+            "lastname": first.lastname,
+            "loans": [
+                {
+                    "book_id": row.book_id,
+                    "book_title": row.title,
+                    "borrow_date": row.borrow_date.isoformat(),
+                    "return_date": row.return_date.isoformat(),
+                }
+                for row in user_rows
+            ],
+        }
+
+
+def user_loans_page(after, limit):
+    """Return ``(users, next_cursor)`` for one page of borrowers."""
+    after_id = None
+    if after:
+        after_id = _cursor_value(User.id, decode_cursor(after).get("id"))
+    # One extra user tells us whether there is another page.
+    rows = db.session.execute(user_loans_query(after_id, limit + 1)).all()
+    users = list(group_user_loans(rows))[:limit]
+    if not rows or rows[0].borrowers <= limit:
+        return users, None
+    return users, encode_cursor(id=users[-1]["id"])
+
+
+def iter_user_loans(batch_size):
+    """Yield every borrower with their loans, one page of users at a time."""
+    after_id = None
+    while True:
+        rows = db.session.execute(user_loans_query(after_id, batch_size)).all()
+        users = list(group_user_loans(rows))
+        yield from users
+        if not rows or rows[0].borrowers < batch_size:
+            return
+        after_id = users[-1]["id"]
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models.book import Book
+from app.models.outbox import SyncOutbox
+from app.utils.digest import DIGEST_FIELDS
+from app.utils.streaming import STREAM_BATCH_SIZE
+
+
+def catalogue_snapshot(batch_size=STREAM_BATCH_SIZE):
+    """Return ``(seq, items)`` for a full copy of the catalogue.
+
+    ``items`` yields a ``{"snapshot": ...}`` header, every book in id order
+    and a ``{"end": ...}`` trailer carrying the row count, so a truncated
+    download is easy to spot. ``seq`` is the last sync outbox event already
+    committed when the snapshot was started: the snapshot reflects at least
+    every event up to it, and replaying the events after it on top brings a
+    copy fully up to date, since re-applying a change that the snapshot
+    already holds leaves the book as it is.
+    """
+    seq = db.session.scalar(select(func.max(SyncOutbox.id))) or 0
+
+    def items():
+        yield {"snapshot": {"seq": seq, "created_at": datetime.now().isoformat()}}
+        rows = db.session.execute(
+            select(Book.id, *(Book.__table__.c[field] for field in DIGEST_FIELDS))
+            .order_by(Book.id)
+            .execution_options(yield_per=batch_size)
+        )
+        count = 0
+        for row in rows:
+            count += 1
+            yield row._asdict()
+        yield {"end": {"seq": seq, "count": count}}
+
+    return seq, items()
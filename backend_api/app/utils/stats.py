@@ -0,0 +1,226 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import (
+    Integer,
+    bindparam,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    tuple_,
+    union_all,
+    update,
+)
+
+from app import db
+from app.models.book import Book, BorrowedBook
+from app.models.stats import LoanStat
+from app.utils.errors import ValidationError
+from app.utils.reports import parse_datetime_arg
+
+STAT_KEYS = ("day", "category", "publisher")
+# Each key is three bound parameters.
+KEY_CHUNK_SIZE = 300
+SECONDS_PER_DAY = 86400
+
+
+def _chunks(items, size=KEY_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _book_facets(book_ids):
+    facets = {}
+    for chunk in _chunks(list(set(book_ids))):
+        for row in db.session.execute(
+            select(Book.id, Book.category, Book.publisher).where(Book.id.in_(chunk))
+        ):
+            facets[row.id] = (row.category, row.publisher)
+    return facets
+
+
+def _add_to_rollup(counts):
+    """Add ``{(day, category, publisher): [borrows, returns, seconds]}``."""
+    keys = list(counts)
+    key_columns = tuple_(LoanStat.day, LoanStat.category, LoanStat.publisher)
+    existing = set()
+    for chunk in _chunks(keys):
+        existing.update(
+            db.session.execute(
+                select(LoanStat.day, LoanStat.category, LoanStat.publisher).where(
+                    key_columns.in_(chunk)
+                )
+            ).tuples()
+        )
+
+    stats = LoanStat.__table__
+    changes = [
+        {
+            **dict(zip(("key_" + key for key in STAT_KEYS), key)),
+            "add_borrows": counts[key][0],
+            "add_returns": counts[key][1],
+            "add_seconds": counts[key][2],
+        }
+        for key in keys
+        if key in existing
+    ]
+    if changes:
+        db.session.execute(
+            update(stats)
+            .where(
+                stats.c.day == bindparam("key_day"),
+                stats.c.category == bindparam("key_category"),
+                stats.c.publisher == bindparam("key_publisher"),
+            )
+            .values(
+                borrows=stats.c.borrows + bindparam("add_borrows"),
+                returns=stats.c.returns + bindparam("add_returns"),
+                loan_seconds=stats.c.loan_seconds + bindparam("add_seconds"),
+            ),
+            changes,
+        )
+
+    rows = [
+        {
+            **dict(zip(STAT_KEYS, key)),
+            "borrows": counts[key][0],
+            "returns": counts[key][1],
+            "loan_seconds": counts[key][2],
+        }
+        for key in keys
+        if key not in existing
+    ]
+    if rows:
+        db.session.execute(insert(stats), rows)
+
+
+def count_borrows(loans):
+    """Add newly recorded loans to the rollup of the day each one started.
+
+    Loans of books the backend does not know are left out, as the backfill
+    leaves them out.
+    """
+    facets = _book_facets([loan["book_id"] for loan in loans])
+    counts = {}
+    for loan in loans:
+        if loan["book_id"] in facets:
+            key = (loan["borrow_date"].date(), *facets[loan["book_id"]])
+            counts.setdefault(key, [0, 0, 0])[0] += 1
+    _add_to_rollup(counts)
+
+
+def count_returns(returned_at, loans):
+    """Add loans that were just returned, given as ``(book_id, borrow_date)``."""
+    facets = _book_facets([book_id for book_id, _ in loans])
+    counts = {}
+    for book_id, borrow_date in loans:
+        if book_id in facets:
+            key = (returned_at.date(), *facets[book_id])
+            totals = counts.setdefault(key, [0, 0, 0])
+            totals[1] += 1
+            totals[2] += round((returned_at - borrow_date).total_seconds())
+    _add_to_rollup(counts)
+
+
+def backfill_loan_stats():
+    """Rebuild the rollup from the whole loan history with one INSERT ... SELECT.
+
+    Returns the number of rollup rows written. Runs in the caller's
+    transaction, so loan events applied meanwhile wait for it to commit.
+    """
+    borrows = select(
+        func.date(BorrowedBook.borrow_date).label("day"),
+        Book.category,
+        Book.publisher,
+        literal(1).label("borrows"),
+        literal(0).label("returns"),
+        literal(0).label("loan_seconds"),
+    ).join(Book, Book.id == BorrowedBook.book_id)
+    returns = (
+        select(
+            func.date(BorrowedBook.returned_at),
+            Book.category,
+            Book.publisher,
+            literal(0),
+            literal(1),
+            cast(
+                func.round(
+                    (
+                        func.julianday(BorrowedBook.returned_at)
+                        - func.julianday(BorrowedBook.borrow_date)
+                    )
+                    * SECONDS_PER_DAY
+                ),
+                Integer,
+            ),
+        )
+        .join(Book, Book.id == BorrowedBook.book_id)
+        .where(BorrowedBook.returned_at.is_not(None))
+    )
+    events = union_all(borrows, returns).subquery()
+
+    db.session.execute(delete(LoanStat))
+    result = db.session.execute(
+        insert(LoanStat).from_select(
+            [*STAT_KEYS, "borrows", "returns", "loan_seconds"],
+            select(
+                events.c.day,
+                events.c.category,
+                events.c.publisher,
+                func.sum(events.c.borrows),
+                func.sum(events.c.returns),
+                func.sum(events.c.loan_seconds),
+            ).group_by(events.c.day, events.c.category, events.c.publisher),
+        )
+    )
+    return result.rowcount
+
+
+def _parse_day(args, name):
+    value = parse_datetime_arg(args, name)
+    return value.date() if value else None
+
+
+def loan_stats_query(args):
+    """Build the borrowing stats query from request filters.
+
+    ``start`` and ``end`` bound the days (both inclusive) and lead the
+    rollup's primary key, so only rows in the range are read. ``group_by``
+    picks any of day, category and publisher; ``category`` and
+    ``publisher`` narrow the rows counted.
+    """
+    start = _parse_day(args, "start")
+    end = _parse_day(args, "end")
+    if start and end and start > end:
+        raise ValidationError("start must not be after end")
+
+    groups = [name for name in args.get("group_by", "day").split(",") if name]
+    if not set(groups) <= set(STAT_KEYS):
+        raise ValidationError(f"group_by must be from: {', '.join(STAT_KEYS)}")
+    columns = [getattr(LoanStat, name) for name in dict.fromkeys(groups)]
+
+    statement = select(
+        *columns,
+        func.sum(LoanStat.borrows).label("borrows"),
+        func.sum(LoanStat.returns).label("returns"),
+        func.sum(LoanStat.loan_seconds).label("loan_seconds"),
+    )
+    if start:
+        statement = statement.where(LoanStat.day >= start)
+    if end:
+        statement = statement.where(LoanStat.day <= end)
+    for name in ("category", "publisher"):
+        if args.get(name):
+            statement = statement.where(getattr(LoanStat, name) == args[name])
+    return statement.group_by(*columns).order_by(*columns)
+
+
+@click.command("backfill-loan-stats")
+@with_appcontext
+def backfill_command():
+    """Rebuild the borrowing stats rollup from the loan history."""
+    rows = backfill_loan_stats()
+    db.session.commit()
+    click.echo(f"Wrote {rows} loan stats rows")
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from itertools import chain, islice
+
+from flask import Response, stream_with_context
+
+from app.utils.errors import LibraryError
+
+logger = logging.getLogger(__name__)
+
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_stream(args):
+    return args.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def _prefetched(items):
+    """Fetch the first item now, while an error can still get a normal reply.
+
+    Once a streamed response has started its status cannot change, so a bad
+    request or a failing first query has to surface before that.
+    """
+    items = iter(items)
+    return chain(list(islice(items, 1)), items)
+
+
+def _stream_failure(error, kind):
+    logger.exception("%s stream failed", kind)
+    return error.message if isinstance(error, LibraryError) else "Stream failed"
+
+
+def stream_json_array(rows, serialize, batch_size=STREAM_BATCH_SIZE):
+    """Stream ``rows`` as a JSON array without building the list in memory.
+
+    Rows are encoded ``batch_size`` at a time, so only one batch of rows and
+    its encoded text are alive at once however long the result set is. The
+    first row is fetched before the response starts, so a bad request or a
+    failing query still gets the normal error response. Once the status has
+    been sent a failure can only be reported in the body: the array is left
+    unclosed and an ``{"error": ...}`` line follows, so a client can always
+    tell a truncated stream from a complete one, which ends with ``]``.
+    """
+    rows = _prefetched(rows)
+
+    def generate():
+        yield "["
+        separator = ""
+        batch = []
+        try:
+            for row in rows:
+                batch.append(json.dumps(serialize(row)))
+                if len(batch) >= batch_size:
+                    yield separator + ",".join(batch)
+                    separator = ","
+                    batch = []
+        except Exception as e:
+            message = _stream_failure(e, "JSON array")
+            yield "\n" + json.dumps({"error": message}) + "\n"
+            return
+        if batch:
+            yield separator + ",".join(batch)
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def stream_ndjson(items, batch_size=1, headers=None):
+    """Stream ``items`` as newline-delimited JSON, one line per item.
+
+    Lines go out as soon as they are encoded unless ``batch_size`` asks for
+    them to be sent that many at a time. As with :func:`stream_json_array`
+    the first item is fetched up front, and a later failure ends the body
+    with an ``{"error": ...}`` line after the lines already encoded.
+    """
+    items = _prefetched(items)
+
+    def generate():
+        batch = []
+        try:
+            for item in items:
+                batch.append(json.dumps(item) + "\n")
+                if len(batch) >= batch_size:
+                    yield "".join(batch)
+                    batch = []
+        except Exception as e:
+            batch.append(json.dumps({"error": _stream_failure(e, "NDJSON")}) + "\n")
+        if batch:
+            yield "".join(batch)
+
+    response = Response(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+    response.headers.update(headers or {})
+    return response
+
+
+def stream_csv(rows, fields, serialize, batch_size=STREAM_BATCH_SIZE, headers=None):
+    """Stream ``rows`` as CSV with a header line of ``fields``.
+
+    ``serialize`` turns a row into a dict keyed by ``fields``. Rows are
+    written ``batch_size`` at a time, so only one batch is ever in memory.
+    The first row is fetched before the response starts; a later failure
+    ends the file with a row of ``#error`` and the message in its first two
+    columns, which no real row can start with.
+    """
+    rows = _prefetched(rows)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fields)
+        writer.writeheader()
+        try:
+            for count, row in enumerate(rows, start=1):
+                writer.writerow(serialize(row))
+                if count % batch_size == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        except Exception as e:
+            message = _stream_failure(e, "CSV")
+            writer.writerow({fields[0]: "#error", fields[1]: message})
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(generate()), mimetype="text/csv")
+    response.headers.update(headers or {})
+    return response
+
+
+def stream_gzip_ndjson(items, batch_size=STREAM_BATCH_SIZE, headers=None):
+    """Stream ``items`` as gzip-compressed NDJSON.
+
+    Lines are compressed ``batch_size`` at a time as one continuous gzip
+    member, so the body is never built in memory and HTTP clients that
+    honour ``Content-Encoding`` decompress it as it arrives.
+    """
+
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        batch = []
+        for item in items:
+            batch.append(json.dumps(item))
+            if len(batch) >= batch_size:
+                yield compressor.compress(("\n".join(batch) + "\n").encode())
+                batch = []
+        if batch:
+            yield compressor.compress(("\n".join(batch) + "\n").encode())
+        yield compressor.flush()
+
+    response = Response(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers.update(headers or {})
+    return response
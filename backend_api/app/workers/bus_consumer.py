@@ -0,0 +1,169 @@
+import logging
+import socket
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Once the first message of a batch has arrived, how long to wait for more
+# before applying what we have.
+BATCH_SETTLE_TIMEOUT = 0.01
+
+
+class BusConsumer:
+    """Applies events from some of a topic's partitions, a batch at a time.
+
+    The broker hands this consumer at most ``prefetch`` unacknowledged
+    messages. Messages are buffered until ``batch_size`` events have
+    arrived (or the queue runs dry), passed to ``handle`` in one call inside
+    an app context, and only acknowledged once ``handle`` returns. A batch
+    that fails is kept and retried with exponential backoff before anything
+    newer is applied, so each partition is applied strictly in order; if the
+    process dies, the broker redelivers everything unacknowledged.
+    """
+
+    def __init__(
+        self,
+        app,
+        bus,
+        topic,
+        handle,
+        partitions=None,
+        batch_size=500,
+        prefetch=20,
+        poll_interval=1.0,
+        base_backoff=1.0,
+        max_backoff=60.0,
+    ):
+        self.app = app
+        self.bus = bus
+        self.topic = topic
+        self.handle = handle
+        self.partitions = (
+            list(range(bus.partition_count(topic)))
+            if partitions is None
+            else partitions
+        )
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self._buffer = deque()
+        self._connection = None
+        self._consumer = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _on_message(self, body, message):
+        self._buffer.append((body, message))
+
+    def _buffered_events(self):
+        return sum(len(body["events"]) for body, _ in self._buffer)
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = self.bus.connect()
+            self._consumer = self._connection.Consumer(
+                [self.bus.queue(self.topic, p) for p in self.partitions],
+                callbacks=[self._on_message],
+                prefetch_count=self.prefetch,
+                accept=["json"],
+            )
+            self._consumer.consume()
+
+    def _fill(self, timeout):
+        while self._buffered_events() < self.batch_size:
+            try:
+                self._connection.drain_events(
+                    timeout=BATCH_SETTLE_TIMEOUT if self._buffer else timeout
+                )
+            except socket.timeout:
+                return
+
+    def consume_batch(self, timeout=0):
+        """Apply one batch; returns the number of events applied."""
+        self._connect()
+        self._fill(timeout)
+        if not self._buffer:
+            return 0
+
+        messages = list(self._buffer)
+        events = [event for body, _ in messages for event in body["events"]]
+        with self.app.app_context():
+            self.handle(events)
+        for _, message in messages:
+            message.ack()
+        self._buffer.clear()
+        return len(events)
+
+    def drain(self):
+        applied = 0
+        while True:
+            count = self.consume_batch()
+            applied += count
+            if not count:
+                return applied
+
+    def backoff(self):
+        return min(self.base_backoff * 2 ** (self.failures - 1), self.max_backoff)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.consume_batch(timeout=self.poll_interval)
+                self.failures = 0
+            except Exception as exc:
+                self.failures += 1
+                logger.exception(
+                    "Applying %s events failed (attempt %d)", self.topic, self.failures
+                )
+                if self._connection is not None and isinstance(
+                    exc, self._connection.connection_errors
+                ):
+                    # Reconnect next time; the broker takes back whatever we
+                    # had not acknowledged and redelivers it in order.
+                    self._disconnect()
+                self._stop.wait(self.backoff())
+
+    def start(self, name=None):
+        self._thread = threading.Thread(
+            target=self.run, name=name or f"{self.topic}-consumer", daemon=True
+        )
+        self._thread.start()
+
+    def _disconnect(self):
+        self._buffer.clear()
+        if self._connection is not None:
+            self._connection.release()
+            self._connection = None
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._disconnect()
+
+
+def start_consumers(app, bus, topic, handle, count, **kwargs):
+    """Start ``count`` consumer threads that split the topic's partitions.
+
+    A partition is only ever read by one consumer, which is what keeps its
+    events in order; more consumers than partitions would sit idle.
+    """
+    partitions = bus.partition_count(topic)
+    count = max(1, min(count, partitions))
+    consumers = []
+    for index in range(count):
+        consumer = BusConsumer(
+            app,
+            bus,
+            topic,
+            handle,
+            partitions=list(range(index, partitions, count)),
+            **kwargs,
+        )
+        consumer.start(name=f"{topic}-consumer-{index}")
+        consumers.append(consumer)
+    return consumers
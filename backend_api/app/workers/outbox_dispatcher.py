@@ -0,0 +1,147 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from app import db
+from app.models.outbox import SyncOutbox
+from app.utils.frontend import sync_with_frontend
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    """Drains the sync outbox to the frontend in id order.
+
+    Each pass sends the oldest pending events as one batch. When delivery
+    fails the batch stays pending and is retried with exponential backoff;
+    later events wait behind it so the frontend always applies changes in
+    the order they were committed. Each event carries its outbox id as
+    ``seq``, which is how a replica built from a snapshot tells which events
+    it already has.
+    """
+
+    def __init__(
+        self,
+        app,
+        send=sync_with_frontend,
+        clock=datetime.now,
+        batch_size=500,
+        poll_interval=1.0,
+        base_backoff=1.0,
+        max_backoff=300.0,
+    ):
+        self.app = app
+        self.send = send
+        self.clock = clock
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def backoff(self, attempts):
+        return min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+
+    def _pending(self, limit):
+        return db.session.scalars(
+            select(SyncOutbox)
+            .where(SyncOutbox.dispatched_at.is_(None))
+            .order_by(SyncOutbox.id)
+            .limit(limit)
+        ).all()
+
+    def dispatch_batch(self):
+        """Send one batch; returns the number of events delivered."""
+        now = self.clock()
+        with self.app.app_context():
+            entries = self._pending(self.batch_size)
+            if not entries or entries[0].next_attempt_at > now:
+                return 0
+
+            ids = [entry.id for entry in entries]
+            try:
+                results = self.send(
+                    [{**entry.payload, "seq": entry.id} for entry in entries]
+                )
+            except Exception as exc:
+                attempts = entries[0].attempts + 1
+                db.session.execute(
+                    update(SyncOutbox)
+                    .where(SyncOutbox.id.in_(ids))
+                    .values(
+                        attempts=SyncOutbox.attempts + 1,
+                        last_error=str(exc)[:1000],
+                        next_attempt_at=now + timedelta(seconds=self.backoff(attempts)),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+                logger.warning(
+                    "Outbox delivery of %d events failed (attempt %d): %s",
+                    len(ids),
+                    attempts,
+                    exc,
+                )
+                return 0
+
+            for entry, result in zip(entries, results or []):
+                if result.get("status") == "invalid":
+                    logger.error(
+                        "Frontend rejected outbox event %d: %s",
+                        entry.id,
+                        result.get("error"),
+                    )
+            db.session.execute(
+                update(SyncOutbox)
+                .where(SyncOutbox.id.in_(ids))
+                .values(attempts=SyncOutbox.attempts + 1, dispatched_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return len(ids)
+
+    def drain(self):
+        delivered = 0
+        while True:
+            count = self.dispatch_batch()
+            delivered += count
+            if count < self.batch_size:
+                return delivered
+
+    def seconds_until_next_attempt(self):
+        with self.app.app_context():
+            head = self._pending(1)
+        if not head:
+            return self.poll_interval
+        wait = (head[0].next_attempt_at - self.clock()).total_seconds()
+        return min(max(wait, 0), self.max_backoff)
+
+    def run(self):
+        while not self._stopped:
+            try:
+                self.drain()
+                wait = self.seconds_until_next_attempt()
+            except Exception:
+                logger.exception("Outbox dispatcher iteration failed")
+                wait = self.poll_interval
+            self._wake.wait(wait or self.poll_interval)
+            self._wake.clear()
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.run, name="outbox-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,76 @@
+import signal
+import threading
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+WORKERS = ("outbox_dispatcher", "loan_consumers")
+
+
+def start_workers(app):
+    """Start the background workers enabled in ``app.config``.
+
+    They run as threads of the calling process, so this is only called by
+    ``flask run-workers`` and ``run.py``; migrations, CLI commands, tests
+    and benchmarks that build an app never start them. Returns the names
+    of the workers started.
+    """
+    if app.config["OUTBOX_DISPATCHER_ENABLED"]:
+        from app.utils.frontend import publish_catalogue_events, sync_with_frontend
+        from app.workers.outbox_dispatcher import OutboxDispatcher
+
+        send = sync_with_frontend
+        if app.extensions["event_bus"] is not None:
+            send = publish_catalogue_events
+        app.extensions["outbox_dispatcher"] = OutboxDispatcher(app, send=send)
+        app.extensions["outbox_dispatcher"].start()
+
+    if app.config["LOAN_CONSUMER_ENABLED"] and app.extensions["event_bus"]:
+        from app.utils.loans import apply_loan_batch
+        from app.workers.bus_consumer import start_consumers
+
+        app.extensions["loan_consumers"] = start_consumers(
+            app,
+            app.extensions["event_bus"],
+            "loans",
+            apply_loan_batch,
+            1,
+            batch_size=app.config["EVENT_BUS_BATCH_SIZE"],
+            prefetch=app.config["EVENT_BUS_PREFETCH"],
+        )
+
+    return [name for name in WORKERS if name in app.extensions]
+
+
+def stop_workers(app):
+    """Stop whatever ``start_workers`` started, waiting for each thread."""
+    for name in reversed(WORKERS):
+        workers = app.extensions.pop(name, None)
+        if workers is None:
+            continue
+        for worker in workers if isinstance(workers, list) else [workers]:
+            worker.stop()
+
+
+@click.command("run-workers")
+@with_appcontext
+def run_workers_command():
+    """Run the enabled background workers until interrupted."""
+    app = current_app._get_current_object()
+    started = start_workers(app)
+    if not started:
+        click.echo("No workers are enabled")
+        return
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    click.echo(f"Running {', '.join(started)}")
+    try:
+        # A timeout keeps the wait interruptible by Ctrl-C.
+        while not stopping.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers(app)
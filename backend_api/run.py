@@ -1,7 +1,13 @@
+import os
+
 from app import create_app
+from app.workers.runner import start_workers
 
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
-
+    # The reloader also runs this file in the watching parent; only the
+    # child that serves requests gets the workers.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_workers(app)
+    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -1,9 +1,18 @@
-from datetime import datetime
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
 import pytest
-import requests
-from unittest.mock import patch
+from sqlalchemy import event, insert
 from app import create_app, db
 from app.models.book import Book, BorrowedBook
+from app.models.outbox import SyncOutbox
+from app.models.sync_state import SyncState
+from app.routes import admin_routes
+from app.routes.admin_routes import serialize_loan
+from app.utils.errors import ValidationError
+from app.utils.reports import iter_overdue_loans
 
 
 @pytest.fixture
@@ -25,10 +34,8 @@ def test_index(client):
     assert response.json == {"health": "healthy"}
 
 
-def test_add_book(client, mocker):
-    """Test adding a book."""
-    mock_sync = mocker.patch("app.routes.admin_routes.sync_with_frontend")
-
+def test_add_book(client):
+    """Test adding a book queues its sync event in the same commit."""
     payload = {
         "title": "Test Book",
         "author": "John Doe",
@@ -43,17 +50,19 @@ def test_add_book(client, mocker):
     assert data["message"] == "Book added successfully"
     assert data["book"]["title"] == "Test Book"
 
-    # Ensure sync function was called
-    mock_sync.assert_called_once_with(
-        "add",
-        {
+    # Ensure the sync event was written to the outbox
+    entry = SyncOutbox.query.one()
+    assert entry.dispatched_at is None
+    assert entry.payload == {
+        "action": "add",
+        "book": {
             "id": data["book"]["id"],
             "title": "Test Book",
             "author": "John Doe",
             "publisher": "Test Publisher",
             "category": "Fiction",
         },
-    )
+    }
 
 
 def test_add_book_missing_fields(client):
@@ -76,27 +85,77 @@ def test_remove_book(client):
 
     # Ensure the book is deleted
     assert db.session.get(Book, book.id) is None
+    entry = SyncOutbox.query.one()
+    assert entry.payload == {"action": "delete", "book_id": book.id}
 
 
-@patch("requests.get")
-def test_list_users(mock_get, client):
-    """Test fetching users from frontend API."""
-    mock_get.return_value.status_code = 200
-    mock_get.return_value.json.return_value = [{"id": 1, "name": "User One"}]
+def enroll_event(seq, user_id, email, firstname="User", lastname="Name"):
+    return {
+        "seq": seq,
+        "action": "enroll",
+        "user_id": user_id,
+        "email": email,
+        "firstname": firstname,
+        "lastname": lastname,
+        "enrolled_at": "2025-01-01T12:00:00",
+    }
+
+
+def test_list_users(client):
+    """Test the user directory is served from enrollment events."""
+    response = client.get("/admin/users")
+    assert response.json == []
+    assert response.headers["X-Synced-Seq"] == "0"
+
+    events = [enroll_event(1, 7, "one@example.com", "User", "One")]
+    client.post("/admin/sync/loans", json={"events": events})
 
     response = client.get("/admin/users")
     assert response.status_code == 200
-    assert response.json == [{"id": 1, "name": "User One"}]
+    assert response.json == [
+        {"id": 1, "email": "one@example.com", "firstname": "User", "lastname": "One"}
+    ]
+    assert response.headers["X-Synced-Seq"] == "1"
+    assert "X-Synced-At" in response.headers
 
 
-@patch("requests.get")
-def test_list_users_failure(mock_get, client):
-    """Test failure when frontend API is unavailable."""
-    mock_get.side_effect = requests.exceptions.RequestException()
+def test_list_users_pages_and_searches(client):
+    """Test paging through the user directory, with and without a search."""
+    events = [
+        enroll_event(
+            i, i, f"user{i}@example.com", lastname="Smith" if i % 2 else "Jones"
+        )
+        for i in range(1, 8)
+    ]
+    events.append({"seq": 8, "action": "enroll", "user_id": 8})
+    response = client.post("/admin/sync/loans", json={"events": events})
+    assert response.json["applied"] == 7
+    assert response.json["rejected"] == [
+        {"seq": 8, "error": "Enroll events need email, firstname and lastname"}
+    ]
+    # A redelivered enrollment is skipped by the high-water mark.
+    client.post("/admin/sync/loans", json={"events": events[:2]})
 
-    response = client.get("/admin/users")
-    assert response.status_code == 400
-    assert response.json == {"error": "Unable to fetch users"}
+    seen = []
+    url = "/admin/users?limit=3"
+    while url:
+        response = client.get(url)
+        seen += response.json
+        cursor = response.headers.get("X-Next-Cursor")
+        url = response.headers["Link"][1:].split(">")[0] if cursor else None
+    assert [user["id"] for user in seen] == list(range(1, 8))
+
+    response = client.get("/admin/users?q=smith&limit=2")
+    assert [user["id"] for user in response.json] == [1, 3]
+    response = client.get(response.headers["Link"][1:].split(">")[0])
+    assert [user["id"] for user in response.json] == [5, 7]
+    assert [user["id"] for user in client.get("/admin/users?q=user1%40").json] == [1]
+    assert client.get("/admin/users?q=%25").json == []
+
+    response = client.get("/admin/users?stream=true")
+    assert response.is_streamed
+    assert response.headers["X-Synced-Seq"] == "8"
+    assert len(response.json) == 7
 
 
 def test_list_borrowed_books(client):
@@ -123,6 +182,199 @@ def test_list_borrowed_books(client):
     assert response.json[0]["user_email"] == "user@example.com"
 
 
+def seed_loans(count, now):
+    db.session.add_all(
+        [
+            Book(id=i, title=f"Book {i}", author="A", publisher="P", category=cat)
+            for i, cat in ((1, "Drama"), (2, "Poetry"))
+        ]
+    )
+    db.session.execute(
+        insert(BorrowedBook),
+        [
+            {
+                "id": i,
+                "book_id": 1 + i % 2,
+                "user_email": f"user{i % 3}@example.com",
+                "borrow_date": now - timedelta(days=30),
+                "return_date": now + timedelta(days=i - count // 2),
+            }
+            for i in range(1, count + 1)
+        ],
+    )
+    db.session.commit()
+
+
+def count_queries():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    return statements, lambda: event.remove(db.engine, "before_cursor_execute", capture)
+
+
+def test_list_borrowed_books_is_one_query_per_page(client):
+    """Test that a page of loans is loaded with a single joined query."""
+    seed_loans(50, datetime.now())
+    statements, stop = count_queries()
+    try:
+        response = client.get("/admin/borrowed-books?limit=20")
+    finally:
+        stop()
+
+    assert len(response.json) == 20
+    assert len(statements) == 1
+    assert {loan["book_title"] for loan in response.json} == {"Book 1", "Book 2"}
+
+
+def test_list_borrowed_books_pages_and_filters(client):
+    """Test keyset paging combined with the server-side filters."""
+    now = datetime.now()
+    seed_loans(30, now)
+
+    seen = []
+    url = "/admin/borrowed-books?limit=4&overdue=true&user_email=user1@example.com"
+    while url:
+        response = client.get(url)
+        seen += response.json
+        cursor = response.headers.get("X-Next-Cursor")
+        url = response.headers["Link"][1:].split(">")[0] if cursor else None
+
+    expected = [i for i in range(1, 15) if i % 3 == 1]
+    assert [loan["return_date"] for loan in seen] == [
+        (now + timedelta(days=i - 15)).isoformat() for i in expected
+    ]
+    assert {loan["user_email"] for loan in seen} == {"user1@example.com"}
+
+    response = client.get(
+        "/admin/borrowed-books",
+        query_string={
+            "category": "Poetry",
+            "return_before": (now + timedelta(days=-10)).isoformat(),
+        },
+    )
+    # Loans 1 and 3 are due before then and are for the Poetry book.
+    assert [loan["book_id"] for loan in response.json] == [2, 2]
+    assert {loan["category"] for loan in response.json} == {"Poetry"}
+
+    assert client.get("/admin/borrowed-books?overdue=maybe").status_code == 400
+    assert client.get("/admin/borrowed-books?after=nope").status_code == 400
+
+
+def test_list_borrowed_books_uses_loan_indexes(client):
+    """Test the filtered report walks the loan indexes instead of sorting."""
+    statements, stop = count_queries()
+    try:
+        client.get("/admin/borrowed-books?overdue=true")
+        client.get("/admin/borrowed-books?user_email=user1@example.com")
+    finally:
+        stop()
+
+    plans = []
+    for statement in statements:
+        # Parameters don't change the plan, so any values will do.
+        parameters = ("x",) * statement.count("?")
+        plans.append(
+            " ".join(
+                row[3]
+                for row in db.session.connection().exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+            )
+        )
+    assert "ix_borrowedbooks_active_return_date" in plans[0]
+    assert "ix_borrowedbooks_user_email" in plans[1]
+    assert not any("TEMP B-TREE" in plan for plan in plans)
+
+
+def test_export_overdue_loans(client):
+    """Test the overdue export in both formats, oldest due date first."""
+    now = datetime.now()
+    seed_loans(30, now)
+    db.session.get(BorrowedBook, 2).returned_at = now
+    db.session.commit()
+
+    response = client.get("/admin/loans/overdue")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert "attachment" in response.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    # Loans 1-15 are due by now; loan 2 has been returned.
+    assert [int(row["loan_id"]) for row in rows] == [1] + list(range(3, 16))
+    assert rows[0]["days_overdue"] == "14"
+    assert rows[0]["book_title"] == "Book 2"
+
+    response = client.get("/admin/loans/overdue?format=ndjson&category=Poetry")
+    assert response.mimetype == "application/x-ndjson"
+    loans = read_ndjson(response)
+    assert [loan["loan_id"] for loan in loans] == [1, 3, 5, 7, 9, 11, 13, 15]
+    assert {loan["category"] for loan in loans} == {"Poetry"}
+    assert response.headers["X-Overdue-As-Of"] > now.isoformat()
+
+    assert client.get("/admin/loans/overdue?format=xml").status_code == 400
+
+
+def test_export_overdue_loans_reads_the_index_in_chunks(client):
+    """Test that the export walks the due-date index a chunk at a time."""
+    now = datetime.now()
+    seed_loans(30, now)
+    statements, stop = count_queries()
+    try:
+        loans = list(iter_overdue_loans({}, now + timedelta(seconds=1), chunk_size=4))
+    finally:
+        stop()
+
+    assert [loan.id for loan in loans] == list(range(1, 16))
+    selects = [statement for statement in statements if "SELECT" in statement]
+    assert len(selects) == 4
+    for statement in selects:
+        plan = " ".join(
+            row[3]
+            for row in db.session.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", ("x",) * statement.count("?")
+            )
+        )
+        assert "ix_borrowedbooks_active_return_date" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_export_overdue_loans_failure(client, monkeypatch):
+    """Test that an export failing after its first chunk ends with a trailer."""
+    now = datetime.now()
+    seed_loans(30, now)
+    monkeypatch.setattr(
+        admin_routes,
+        "iter_overdue_loans",
+        lambda args, now: iter_overdue_loans(args, now, chunk_size=4),
+    )
+    selects = []
+
+    def fail_second_chunk(conn, cursor, statement, parameters, context, many):
+        if "FROM borrowedbooks" in statement:
+            selects.append(statement)
+            if len(selects) == 2:
+                raise RuntimeError("database is locked")
+
+    event.listen(db.engine, "before_cursor_execute", fail_second_chunk)
+    try:
+        response = client.get("/admin/loans/overdue")
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        assert [int(row[0]) for row in rows[1:-1]] == [1, 2, 3, 4]
+        assert rows[-1][:2] == ["#error", "Stream failed"]
+
+        selects.clear()
+        response = client.get("/admin/loans/overdue?format=ndjson")
+        assert response.status_code == 200
+        lines = read_ndjson(response)
+        assert [loan["loan_id"] for loan in lines[:-1]] == [1, 2, 3, 4]
+        assert lines[-1] == {"error": "Stream failed"}
+    finally:
+        event.remove(db.engine, "before_cursor_execute", fail_second_chunk)
+
+
 def test_list_unavailable_books(client):
     """Test fetching unavailable books."""
     book = Book(
@@ -139,3 +391,614 @@ def test_list_unavailable_books(client):
     assert response.status_code == 200
     assert len(response.json) == 1
     assert response.json[0]["title"] == "Unavailable Book"
+
+
+def test_list_borrowed_books_stream(client):
+    """Test streaming borrowed books matches the buffered response."""
+    book = Book(title="Streamed", author="Alice", publisher="XYZ", category="Drama")
+    db.session.add(book)
+    db.session.commit()
+    db.session.add_all(
+        [
+            BorrowedBook(
+                book_id=book.id,
+                user_email=f"user{i}@example.com",
+                borrow_date=datetime.now(),
+                return_date=datetime.now(),
+            )
+            for i in range(3)
+        ]
+    )
+    db.session.commit()
+
+    response = client.get("/admin/borrowed-books?stream=true")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.json == client.get("/admin/borrowed-books").json
+
+
+def test_list_unavailable_books_stream(client):
+    """Test streaming unavailable books reports the current loan."""
+    lent = Book(title="Lent", author="A", publisher="P", category="C")
+    lost = Book(title="Lost", author="A", publisher="P", category="C", available=False)
+    db.session.add_all([lent, lost])
+    db.session.commit()
+    events = [
+        borrow_event(1, 10, lent.id, "first@example.com"),
+        return_event(2, 10, lent.id),
+        borrow_event(3, 11, lent.id, "latest@example.com"),
+    ]
+    client.post("/admin/sync/loans", json={"events": events})
+
+    response = client.get("/admin/unavailable-books?stream=true")
+    assert response.status_code == 200
+    assert response.json == client.get("/admin/unavailable-books").json
+    assert response.json[0]["borrowed_by"] == "latest@example.com"
+    assert response.json[1]["borrowed_by"] is None
+
+
+def test_streams_report_errors(client, monkeypatch):
+    """Test that streamed reports fail cleanly before and while streaming."""
+    response = client.get("/admin/unavailable-books?stream=true&sort=title")
+    assert response.status_code == 400
+    assert response.json == {"error": "Sort must be one of: id, available_date"}
+
+    db.session.add_all(
+        Book(id=i, title=f"Book {i}", author="A", publisher="P", category="C")
+        for i in (1, 2, 3)
+    )
+    db.session.commit()
+    client.post(
+        "/admin/sync/loans",
+        json={"events": [borrow_event(i, i, i) for i in (1, 2, 3)]},
+    )
+
+    def failing_serialize(row):
+        if row.book_id == 3:
+            raise ValidationError("Book 3 is corrupt")
+        return serialize_loan(row)
+
+    monkeypatch.setattr(admin_routes, "serialize_loan", failing_serialize)
+    body = client.get("/admin/borrowed-books?stream=true").get_data(as_text=True)
+    with pytest.raises(ValueError):
+        json.loads(body)
+    assert not body.rstrip().endswith("]")
+    assert json.loads(body.splitlines()[-1]) == {"error": "Book 3 is corrupt"}
+
+
+def borrow_event(seq, loan_id, book_id, email="reader@example.com"):
+    return {
+        "seq": seq,
+        "action": "borrow",
+        "loan_id": loan_id,
+        "book_id": book_id,
+        "user_email": email,
+        "borrow_date": "2025-01-01T12:00:00",
+        "return_date": "2025-01-08T12:00:00",
+    }
+
+
+def return_event(seq, loan_id, book_id):
+    return {
+        "seq": seq,
+        "action": "return",
+        "loan_id": loan_id,
+        "book_id": book_id,
+        "returned_at": "2025-01-09T12:00:00",
+    }
+
+
+def synced_loan(loan_id, source=""):
+    return BorrowedBook.query.filter_by(source=source, source_loan_id=loan_id).one()
+
+
+def test_sync_loans_borrow_and_return(client):
+    """Test that loan events from the frontend drive the admin reports."""
+    books = [
+        Book(id=i, title=f"Book {i}", author="A", publisher="P", category="C")
+        for i in (1, 2)
+    ]
+    db.session.add_all(books)
+    db.session.commit()
+
+    events = [borrow_event(1, 10, 1), borrow_event(2, 11, 2), return_event(3, 10, 1)]
+    response = client.post("/admin/sync/loans", json={"events": events})
+    assert response.status_code == 200
+    assert response.json["applied"] == 3
+    assert response.json["last_seq"] == 3
+
+    borrowed = client.get("/admin/borrowed-books").json
+    assert [loan["book_id"] for loan in borrowed] == [2]
+    assert borrowed[0]["user_email"] == "reader@example.com"
+    assert [book["id"] for book in client.get("/admin/unavailable-books").json] == [2]
+    assert synced_loan(10).returned_at == datetime(2025, 1, 9, 12)
+    assert db.session.get(SyncState, "frontend_loans").last_seq == 3
+
+
+def test_sync_loans_skips_redelivered_events(client):
+    """Test that events at or below the high-water mark are not reapplied."""
+    db.session.add(Book(id=1, title="T", author="A", publisher="P", category="C"))
+    db.session.commit()
+
+    first = [borrow_event(1, 10, 1), return_event(2, 10, 1)]
+    assert client.post("/admin/sync/loans", json={"events": first}).status_code == 200
+
+    # The same batch again, plus one new loan of the same book.
+    response = client.post(
+        "/admin/sync/loans", json={"events": first + [borrow_event(3, 11, 1)]}
+    )
+    assert response.json["applied"] == 1
+    assert response.json["skipped"] == 2
+    assert BorrowedBook.query.count() == 2
+    db.session.expire_all()
+    assert db.session.get(Book, 1).available is False
+    assert synced_loan(10).returned_at is not None
+
+
+def test_sync_loans_from_a_rebuilt_frontend_start_a_new_stream(client):
+    """Test that a new outbox epoch replaying seq 1 is applied, not skipped."""
+    db.session.add_all(
+        Book(id=i, title=f"Book {i}", author="A", publisher="P", category="C")
+        for i in (1, 2)
+    )
+    db.session.commit()
+
+    old = [
+        dict(event, source="old")
+        for event in (
+            enroll_event(1, 1, "one@example.com"),
+            borrow_event(2, 10, 1),
+            return_event(3, 10, 1),
+        )
+    ]
+    assert client.post("/admin/sync/loans", json={"events": old}).status_code == 200
+
+    # The rebuilt frontend numbers its outbox, users and loans from 1 again.
+    new = [
+        dict(event, source="new")
+        for event in (
+            enroll_event(1, 1, "two@example.com"),
+            borrow_event(2, 10, 2, email="two@example.com"),
+        )
+    ]
+    response = client.post("/admin/sync/loans", json={"events": new})
+    assert response.json["applied"] == 2
+    assert response.json["skipped"] == 0
+
+    assert BorrowedBook.query.count() == 2
+    assert synced_loan(10, "old").returned_at is not None
+    assert synced_loan(10, "new").book_id == 2
+    assert synced_loan(10, "new").returned_at is None
+    emails = [user["email"] for user in client.get("/admin/users").json]
+    assert sorted(emails) == ["one@example.com", "two@example.com"]
+    assert db.session.get(SyncState, "frontend_loans/old").last_seq == 3
+    assert db.session.get(SyncState, "frontend_loans/new").last_seq == 2
+
+    mixed = [dict(borrow_event(3, 11, 1), source="new"), return_event(4, 11, 1)]
+    response = client.post("/admin/sync/loans", json={"events": mixed})
+    assert response.status_code == 400
+
+
+def test_sync_loans_reports_malformed_events(client):
+    """Test that a bad event is rejected without blocking the ones after it."""
+    db.session.add(Book(id=1, title="T", author="A", publisher="P", category="C"))
+    db.session.commit()
+
+    events = [{"seq": 1, "action": "borrow", "loan_id": 10}, borrow_event(2, 11, 1)]
+    response = client.post("/admin/sync/loans", json={"events": events})
+    assert response.status_code == 200
+    assert response.json["applied"] == 1
+    assert response.json["rejected"] == [
+        {"seq": 1, "error": "Loan events need integer loan_id and book_id"}
+    ]
+    assert response.json["last_seq"] == 2
+
+
+def test_sync_loans_requires_ordered_sequence_numbers(client):
+    """Test that batches without increasing seq numbers are refused."""
+    for events in ([return_event(2, 1, 1), return_event(1, 2, 1)], [{"a": 1}]):
+        response = client.post("/admin/sync/loans", json={"events": events})
+        assert response.status_code == 400
+    assert db.session.get(SyncState, "frontend_loans") is None
+
+
+def loan_event(seq, loan_id, book_id, borrowed, returned=None):
+    if returned:
+        return {
+            "seq": seq,
+            "action": "return",
+            "loan_id": loan_id,
+            "book_id": book_id,
+            "returned_at": returned,
+        }
+    event = borrow_event(seq, loan_id, book_id)
+    event["borrow_date"] = borrowed
+    event["return_date"] = borrowed.replace("-01T", "-15T")
+    return event
+
+
+def seed_loan_stats(client):
+    """Three loans in March 2025; two come back on the 3rd."""
+    db.session.add_all(
+        [
+            Book(id=1, title="A", author="A", publisher="Wiley", category="Science"),
+            Book(id=2, title="B", author="A", publisher="Wiley", category="Fiction"),
+            Book(id=3, title="C", author="A", publisher="Manning", category="Science"),
+        ]
+    )
+    db.session.commit()
+
+    events = [
+        loan_event(1, 10, 1, "2025-03-01T09:00:00"),
+        loan_event(2, 11, 2, "2025-03-01T10:00:00"),
+        loan_event(3, 12, 3, "2025-03-02T09:00:00"),
+        loan_event(4, 10, 1, "2025-03-01T09:00:00", returned="2025-03-03T09:00:00"),
+        loan_event(5, 12, 3, "2025-03-02T09:00:00", returned="2025-03-03T09:00:00"),
+        # Unknown loans and loans returned twice are not counted again.
+        loan_event(6, 99, 1, "2025-03-01T09:00:00", returned="2025-03-03T09:00:00"),
+        loan_event(7, 10, 1, "2025-03-01T09:00:00", returned="2025-03-04T09:00:00"),
+    ]
+    assert client.post("/admin/sync/loans", json={"events": events}).status_code == 200
+    # A redelivered batch is skipped before it reaches the rollup.
+    client.post("/admin/sync/loans", json={"events": events})
+
+
+def test_loan_stats_follow_loan_events(client):
+    """Test that borrows and returns are rolled up as they are applied."""
+    seed_loan_stats(client)
+
+    response = client.get("/admin/stats")
+    assert response.status_code == 200
+    assert response.json == [
+        {"day": "2025-03-01", "borrows": 2, "returns": 0, "average_loan_days": None},
+        {"day": "2025-03-02", "borrows": 1, "returns": 0, "average_loan_days": None},
+        {"day": "2025-03-03", "borrows": 0, "returns": 2, "average_loan_days": 1.5},
+    ]
+
+    response = client.get(
+        "/admin/stats",
+        query_string={
+            "start": "2025-03-02",
+            "end": "2025-03-31",
+            "group_by": "category,publisher",
+        },
+    )
+    assert response.json == [
+        {
+            "category": "Science",
+            "publisher": "Manning",
+            "borrows": 1,
+            "returns": 1,
+            "average_loan_days": 1.0,
+        },
+        {
+            "category": "Science",
+            "publisher": "Wiley",
+            "borrows": 0,
+            "returns": 1,
+            "average_loan_days": 2.0,
+        },
+    ]
+
+    response = client.get("/admin/stats?group_by=&publisher=Wiley")
+    assert response.json == [{"borrows": 2, "returns": 1, "average_loan_days": 2.0}]
+
+    assert client.get("/admin/stats?group_by=author").status_code == 400
+    assert client.get("/admin/stats?start=2025-03-02&end=2025-03-01").status_code == 400
+
+
+def test_loan_stats_backfill_matches_incremental_rollup(client):
+    """Test that rebuilding from history gives the rollup the events built."""
+    seed_loan_stats(client)
+    url = "/admin/stats?group_by=day,category,publisher"
+    incremental = client.get(url).json
+
+    result = client.application.test_cli_runner().invoke(args=["backfill-loan-stats"])
+    assert result.exit_code == 0
+    assert "Wrote 5 loan stats rows" in result.output
+    assert client.get(url).json == incremental
+
+
+def test_loan_stats_read_only_the_rollup(client):
+    """Test that a date range is answered from the rollup's primary key."""
+    statements, stop = count_queries()
+    try:
+        client.get("/admin/stats?start=2025-03-01&end=2025-03-31&group_by=day")
+    finally:
+        stop()
+
+    assert len(statements) == 1
+    plan = " ".join(
+        row[3]
+        for row in db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statements[0]}",
+            ("2025-03-01", "2025-03-31"),
+        )
+    )
+    assert "SEARCH loan_stats" in plan
+    assert "day>? AND day<?" in plan
+    assert "borrowedbooks" not in plan
+
+
+def seed_unavailable_books(client):
+    """Books 1-4 are out, due in reverse order; 5 and 6 are simply unavailable."""
+    db.session.add_all(
+        [
+            Book(id=i, title=f"Book {i}", author="A", publisher="P", category="C")
+            for i in range(1, 7)
+        ]
+    )
+    db.session.commit()
+    events = [borrow_event(i, 10 + i, i) for i in range(1, 5)]
+    for event in events:
+        event["return_date"] = f"2025-01-{10 - event['seq']:02d}T12:00:00"
+    events += [return_event(5, 14, 4), borrow_event(6, 15, 4)]
+    client.post("/admin/sync/loans", json={"events": events})
+    for book_id in (5, 6):
+        db.session.get(Book, book_id).available = False
+    db.session.commit()
+
+
+def read_pages(client, url):
+    rows, queries = [], []
+    while url:
+        statements, stop = count_queries()
+        try:
+            response = client.get(url)
+        finally:
+            stop()
+        queries.append(len(statements))
+        rows += response.json
+        cursor = response.headers.get("X-Next-Cursor")
+        url = response.headers["Link"][1:].split(">")[0] if cursor else None
+    return rows, queries
+
+
+def test_list_unavailable_books_by_available_date(client):
+    """Test sorting by due date pages through loans, then books with none."""
+    seed_unavailable_books(client)
+
+    rows, queries = read_pages(
+        client, "/admin/unavailable-books?sort=available_date&limit=2"
+    )
+    # Book 4 was returned and lent again, so only its new loan counts.
+    assert [book["id"] for book in rows] == [3, 2, 4, 1, 5, 6]
+    assert [book["available_date"] for book in rows] == [
+        "2025-01-07T12:00:00",
+        "2025-01-08T12:00:00",
+        "2025-01-08T12:00:00",
+        "2025-01-09T12:00:00",
+        None,
+        None,
+    ]
+    # A page that runs past the last loan costs one more query.
+    assert queries == [1, 2, 2]
+
+    rows, queries = read_pages(client, "/admin/unavailable-books?limit=4")
+    assert [book["id"] for book in rows] == [1, 2, 3, 4, 5, 6]
+    assert queries == [1, 1]
+
+    assert client.get("/admin/unavailable-books?sort=title").status_code == 400
+    assert client.get("/admin/unavailable-books?after=nope").status_code == 400
+
+
+def test_list_unavailable_books_uses_indexes(client):
+    """Test neither sort order needs a temporary B-tree."""
+    statements, stop = count_queries()
+    try:
+        client.get("/admin/unavailable-books")
+        client.get("/admin/unavailable-books?sort=available_date")
+    finally:
+        stop()
+
+    plans = [
+        " ".join(
+            row[3]
+            for row in db.session.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", ("x",) * statement.count("?")
+            )
+        )
+        for statement in statements
+    ]
+    assert "ix_books_available" in plans[0]
+    assert "ix_borrowedbooks_active_return_date" in plans[1]
+    assert not any("TEMP B-TREE" in plan for plan in plans)
+
+
+def test_list_user_loans(client):
+    """Test borrowers are listed with their open loans, a page per query."""
+    db.session.add_all(
+        [
+            Book(id=i, title=f"Book {i}", author="A", publisher="P", category="C")
+            for i in range(1, 6)
+        ]
+    )
+    db.session.commit()
+    events = [enroll_event(i, i, f"user{i}@example.com") for i in range(1, 6)]
+    events += [
+        borrow_event(6, 10, 1, "user1@example.com"),
+        borrow_event(7, 11, 2, "user3@example.com"),
+        borrow_event(8, 12, 3, "user1@example.com"),
+        borrow_event(9, 13, 4, "user4@example.com"),
+        borrow_event(10, 14, 5, "user5@example.com"),
+        return_event(11, 13, 4),
+    ]
+    client.post("/admin/sync/loans", json={"events": events})
+
+    users, queries = read_pages(client, "/admin/users/loans?limit=2")
+    # User 2 never borrowed and user 4 has returned everything.
+    assert [user["id"] for user in users] == [1, 3, 5]
+    assert [loan["book_id"] for loan in users[0]["loans"]] == [1, 3]
+    assert users[1]["loans"] == [
+        {
+            "book_id": 2,
+            "book_title": "Book 2",
+            "borrow_date": "2025-01-01T12:00:00",
+            "return_date": "2025-01-08T12:00:00",
+        }
+    ]
+    assert queries == [1, 1]
+
+    response = client.get("/admin/users/loans?stream=true")
+    assert response.is_streamed
+    assert response.json == users
+    assert client.get("/admin/users/loans?after=nope").status_code == 400
+
+
+def test_list_user_loans_with_unknown_books(client, monkeypatch):
+    """Test a borrower whose only loan is of a book we lack still pages."""
+    db.session.add_all(
+        [
+            Book(id=i, title=f"Book {i}", author="A", publisher="P", category="C")
+            for i in range(1, 6)
+        ]
+    )
+    db.session.commit()
+    events = [enroll_event(i, i, f"user{i}@example.com") for i in range(1, 6)]
+    events += [
+        borrow_event(5 + i, 10 + i, 99 if i == 2 else i, f"user{i}@example.com")
+        for i in range(1, 6)
+    ]
+    client.post("/admin/sync/loans", json={"events": events})
+
+    users, _ = read_pages(client, "/admin/users/loans?limit=2")
+    assert [user["id"] for user in users] == [1, 2, 3, 4, 5]
+    assert users[1]["loans"][0]["book_id"] == 99
+    assert users[1]["loans"][0]["book_title"] is None
+
+    # Streamed two borrowers at a time, too.
+    monkeypatch.setattr(admin_routes, "STREAM_BATCH_SIZE", 2)
+    assert client.get("/admin/users/loans?stream=true").json == users
+
+
+def test_list_user_loans_uses_indexes(client):
+    """Test the report walks users in id order and looks loans up by email."""
+    statements, stop = count_queries()
+    try:
+        client.get("/admin/users/loans?limit=10")
+    finally:
+        stop()
+
+    plan = " ".join(
+        row[3]
+        for row in db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statements[0]}", ("x",) * statements[0].count("?")
+        )
+    )
+    assert "ix_borrowedbooks_user_email" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_import_books_csv(client):
+    """Test a streamed CSV import with chunked inserts and row errors."""
+    lines = ["title,author,publisher,category"]
+    lines += [f"Title {i},Author,Pub,Cat" for i in range(2500)]
+    lines.insert(10, ",Author,Pub,Cat")
+    lines.insert(20, f"{'x' * 201},Author,Pub,Cat")
+    body = io.BytesIO("\n".join(lines).encode())
+
+    response = client.post("/admin/books/import", data=body, content_type="text/csv")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+
+    messages = read_ndjson(response)
+    assert [m["error"] for m in messages if "error" in m] == [
+        {"line": 11, "message": "Missing required field: title"},
+        {"line": 21, "message": "Field too long: title"},
+    ]
+    progress = [m["progress"]["imported"] for m in messages if "progress" in m]
+    assert progress == [1000, 2000, 2500]
+    assert messages[-1] == {"summary": {"rows": 2502, "imported": 2500, "failed": 2}}
+
+    assert Book.query.count() == 2500
+    # Every imported book is queued for the frontend.
+    assert SyncOutbox.query.count() == 2500
+    first = db.session.get(SyncOutbox, 1).payload
+    book = db.session.get(Book, first["book"]["id"])
+    assert first == {
+        "action": "add",
+        "book": {
+            "id": book.id,
+            "title": "Title 0",
+            "author": "Author",
+            "publisher": "Pub",
+            "category": "Cat",
+        },
+    }
+
+
+def test_import_books_ndjson(client):
+    """Test an NDJSON import reports malformed lines and imports the rest."""
+    body = "\n".join(
+        [
+            json.dumps(
+                {"title": "A", "author": "B", "publisher": "C", "category": "D"}
+            ),
+            "{not json",
+            "",
+            json.dumps(["not", "an", "object"]),
+            json.dumps(
+                {"title": "E", "author": "F", "publisher": "G", "category": "H"}
+            ),
+        ]
+    )
+    response = client.post(
+        "/admin/books/import", data=body, content_type="application/x-ndjson"
+    )
+
+    messages = read_ndjson(response)
+    assert [m["error"]["line"] for m in messages if "error" in m] == [2, 4]
+    assert messages[-1] == {"summary": {"rows": 4, "imported": 2, "failed": 2}}
+    assert sorted(book.title for book in Book.query) == ["A", "E"]
+
+
+def test_import_books_rejects_bad_uploads(client):
+    """Test unsupported formats and incomplete CSV headers fail up front."""
+    response = client.post(
+        "/admin/books/import", data="{}", content_type="application/json"
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/admin/books/import", data="title,author\nA,B\n", content_type="text/csv"
+    )
+    assert response.status_code == 400
+    assert response.json == {"error": "CSV header is missing: publisher, category"}
+    assert Book.query.count() == 0
+
+
+def test_books_snapshot_and_catch_up(client):
+    """Test the compressed snapshot is tagged with the events it covers."""
+    for i in range(3):
+        client.post(
+            "/admin/books",
+            json={"title": f"T{i}", "author": "A", "publisher": "P", "category": "C"},
+        )
+    client.delete("/admin/books/2")
+
+    response = client.get("/admin/books/snapshot")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["X-Snapshot-Seq"] == "4"
+    lines = [json.loads(line) for line in gzip.decompress(response.data).splitlines()]
+    assert lines[0]["snapshot"]["seq"] == 4
+    assert [book["id"] for book in lines[1:-1]] == [1, 3]
+    assert lines[1]["title"] == "T0"
+    assert lines[-1]["end"] == {"seq": 4, "count": 2}
+
+    client.post(
+        "/admin/books",
+        json={"title": "Later", "author": "A", "publisher": "P", "category": "C"},
+    )
+    response = client.get("/admin/sync/books/events?after=4")
+    assert [event["seq"] for event in response.json["events"]] == [5]
+    assert response.json["events"][0]["book"]["title"] == "Later"
+    assert response.json["last_seq"] == 5
+    assert client.get("/admin/sync/books/events?after=5").json == {
+        "events": [],
+        "last_seq": 5,
+    }
+    assert client.get("/admin/sync/books/events?after=x").status_code == 400
@@ -0,0 +1,128 @@
+from datetime import datetime
+
+import pytest
+from app import create_app, db
+from app.models.book import Book, BorrowedBook
+from app.utils.bus import get_event_bus
+from app.utils.frontend import publish_catalogue_events
+from app.utils.loans import apply_loan_batch
+from app.workers.bus_consumer import BusConsumer
+from app.workers.outbox_dispatcher import OutboxDispatcher
+from app.workers.runner import start_workers, stop_workers
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """Flask app with a test database and an in-memory event bus."""
+    monkeypatch.setenv("FLASK_EVENT_BUS_URL", "memory://")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        bus = get_event_bus()
+        yield app
+        for topic in ("catalogue", "loans"):
+            purge(bus, topic)
+        bus.close()
+        db.session.remove()
+        db.drop_all()
+
+
+def purge(bus, topic):
+    with bus.connect() as connection:
+        for queue in bus.queues(topic):
+            queue.bind(connection.default_channel).purge()
+
+
+def collect(app, bus, topic):
+    """Read every queued event, partition by partition."""
+    events = {}
+    for partition in range(bus.partition_count(topic)):
+        batch = events.setdefault(partition, [])
+        consumer = BusConsumer(app, bus, topic, batch.extend, [partition])
+        consumer.drain()
+        consumer.stop()
+    return {partition: batch for partition, batch in events.items() if batch}
+
+
+def loan(seq, loan_id, book_id, action="borrow"):
+    event = {"seq": seq, "action": action, "loan_id": loan_id, "book_id": book_id}
+    if action == "borrow":
+        event.update(
+            user_email="reader@example.com",
+            borrow_date="2025-01-01T12:00:00",
+            return_date="2025-01-08T12:00:00",
+        )
+    else:
+        event["returned_at"] = "2025-01-09T12:00:00"
+    return event
+
+
+def test_dispatcher_publishes_catalogue_changes_by_book(app):
+    """Test that the outbox goes to the bus, one partition per book."""
+    client = app.test_client()
+    ids = [
+        client.post(
+            "/admin/books",
+            json={"title": f"T{i}", "author": "A", "publisher": "P", "category": "C"},
+        ).json["book"]["id"]
+        for i in range(8)
+    ]
+    client.delete(f"/admin/books/{ids[0]}")
+
+    dispatcher = OutboxDispatcher(
+        app, send=publish_catalogue_events, clock=datetime.now
+    )
+    assert dispatcher.drain() == 9
+
+    bus = get_event_bus()
+    published = collect(app, bus, "catalogue")
+    assert len(published) > 1
+    assert sum(len(events) for events in published.values()) == 9
+    for partition, events in published.items():
+        for event in events:
+            book_id = event.get("book_id") or event["book"]["id"]
+            assert bus.partition_for("catalogue", book_id) == partition
+
+    first_book = [
+        event["action"]
+        for event in published[bus.partition_for("catalogue", ids[0])]
+        if ids[0] in (event.get("book_id"), event.get("book", {}).get("id"))
+    ]
+    assert first_book == ["add", "delete"]
+
+
+def test_loan_consumer_applies_redelivered_batches_once(app):
+    """Test that a batch published twice is only applied once."""
+    db.session.add(Book(id=1, title="T", author="A", publisher="P", category="C"))
+    db.session.commit()
+
+    bus = get_event_bus()
+    first = [loan(1, 10, 1), loan(2, 10, 1, action="return")]
+    bus.publish("loans", first)
+    # The frontend lost the acknowledgement and sent the batch again,
+    # followed by a new loan.
+    bus.publish("loans", first + [loan(3, 11, 1)])
+
+    consumer = BusConsumer(app, bus, "loans", apply_loan_batch)
+    assert consumer.drain() == 5
+    consumer.stop()
+
+    assert BorrowedBook.query.count() == 2
+    loan_10 = BorrowedBook.query.filter_by(source_loan_id=10).one()
+    assert loan_10.returned_at == datetime(2025, 1, 9, 12)
+    assert db.session.get(Book, 1).available is False
+
+
+def test_workers_only_start_when_asked(monkeypatch):
+    """Test that building the app, as CLI commands do, starts no consumers."""
+    monkeypatch.setenv("FLASK_EVENT_BUS_URL", "memory://")
+    monkeypatch.setenv("FLASK_LOAN_CONSUMER_ENABLED", "true")
+    app = create_app()
+    assert "loan_consumers" not in app.extensions
+
+    assert start_workers(app) == ["loan_consumers"]
+    consumers = app.extensions["loan_consumers"]
+    assert all(consumer._thread.is_alive() for consumer in consumers)
+    stop_workers(app)
+    assert not any(consumer._thread.is_alive() for consumer in consumers)
+    app.extensions["event_bus"].close()
@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from app import create_app
+from app.utils.http import (
+    CircuitBreaker,
+    CircuitOpenError,
+    PoolExhaustedError,
+    ServiceClient,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(0.5)
+        status = 503 if self.path == "/down" else 200
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Local keep-alive HTTP server standing in for the frontend."""
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused(server):
+    """Test sequential calls share one keep-alive connection."""
+    client = ServiceClient(server)
+    for _ in range(5):
+        assert client.get("/users").json() == {"path": "/users"}
+
+    stats = client.stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["idle_connections"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_read_timeout(server):
+    """Test a slow response fails with the per-call timeout, without retries."""
+    client = ServiceClient(server)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get("/slow", timeout=(1, 0.1))
+    assert client.stats()["failures"] == 1
+    pools = client.adapter.poolmanager.pools
+    assert sum(pools.get(key).num_requests for key in pools.keys()) == 1
+
+
+def test_gateway_errors_are_retried(server):
+    """Test GETs are retried a bounded number of times on 503."""
+    client = ServiceClient(server, retries=2, backoff_factor=0)
+    response = client.get("/down")
+    assert response.status_code == 503
+    # One call from our side, three attempts on the wire over one connection.
+    assert client.stats()["requests"] == 1
+    pools = client.adapter.poolmanager.pools
+    assert sum(pools.get(key).num_requests for key in pools.keys()) == 3
+
+
+def test_pool_is_bounded(server):
+    """Test callers give up when every pooled connection is busy."""
+    client = ServiceClient(server, pool_size=1, pool_timeout=0.05)
+    slow = threading.Thread(target=client.get, args=("/slow",))
+    slow.start()
+    time.sleep(0.1)
+    assert client.stats()["utilisation"] == 1.0
+
+    with pytest.raises(PoolExhaustedError):
+        client.get("/users")
+    slow.join()
+    assert client.stats()["pool_waits"] == 1
+    assert client.stats()["in_flight"] == 0
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test the breaker fails fast while open and lets one trial through."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=2, reset_timeout=30, clock=clock)
+    client = ServiceClient("http://127.0.0.1:1", retries=0, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get("/users")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.get("/users")
+    assert breaker.rejected == 1
+
+    clock.now = 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one trial call at a time while half open.
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_trial_that_raises_something_else_still_ends(server, monkeypatch):
+    """Test that a half-open trial raising a non-requests error re-opens."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=1, reset_timeout=30, clock=clock)
+    client = ServiceClient(server, retries=0, breaker=breaker)
+    breaker.record_failure()
+    clock.now = 30
+
+    def explode(*args, **kwargs):
+        raise ValueError("bad response")
+
+    monkeypatch.setattr(client.session, "request", explode)
+    with pytest.raises(ValueError):
+        client.get("/users")
+    assert breaker.state == "open"
+    assert client.stats()["in_flight"] == 0
+
+    # The next trial is let through once the timeout passes again.
+    monkeypatch.undo()
+    clock.now = 60
+    assert client.get("/users").status_code == 200
+    assert breaker.state == "closed"
+
+
+def test_frontend_client_metrics():
+    """Test the frontend client's pool metrics are exposed."""
+    app = create_app()
+    response = app.test_client().get("/admin/metrics/frontend-client")
+    assert response.status_code == 200
+    assert response.json["pool_size"] == app.config["FRONTEND_POOL_SIZE"]
+    assert response.json["circuit"]["state"] == "closed"
+    assert response.json["utilisation"] == 0.0
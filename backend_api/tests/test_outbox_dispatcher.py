@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+from app import create_app, db
+from app.models.outbox import SyncOutbox
+from app.workers.outbox_dispatcher import OutboxDispatcher
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+class FakeFrontend:
+    def __init__(self):
+        self.batches = []
+        self.failures = 0
+
+    def __call__(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise requests.exceptions.ConnectionError("frontend is down")
+        self.batches.append(events)
+        return [{"status": "added"} for _ in events]
+
+
+@pytest.fixture
+def app():
+    """Flask app with a test database."""
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(datetime(2025, 1, 1, 12, 0))
+
+
+def queue_events(count, clock):
+    db.session.add_all(
+        [
+            SyncOutbox(
+                payload={"action": "delete", "book_id": i},
+                created_at=clock.now,
+                next_attempt_at=clock.now,
+            )
+            for i in range(count)
+        ]
+    )
+    db.session.commit()
+
+
+def test_drains_outbox_in_order_and_in_batches(app, clock):
+    """Test that pending events are delivered oldest first, batch by batch."""
+    queue_events(5, clock)
+    frontend = FakeFrontend()
+    dispatcher = OutboxDispatcher(app, send=frontend, clock=clock, batch_size=2)
+
+    assert dispatcher.drain() == 5
+    assert [len(batch) for batch in frontend.batches] == [2, 2, 1]
+    assert [e["book_id"] for batch in frontend.batches for e in batch] == [
+        0,
+        1,
+        2,
+        3,
+        4,
+    ]
+    assert SyncOutbox.query.filter(SyncOutbox.dispatched_at.is_(None)).count() == 0
+    assert dispatcher.drain() == 0
+
+
+def test_failed_delivery_is_retried_with_backoff(app, clock):
+    """Test that a failed batch stays queued and backs off exponentially."""
+    queue_events(3, clock)
+    frontend = FakeFrontend()
+    frontend.failures = 2
+    dispatcher = OutboxDispatcher(
+        app, send=frontend, clock=clock, batch_size=10, base_backoff=2
+    )
+
+    assert dispatcher.drain() == 0
+    assert dispatcher.seconds_until_next_attempt() == 2
+    entry = db.session.get(SyncOutbox, 1)
+    assert entry.attempts == 1
+    assert "frontend is down" in entry.last_error
+
+    # Not due yet, so nothing is sent.
+    assert dispatcher.drain() == 0
+    assert frontend.failures == 1
+
+    clock.advance(seconds=2)
+    assert dispatcher.drain() == 0
+    assert dispatcher.seconds_until_next_attempt() == 4
+
+    clock.advance(seconds=4)
+    assert dispatcher.drain() == 3
+    assert [e["book_id"] for e in frontend.batches[0]] == [0, 1, 2]
+    db.session.expire_all()
+    assert db.session.get(SyncOutbox, 1).attempts == 3
+
+
+def test_admin_changes_reach_frontend_through_outbox(app, clock):
+    """Test the add/remove flow from admin request to frontend delivery."""
+    frontend = FakeFrontend()
+    dispatcher = OutboxDispatcher(app, send=frontend, clock=datetime.now)
+    client = app.test_client()
+
+    book_id = client.post(
+        "/admin/books",
+        json={"title": "T", "author": "A", "publisher": "P", "category": "C"},
+    ).json["book"]["id"]
+    client.delete(f"/admin/books/{book_id}")
+
+    assert frontend.batches == []
+    assert dispatcher.drain() == 2
+    assert [event["action"] for event in frontend.batches[0]] == ["add", "delete"]
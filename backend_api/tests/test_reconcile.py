@@ -0,0 +1,132 @@
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+import requests_mock
+from sqlalchemy import insert
+from app import create_app, db
+from app.models.book import Book
+from app.models.outbox import SyncOutbox
+from app.utils.reconcile import reconcile_catalogue
+
+FRONTEND_DIGEST = "http://frontend_api:5000/sync/books/digest"
+
+
+@pytest.fixture
+def apps(monkeypatch, tmp_path):
+    """The backend under test, plus a second app standing in for the frontend.
+
+    The stand-in has its own database and answers digest requests with the
+    same code the frontend runs.
+    """
+    app = create_app()
+    monkeypatch.setenv("FLASK_SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path}/f.db")
+    frontend = create_app()
+    for each in (app, frontend):
+        with each.app_context():
+            db.create_all()
+    with app.app_context():
+        yield app, frontend
+        db.session.remove()
+    for each in (app, frontend):
+        with each.app_context():
+            db.drop_all()
+
+
+def seed(app, books):
+    with app.app_context():
+        db.session.execute(insert(Book), books)
+        db.session.commit()
+
+
+def catalogue(count):
+    return [
+        {"id": i, "title": f"T{i}", "author": "A", "publisher": "P", "category": "C"}
+        for i in range(1, count + 1)
+    ]
+
+
+def serve_digests(frontend, calls):
+    def answer(request, context):
+        calls.append(request.qs)
+        query = dict(parse_qsl(urlsplit(request.url).query))
+        response = frontend.test_client().get("/admin/books/digest", query_string=query)
+        context.status_code = response.status_code
+        return response.json
+
+    return answer
+
+
+def test_matching_catalogues_need_one_round(apps):
+    """Test that agreeing catalogues are checked with the root digests only."""
+    app, frontend = apps
+    seed(app, catalogue(500))
+    seed(frontend, catalogue(500))
+
+    calls = []
+    with requests_mock.Mocker() as mock:
+        mock.get(FRONTEND_DIGEST, json=serve_digests(frontend, calls))
+        summary = reconcile_catalogue(parts=4, leaf_size=10)
+
+    assert len(calls) == 1
+    assert summary == {"ranges": 1, "rows": 0, "added": 0, "updated": 0, "deleted": 0}
+    assert SyncOutbox.query.count() == 0
+
+
+def test_only_differing_rows_are_repaired(apps):
+    """Test that mismatched ranges are narrowed down to the rows that differ."""
+    app, frontend = apps
+    books = catalogue(500)
+    seed(app, books)
+    drifted = [dict(book) for book in books if book["id"] != 321]
+    drifted[41]["title"] = "Renamed"  # book 42
+    drifted.append({**books[0], "id": 900})
+    seed(frontend, drifted)
+
+    calls = []
+    with requests_mock.Mocker() as mock:
+        mock.get(FRONTEND_DIGEST, json=serve_digests(frontend, calls))
+        summary = reconcile_catalogue(parts=4, leaf_size=10)
+
+    assert summary["added"] == summary["updated"] == summary["deleted"] == 1
+    # Three leaves of a handful of rows were compared, not 500 books.
+    assert sum(1 for call in calls if "rows" in call) == 3
+    assert summary["rows"] < 30
+
+    payloads = [entry.payload for entry in SyncOutbox.query.order_by(SyncOutbox.id)]
+    assert sorted(
+        (p["action"], p.get("book_id") or p["book"]["id"]) for p in payloads
+    ) == [
+        ("add", 321),
+        ("delete", 900),
+        ("update", 42),
+    ]
+    update = next(p for p in payloads if p["action"] == "update")
+    assert update["book"]["title"] == "T42"
+
+
+def test_reconcile_route_reports_unreachable_frontend(apps):
+    """Test that a frontend outage is reported instead of raising."""
+    app, _ = apps
+    with requests_mock.Mocker() as mock:
+        mock.get(FRONTEND_DIGEST, status_code=503)
+        response = app.test_client().post("/admin/sync/reconcile")
+    assert response.status_code == 502
+
+
+def test_digest_endpoint(apps):
+    """Test range digests and per-row hashes served by the backend."""
+    app, _ = apps
+    seed(app, catalogue(20))
+    client = app.test_client()
+
+    whole = client.get("/admin/books/digest?parts=1").json
+    assert whole["end"] == 21
+    assert whole["ranges"][0]["count"] == 20
+    halves = client.get("/admin/books/digest?start=0&end=21&parts=2").json["ranges"]
+    assert [r["count"] for r in halves] == [10, 10]
+    assert halves[0]["digest"] != halves[1]["digest"]
+
+    rows = client.get("/admin/books/digest?start=5&end=8&rows=true").json["rows"]
+    assert [book_id for book_id, _ in rows] == [5, 6, 7]
+    assert client.get("/admin/books/digest?parts=0").status_code == 400
+    assert client.get("/admin/books/digest?start=x").status_code == 400
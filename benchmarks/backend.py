@@ -0,0 +1,144 @@
+"""Benchmarks for the backend API; started by ``run.py`` in its own process."""
+
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import harness
+
+
+def seed(db, config, rng):
+    """Fill the catalogue, user directory and loan history.
+
+    Half the loans are still out, one per book from the start of the
+    catalogue, due within a week either side of now; the rest are returned
+    loans spread over the last 90 days. The stats rollup is backfilled
+    from them. Returns the number of overdue loans.
+    """
+    from sqlalchemy import insert
+
+    from app.models.book import Book, BorrowedBook
+    from app.models.user import User
+    from app.utils.stats import backfill_loan_stats
+
+    now = datetime.now()
+    active = config["loans"] // 2
+    books = harness.book_rows(rng, config["books"])
+    for book in books:
+        out = book["id"] <= active
+        book.update(available=not out, current_loan_id=book["id"] if out else None)
+    for chunk in harness.chunks(books):
+        db.session.execute(insert(Book), chunk)
+
+    db.session.execute(
+        insert(User),
+        [
+            {
+                "id": user_id,
+                "email": f"reader{user_id}@example.com",
+                "firstname": "Reader",
+                "lastname": str(user_id),
+                "enrolled_at": now - timedelta(days=365),
+            }
+            for user_id in range(1, config["users"] + 1)
+        ],
+    )
+
+    loans = []
+    for loan_id in range(1, config["loans"] + 1):
+        borrowed = now - timedelta(days=rng.uniform(0, 90))
+        loan = {
+            "id": loan_id,
+            "user_email": f"reader{rng.randint(1, config['users'])}@example.com",
+        }
+        if loan_id <= active:
+            loan.update(
+                book_id=loan_id,
+                borrow_date=now - timedelta(days=14),
+                return_date=now + timedelta(days=rng.uniform(-7, 7)),
+                returned_at=None,
+            )
+        else:
+            loan.update(
+                book_id=rng.randint(1, config["books"]),
+                borrow_date=borrowed,
+                return_date=borrowed + timedelta(days=14),
+                returned_at=borrowed + timedelta(days=rng.uniform(1, 21)),
+            )
+        loans.append(loan)
+    for chunk in harness.chunks(loans):
+        db.session.execute(insert(BorrowedBook), chunk)
+
+    backfill_loan_stats()
+    db.session.commit()
+    return sum(1 for loan in loans[:active] if loan["return_date"] < now)
+
+
+def scenarios(client, config, rng, overdue):
+    today = datetime.now().date()
+
+    def get(url, **query):
+        return lambda i: harness.expect(client.get(url, query_string=query))
+
+    def search_users(i):
+        harness.expect(
+            client.get(f"/admin/users?q=reader{rng.randint(1, config['users'])}")
+        )
+
+    return [
+        ("GET /admin/borrowed-books", get("/admin/borrowed-books", limit=100), {}),
+        (
+            "GET /admin/borrowed-books?overdue",
+            get("/admin/borrowed-books", overdue="true", limit=100),
+            {},
+        ),
+        (
+            "GET /admin/unavailable-books?sort=available_date",
+            get("/admin/unavailable-books", sort="available_date", limit=100),
+            {},
+        ),
+        ("GET /admin/users?q", search_users, {}),
+        ("GET /admin/users/loans", get("/admin/users/loans", limit=50), {}),
+        (
+            "GET /admin/stats",
+            get(
+                "/admin/stats",
+                start=(today - timedelta(days=30)).isoformat(),
+                end=today.isoformat(),
+                group_by="day,category",
+            ),
+            {},
+        ),
+        # A full export each time, so only a few of them.
+        (
+            "GET /admin/loans/overdue",
+            get("/admin/loans/overdue", format="ndjson"),
+            {"share": 0.05, "warmup": 1, "items": max(1, overdue)},
+        ),
+    ]
+
+
+def main():
+    config = json.loads(sys.argv[1])
+    rng = random.Random(config["seed"])
+
+    service = harness.load_service("backend")
+    app = service.create_app()
+    with app.app_context():
+        service.db.create_all()
+        started = time.perf_counter()
+        overdue = seed(service.db, config, rng)
+        seed_seconds = time.perf_counter() - started
+        harness.log(f"backend: seeded in {seed_seconds:.1f}s")
+
+        client = app.test_client()
+        results = harness.run_scenarios(
+            scenarios(client, config, rng, overdue), config["iterations"]
+        )
+    harness.report(seed_seconds, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Benchmarks for the frontend API; started by ``run.py`` in its own process."""
+
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import harness
+
+
+def seed(db, config, rng):
+    """Fill the catalogue, enroll users and put ``loans`` books out on loan."""
+    from sqlalchemy import insert, update
+
+    from app.models.book import Book, BorrowedBook
+    from app.models.user import User
+
+    books = harness.book_rows(rng, config["books"])
+    for chunk in harness.chunks(books):
+        db.session.execute(insert(Book), chunk)
+    db.session.execute(
+        insert(User),
+        [
+            {
+                "id": user_id,
+                "email": f"reader{user_id}@example.com",
+                "firstname": "Reader",
+                "lastname": str(user_id),
+            }
+            for user_id in range(1, config["users"] + 1)
+        ],
+    )
+
+    now = datetime.now()
+    loans = [
+        {
+            "book_id": book_id,
+            "user_id": rng.randint(1, config["users"]),
+            "borrow_date": now - timedelta(days=14),
+            "return_date": now + timedelta(days=rng.randint(-7, 7)),
+        }
+        for book_id in range(1, config["loans"] + 1)
+    ]
+    for chunk in harness.chunks(loans):
+        db.session.execute(insert(BorrowedBook), chunk)
+    db.session.execute(
+        update(Book).where(Book.id <= config["loans"]).values(available=False)
+    )
+    db.session.commit()
+
+
+def scenarios(client, config, rng):
+    from app.utils.pagination import encode_cursor
+
+    books = config["books"]
+    # Books that start out available, in a random order, for borrowing.
+    free = list(range(config["loans"] + 1, books + 1))
+    rng.shuffle(free)
+    # Every id once, in a random order, so uncached reads never repeat a key.
+    ids = list(range(1, books + 1))
+    rng.shuffle(ids)
+
+    def list_books(i):
+        harness.expect(client.get("/books?limit=100"))
+
+    def list_books_uncached(i):
+        harness.expect(
+            client.get(
+                "/books",
+                query_string={"after": encode_cursor(id=ids[i % books]), "limit": 100},
+            )
+        )
+
+    def list_books_filtered(i):
+        harness.expect(
+            client.get(
+                "/books",
+                query_string={
+                    "category": rng.choice(harness.CATEGORIES),
+                    "publisher": ",".join(rng.sample(harness.PUBLISHERS, 2)),
+                    "after": encode_cursor(id=rng.randrange(books)),
+                    "limit": 50,
+                },
+            )
+        )
+
+    def get_book(i):
+        harness.expect(client.get(f"/books/{ids[i % 10]}"))
+
+    def get_book_uncached(i):
+        harness.expect(client.get(f"/books/{ids[i % books]}"))
+
+    def search_books(i):
+        harness.expect(client.get(f"/books/search?q={rng.choice(harness.WORDS)}"))
+
+    def borrow_book(i):
+        harness.expect(
+            client.post(
+                f"/books/{free[i % len(free)]}/borrow",
+                json={"user_id": rng.randint(1, config["users"]), "days": 7},
+            )
+        )
+
+    def sync_books(i):
+        events = [
+            {
+                "action": "update",
+                "book": {"id": rng.randint(1, books), "title": f"Revised {i}"},
+            }
+            for _ in range(config["sync_batch"])
+        ]
+        harness.expect(client.post("/sync/books", json={"events": events}))
+
+    # Reads run first, against the catalogue exactly as seeded. The cached
+    # scenarios repeat a handful of requests, so after warmup they are served
+    # from the response cache; the uncached ones never ask for the same page
+    # twice (as long as --books covers the runs) and always reach SQLite.
+    return [
+        ("GET /books (cached)", list_books, {}),
+        ("GET /books (uncached)", list_books_uncached, {}),
+        ("GET /books?category&publisher", list_books_filtered, {}),
+        ("GET /books/<id> (cached)", get_book, {}),
+        ("GET /books/<id> (uncached)", get_book_uncached, {}),
+        ("GET /books/search", search_books, {}),
+        # Each borrow needs its own book.
+        (
+            "POST /books/<id>/borrow",
+            borrow_book,
+            {"share": min(1, (len(free) - 10) / config["iterations"])},
+        ),
+        (
+            "POST /sync/books",
+            sync_books,
+            {"share": 0.25, "items": config["sync_batch"]},
+        ),
+    ]
+
+
+def main():
+    config = json.loads(sys.argv[1])
+    rng = random.Random(config["seed"])
+
+    service = harness.load_service("frontend")
+    app = service.create_app()
+    with app.app_context():
+        service.db.create_all()
+        started = time.perf_counter()
+        seed(service.db, config, rng)
+        seed_seconds = time.perf_counter() - started
+        harness.log(f"frontend: seeded in {seed_seconds:.1f}s")
+
+        client = app.test_client()
+        results = harness.run_scenarios(
+            scenarios(client, config, rng), config["iterations"]
+        )
+    harness.report(seed_seconds, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Seeding and timing helpers shared by the per-service benchmark scripts."""
+
+import json
+import math
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PUBLISHERS = ["Wiley", "Apress", "Manning", "O'Reilly", "Packt", "Springer"]
+CATEGORIES = ["Fiction", "Technology", "Science", "History", "Poetry", "Business"]
+WORDS = (
+    "river python garden empire signal winter machine ocean shadow network "
+    "harvest atlas kernel meadow"
+).split()
+
+
+def load_service(name):
+    """Make ``<name>_api``'s ``app`` package importable and return it."""
+    sys.path.insert(0, os.path.join(REPO_ROOT, f"{name}_api"))
+    import app
+
+    return app
+
+
+def book_rows(rng, count):
+    """``count`` catalogue rows, the same ones for the same ``rng`` seed."""
+    return [
+        {
+            "id": book_id,
+            "title": " ".join(rng.sample(WORDS, 3)).title(),
+            "author": f"Author {rng.randrange(count // 10 + 1)}",
+            "publisher": rng.choice(PUBLISHERS),
+            "category": rng.choice(CATEGORIES),
+        }
+        for book_id in range(1, count + 1)
+    ]
+
+
+def chunks(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of already sorted ``samples``."""
+    rank = max(1, math.ceil(pct / 100 * len(samples)))
+    return samples[rank - 1]
+
+
+def expect(response, status=200):
+    if response.status_code != status:
+        raise RuntimeError(
+            f"{response.request.method} {response.request.path} returned "
+            f"{response.status_code}: {response.get_data(as_text=True)[:200]}"
+        )
+    return response
+
+
+def measure(call, iterations, warmup=5, items=1):
+    """Time ``call(i)`` for ``iterations`` runs after ``warmup`` untimed ones.
+
+    ``items`` is how many things (events, rows) each call handles, for
+    scenarios where that is the more useful throughput.
+    """
+    for i in range(warmup):
+        call(i)
+
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        call(warmup + i)
+        samples.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    samples.sort()
+    result = {
+        "iterations": iterations,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": sum(samples) / iterations * 1000,
+        "max_ms": samples[-1] * 1000,
+        "throughput_per_s": iterations / elapsed,
+    }
+    if items != 1:
+        result["items_per_s"] = iterations * items / elapsed
+    return {key: round(value, 3) for key, value in result.items()}
+
+
+def run_scenarios(scenarios, iterations):
+    """Run ``(name, call, options)`` scenarios in order, logging to stderr."""
+    results = {}
+    for name, call, options in scenarios:
+        runs = max(1, int(iterations * options.pop("share", 1)))
+        results[name] = measure(call, runs, **options)
+        log(f"  {name}: p50 {results[name]['p50_ms']:.2f} ms")
+    return results
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def report(seed_seconds, scenarios):
+    """Hand the results back to ``run.py`` on stdout."""
+    json.dump(
+        {"seed_seconds": round(seed_seconds, 3), "scenarios": scenarios}, sys.stdout
+    )
@@ -0,0 +1,166 @@
+"""Benchmark both services and compare the results with a stored baseline.
+
+Each service runs in its own process, since both name their package
+``app``, against a fresh SQLite database seeded with the same data for
+the same ``--seed``. Results are written as JSON; pass ``--baseline`` to
+compare them with an earlier run, and the exit status is 1 when any
+scenario got slower than ``--tolerance`` allows.
+
+    python benchmarks/run.py --books 20000 --output baseline.json
+    python benchmarks/run.py --books 20000 --baseline baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+SERVICES = ("frontend", "backend")
+# Settings that must match for two runs to be comparable.
+WORKLOAD_KEYS = ("books", "users", "loans", "iterations", "seed", "sync_batch")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument(
+        "--loans", type=int, default=2000, help="at most half of --books"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=200, help="timed requests per scenario"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--sync-batch", type=int, default=100, help="events per /sync/books call"
+    )
+    parser.add_argument(
+        "--service", action="append", choices=SERVICES, help="default: both"
+    )
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"))
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument(
+        "--metric", default="p50_ms", help="latency figure compared with the baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="fraction slower than the baseline that still passes",
+    )
+    args = parser.parse_args(argv)
+    if args.books < 1 or args.users < 1 or args.iterations < 1:
+        parser.error("--books, --users and --iterations must be positive")
+    if not 0 <= args.loans <= args.books // 2:
+        parser.error("--loans must be between 0 and half of --books")
+    return args
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_service(service, config):
+    """Run one service's benchmarks in a child process and return its results."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            FLASK_SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp}/{service}.db",
+        )
+        completed = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(BENCH_DIR, f"{service}.py"),
+                json.dumps(config),
+            ],
+            cwd=os.path.join(REPO_ROOT, f"{service}_api"),
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+    if completed.returncode != 0:
+        raise SystemExit(f"{service} benchmarks failed ({completed.returncode})")
+    return json.loads(completed.stdout)
+
+
+def compare(results, baseline, metric, tolerance):
+    """Return ``(service, scenario, before, after, verdict)`` rows."""
+    rows = []
+    for service, current in results["services"].items():
+        previous = baseline["services"].get(service, {}).get("scenarios", {})
+        for name, stats in current["scenarios"].items():
+            if name not in previous:
+                rows.append((service, name, None, stats[metric], "new"))
+                continue
+            before, after = previous[name][metric], stats[metric]
+            verdict = "ok"
+            if after > before * (1 + tolerance):
+                verdict = "slower"
+            elif after < before * (1 - tolerance):
+                verdict = "faster"
+            rows.append((service, name, before, after, verdict))
+    return rows
+
+
+def print_comparison(rows, metric):
+    print(f"\n{'scenario':<58} {'baseline':>10} {'current':>10}  {metric}")
+    for service, name, before, after, verdict in rows:
+        before = "-" if before is None else f"{before:.2f}"
+        print(f"{service + ' ' + name:<58} {before:>10} {after:>10.2f}  {verdict}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = {key: getattr(args, key) for key in WORKLOAD_KEYS}
+    baseline = None
+    if args.baseline:
+        # Read first, in case the baseline is also the output file.
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "services": {},
+    }
+    for service in args.service or SERVICES:
+        print(f"Benchmarking {service}...", file=sys.stderr, flush=True)
+        results["services"][service] = run_service(service, config)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+    if baseline is None:
+        return 0
+    if baseline.get("config") != config:
+        print(
+            "warning: the baseline was run with different settings: "
+            f"{baseline.get('config')}",
+            file=sys.stderr,
+        )
+    rows = compare(results, baseline, args.metric, args.tolerance)
+    print_comparison(rows, args.metric)
+    return 1 if any(row[4] == "slower" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,10 +12,35 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///./frontend.db"
     # Database configuration
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Number of serialized catalogue responses kept in memory (0 disables)
+    app.config["CATALOGUE_CACHE_SIZE"] = 1024
+    app.config["BACKEND_API_URL"] = "http://backend_api:5000"
+    # Background workers, run by `flask run-workers` (or `python run.py`):
+    # the overdue-loan reaper
+    app.config["LOAN_REAPER_ENABLED"] = False
+    # and delivery of queued borrow/return events to the backend
+    app.config["LOAN_DISPATCHER_ENABLED"] = False
+    # kombu URL of the event bus (e.g. memory://, filesystem://, amqp://...);
+    # when unset, events travel over HTTP instead
+    app.config["EVENT_BUS_URL"] = None
+    app.config["EVENT_BUS_TRANSPORT_OPTIONS"] = {}
+    app.config["EVENT_BUS_PARTITIONS"] = 4
+    app.config["EVENT_BUS_BATCH_SIZE"] = 500
+    app.config["EVENT_BUS_PREFETCH"] = 20
+    # Number of worker threads applying catalogue events from the event bus
+    app.config["CATALOGUE_CONSUMERS"] = 0
+    # Any of the above can be overridden with FLASK_<NAME> environment variables
+    app.config.from_prefixed_env()
 
     db.init_app(app)
     Migrate(app, db)
 
+    from app.utils.cache import CatalogueCache
+
+    app.extensions["catalogue_cache"] = CatalogueCache(
+        app.config["CATALOGUE_CACHE_SIZE"]
+    )
+
     from app.routes.user_routes import user_bp
     from app.routes.book_routes import book_bp
 
@@ -24,4 +49,14 @@ def create_app():
 
     app.register_error_handler(LibraryError, handle_library_error)
 
+    from app.utils.bootstrap import bootstrap_command
+    from app.workers.runner import run_workers_command
+
+    app.cli.add_command(bootstrap_command)
+    app.cli.add_command(run_workers_command)
+
+    from app.utils.bus import create_event_bus
+
+    app.extensions["event_bus"] = create_event_bus(app.config)
+
     return app
@@ -1,22 +1,160 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import DDL, event
 
 
 class Book(db.Model):
+    # Catalogue reads always filter on availability and page by id, so each
+    # filter path gets an index that ends in id and needs no extra sort.
+    __table_args__ = (
+        db.Index("ix_book_available_id", "available", "id"),
+        db.Index(
+            "ix_book_available_publisher_category_id",
+            "available",
+            "publisher",
+            "category",
+            "id",
+        ),
+        db.Index("ix_book_available_publisher_id", "available", "publisher", "id"),
+        db.Index("ix_book_available_category_id", "available", "category", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     author = db.Column(db.String(100), nullable=False)
     publisher = db.Column(db.String(100), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     available = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    created_at = db.Column(db.DateTime, default=datetime.now)
 
 
 class BorrowedBook(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     book_id = db.Column(db.Integer, db.ForeignKey("book.id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    borrow_date = db.Column(db.DateTime, default=datetime.now())
+    borrow_date = db.Column(db.DateTime, default=datetime.now)
     return_date = db.Column(db.DateTime, nullable=False)
+    returned_at = db.Column(db.DateTime, nullable=True)
     book = db.relationship("Book", backref="borrowed_by", lazy=True)
 
+    # Only loans that are still out are ever scanned by due date, so the
+    # index leaves returned loans out entirely.
+    __table_args__ = (
+        db.Index(
+            "ix_borrowed_book_active_return_date",
+            "return_date",
+            sqlite_where=returned_at.is_(None),
+        ),
+    )
+
+
+class BookFacet(db.Model):
+    """Number of available books per (publisher, category) pair.
+
+    Maintained by triggers on ``book``, so facet counts never need a
+    GROUP BY over the catalogue.
+    """
+
+    __tablename__ = "book_facet"
+
+    publisher = db.Column(db.String(100), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    available_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CatalogueVersion(db.Model):
+    """Counts changes to the catalogue, in a single row.
+
+    Bumped by triggers on ``book`` in the same transaction as the change,
+    whichever process or code path makes it, so every process can tell
+    whether what it has cached is still current. ``epoch`` is a random token
+    written with the row, so versions from a rebuilt database, whose counter
+    starts again, never match ones handed out before.
+    """
+
+    __tablename__ = "catalogue_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    epoch = db.Column(db.String(16), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Full-text index over the titles and authors of available books. It is an
+# external-content FTS5 table, so the text itself lives only in ``book``;
+# triggers keep the index in step with inserts, deletes and availability
+# changes, whichever code path makes them.
+BOOK_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5("
+    "title, author, content='book', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book "
+    "WHEN new.available BEGIN "
+    "INSERT INTO book_fts(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); END",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book "
+    "WHEN old.available BEGIN "
+    "INSERT INTO book_fts(book_fts, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); END",
+    "CREATE TRIGGER IF NOT EXISTS book_fts_au "
+    "AFTER UPDATE OF title, author, available ON book BEGIN "
+    "INSERT INTO book_fts(book_fts, rowid, title, author) "
+    "SELECT 'delete', old.id, old.title, old.author WHERE old.available; "
+    "INSERT INTO book_fts(rowid, title, author) "
+    "SELECT new.id, new.title, new.author WHERE new.available; END",
+]
+
+_FACET_INCREMENT = (
+    "INSERT INTO book_facet(publisher, category, available_count) "
+    "SELECT new.publisher, new.category, 1 WHERE new.available "
+    "ON CONFLICT(publisher, category) "
+    "DO UPDATE SET available_count = available_count + 1; "
+)
+_FACET_DECREMENT = (
+    "UPDATE book_facet SET available_count = available_count - 1 "
+    "WHERE publisher = old.publisher AND category = old.category "
+    "AND old.available; "
+    "DELETE FROM book_facet WHERE publisher = old.publisher "
+    "AND category = old.category AND available_count <= 0; "
+)
+
+BOOK_FACET_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS book_facet_ai AFTER INSERT ON book BEGIN "
+    + _FACET_INCREMENT
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS book_facet_ad AFTER DELETE ON book BEGIN "
+    + _FACET_DECREMENT
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS book_facet_au "
+    "AFTER UPDATE OF publisher, category, available ON book BEGIN "
+    + _FACET_DECREMENT
+    + _FACET_INCREMENT
+    + "END",
+]
+
+CATALOGUE_VERSION_BUMP = (
+    "INSERT INTO catalogue_version(id, epoch, version) "
+    "VALUES (1, lower(hex(randomblob(4))), 1) "
+    "ON CONFLICT(id) DO UPDATE SET version = version + 1; "
+)
+
+CATALOGUE_VERSION_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS catalogue_version_ai AFTER INSERT ON book BEGIN "
+    + CATALOGUE_VERSION_BUMP
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS catalogue_version_ad AFTER DELETE ON book BEGIN "
+    + CATALOGUE_VERSION_BUMP
+    + "END",
+    "CREATE TRIGGER IF NOT EXISTS catalogue_version_au AFTER UPDATE ON book BEGIN "
+    + CATALOGUE_VERSION_BUMP
+    + "END",
+]
+
+for statement in BOOK_SEARCH_DDL + BOOK_FACET_DDL + CATALOGUE_VERSION_DDL:
+    event.listen(
+        Book.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+event.listen(
+    Book.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS book_fts").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,41 @@
+from app import db
+from datetime import datetime
+
+
+class LoanOutbox(db.Model):
+    """Borrow, return and enrollment events waiting for the backend API.
+
+    Rows are written in the same transaction as the loan change they describe
+    and delivered in id order, which doubles as the event's sequence number:
+    the backend skips anything at or below the last sequence it applied.
+    """
+
+    __tablename__ = "loan_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    dispatched_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_loan_outbox_pending", "id", sqlite_where=dispatched_at.is_(None)),
+    )
+
+
+class OutboxEpoch(db.Model):
+    """Names this database's loan outbox to the backend.
+
+    Outbox ids, user ids and loan ids all start again at 1 when the
+    frontend database is rebuilt, so every loan event carries the epoch as
+    its ``source`` and the backend keeps a separate stream for each one. A
+    single row, created with the outbox.
+    """
+
+    __tablename__ = "outbox_epoch"
+
+    id = db.Column(db.Integer, primary_key=True)
+    epoch = db.Column(db.String(32), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
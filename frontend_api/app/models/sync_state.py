@@ -0,0 +1,19 @@
+from app import db
+from datetime import datetime
+
+
+class SyncState(db.Model):
+    """Highest sequence number covered from each incoming event stream.
+
+    For the backend's catalogue stream this is the sequence number of the
+    snapshot the catalogue was bootstrapped from, moved on by the catch-up
+    that follows; events at or below it are already reflected here.
+    """
+
+    __tablename__ = "sync_state"
+
+    stream = db.Column(db.String(50), primary_key=True)
+    last_seq = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
+    )
@@ -1,17 +1,54 @@
 from flask import Blueprint, request, jsonify
-from app.models.book import Book, BorrowedBook
+from sqlalchemy import select
+from app.models.book import Book
+from app.models.sync_state import SyncState
 from app.models.user import User
 from app import db
-from datetime import datetime, timedelta
+from app.utils.cache import (
+    bump_catalogue_version,
+    cached_catalogue_response,
+    get_catalogue_cache,
+    read_catalogue_version,
+)
+from app.utils.digest import catalogue_digest
 from app.utils.errors import (
-    BookNotAvailableError,
     ResourceNotFoundError,
     ValidationError,
     LibraryError,
 )
+from app.utils.filters import (
+    available_books_page,
+    facet_counts,
+    iter_available_books,
+    parse_multi_value,
+)
+from app.utils.loans import claim_book, parse_borrow_days
+from app.utils.outbox import notify_loan_dispatcher
+from app.utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    next_page_link,
+    parse_limit,
+)
+from app.utils.search import search_available_books
+from app.utils.streaming import stream_json_array, wants_stream
+from app.utils.sync import CHANGED_STATUSES, apply_catalogue_events, covered_seq
 
 book_bp = Blueprint("book_routes", __name__)
 
+SEARCH_PAGE_SIZE = 20
+MAX_BORROW_ITEMS = 100
+
+
+def serialize_book(book):
+    return {
+        "id": book.id,
+        "title": book.title,
+        "author": book.author,
+        "publisher": book.publisher,
+        "category": book.category,
+    }
+
 
 @book_bp.route("/", methods=["GET"])
 def index():
@@ -19,33 +56,87 @@ def index():
 
 
 @book_bp.route("/books", methods=["GET"])
+@cached_catalogue_response
 def list_books():
-    publisher = request.args.get("publisher")
-    category = request.args.get("category")
+    publishers = parse_multi_value(request.args, "publisher")
+    categories = parse_multi_value(request.args, "category")
+    if wants_stream(request.args):
+        return stream_json_array(
+            iter_available_books(publishers, categories), serialize_book
+        )
+
+    limit = parse_limit(request.args.get("limit"))
+    after = request.args.get("after")
+
+    after_id = None
+    if after:
+        after_id = decode_cursor(after).get("id")
+        if not isinstance(after_id, int):
+            raise ValidationError("Invalid cursor")
 
-    query = db.session.query(Book).filter_by(available=True)
+    # Fetch one extra row so we know whether another page exists without
+    # having to count the catalogue.
+    books = available_books_page(publishers, categories, after_id, limit + 1)
+    has_more = len(books) > limit
+    books = books[:limit]
 
-    if publisher:
-        query = query.filter_by(publisher=publisher)
-    if category:
-        query = query.filter_by(category=category)
+    response = jsonify([serialize_book(book) for book in books])
+    if has_more:
+        cursor = encode_cursor(id=books[-1].id)
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = next_page_link(request.path, request.args, cursor)
+    return response
 
-    books = query.all()
+
+@book_bp.route("/books/facets", methods=["GET"])
+@cached_catalogue_response
+def book_facets():
     return jsonify(
-        [
-            {
-                "id": book.id,
-                "title": book.title,
-                "author": book.author,
-                "publisher": book.publisher,
-                "category": book.category,
-            }
-            for book in books
-        ]
+        facet_counts(
+            parse_multi_value(request.args, "publisher"),
+            parse_multi_value(request.args, "category"),
+        )
     )
 
 
+@book_bp.route("/books/search", methods=["GET"])
+def search_books():
+    limit = parse_limit(request.args.get("limit"), default=SEARCH_PAGE_SIZE)
+    after = request.args.get("after")
+    # bm25 scores move whenever the index does, so a cursor only holds for
+    # the catalogue version it was issued against.
+    epoch, version = read_catalogue_version()
+
+    position = None
+    if after:
+        cursor = decode_cursor(after)
+        score, last_id = cursor.get("score"), cursor.get("id")
+        if not isinstance(score, (int, float)) or not isinstance(last_id, int):
+            raise ValidationError("Invalid cursor")
+        if (cursor.get("epoch"), cursor.get("version")) != (epoch, version):
+            raise LibraryError(
+                "The catalogue changed since this search began; "
+                "start again from the first page",
+                409,
+            )
+        position = (score, last_id)
+
+    results = search_available_books(request.args.get("q"), position, limit + 1)
+    has_more = len(results) > limit
+    results = results[:limit]
+
+    response = jsonify([serialize_book(book) for book in results])
+    if has_more:
+        cursor = encode_cursor(
+            score=results[-1].score, id=results[-1].id, epoch=epoch, version=version
+        )
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = next_page_link(request.path, request.args, cursor)
+    return response
+
+
 @book_bp.route("/books/<int:book_id>", methods=["GET"])
+@cached_catalogue_response
 def get_book(book_id):
     book = db.session.get(Book, book_id)
     if not book:
@@ -72,38 +163,92 @@ def borrow_book(book_id):
         if "user_id" not in data or "days" not in data:
             raise ValidationError("Missing required fields: user_id and days")
 
-        book = db.session.get(Book, book_id)
-        if not book:
-            raise ResourceNotFoundError("Book", book_id)
+        borrow_days = parse_borrow_days(data["days"])
 
         user = db.session.get(User, data["user_id"])
         if not user:
             raise ResourceNotFoundError("User", data["user_id"])
 
-        if not book.available:
-            raise BookNotAvailableError(book_id)
+        return_date = claim_book(book_id, user, borrow_days)
+        db.session.commit()
+        bump_catalogue_version()
+        notify_loan_dispatcher()
 
-        try:
-            borrow_days = int(data["days"])
-            if borrow_days <= 0:
-                raise ValidationError("Borrow days must be positive")
-        except ValueError:
-            raise ValidationError("Days must be a valid number")
+        return jsonify(
+            {
+                "message": "Book borrowed successfully",
+                "return_date": return_date.isoformat(),
+            }
+        )
 
-        return_date = datetime.now() + timedelta(days=borrow_days)
+    except Exception as e:
+        db.session.rollback()
+        if not isinstance(e, LibraryError):
+            raise ValidationError("An unexpected error occurred")
+        raise
 
-        borrowed_book = BorrowedBook(
-            book_id=book.id, user_id=user.id, return_date=return_date
-        )
 
-        book.available = False
-        db.session.add(borrowed_book)
+@book_bp.route("/borrows", methods=["POST"])
+def borrow_books():
+    try:
+        data = request.get_json()
+        if not data:
+            raise ValidationError("No JSON data provided")
+
+        if "user_id" not in data or "items" not in data:
+            raise ValidationError("Missing required fields: user_id and items")
+
+        items = data["items"]
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Items must be a non-empty list")
+        if len(items) > MAX_BORROW_ITEMS:
+            raise ValidationError(f"Cannot borrow more than {MAX_BORROW_ITEMS} books")
+
+        mode = data.get("mode", "atomic")
+        if mode not in ("atomic", "partial"):
+            raise ValidationError("Mode must be either atomic or partial")
+
+        user = db.session.get(User, data["user_id"])
+        if not user:
+            raise ResourceNotFoundError("User", data["user_id"])
+
+        # A failed claim leaves nothing behind, so in partial mode the loans
+        # that did succeed can still be committed together.
+        results = []
+        for item in items:
+            book_id = item.get("book_id") if isinstance(item, dict) else None
+            try:
+                if not isinstance(book_id, int) or "days" not in item:
+                    raise ValidationError("Missing required fields: book_id and days")
+                borrow_days = parse_borrow_days(item["days"])
+                return_date = claim_book(book_id, user, borrow_days)
+            except LibraryError as e:
+                if mode == "atomic":
+                    raise
+                results.append(
+                    {"book_id": book_id, "status": e.status_code, "error": e.message}
+                )
+                continue
+            results.append(
+                {
+                    "book_id": book_id,
+                    "status": 200,
+                    "return_date": return_date.isoformat(),
+                }
+            )
+
         db.session.commit()
+        borrowed = sum(1 for result in results if result["status"] == 200)
+        if borrowed:
+            bump_catalogue_version()
+            notify_loan_dispatcher()
 
         return jsonify(
             {
-                "message": "Book borrowed successfully",
-                "return_date": return_date.isoformat(),
+                "message": f"{borrowed} of {len(items)} books borrowed",
+                "borrowed": borrowed,
+                "failed": len(items) - borrowed,
+                "loans": results,
             }
         )
 
@@ -117,22 +262,67 @@ def borrow_book(book_id):
 @book_bp.route("/sync/books", methods=["POST"])
 def sync_books():
     data = request.get_json()
+    if not data:
+        raise ValidationError("No JSON data provided")
 
-    if data["action"] == "add":
-        book_data = data["book"]
-        book = Book(
-            id=book_data["id"],
-            title=book_data["title"],
-            author=book_data["author"],
-            publisher=book_data["publisher"],
-            category=book_data["category"],
-        )
-        db.session.add(book)
+    # Either a single event, a list of events, or {"events": [...]}.
+    if isinstance(data, list):
+        events = data
+    elif "events" in data:
+        events = data["events"]
+    else:
+        events = None
+    if events is not None and not isinstance(events, list):
+        raise ValidationError("Events must be a list")
+
+    try:
+        results = apply_catalogue_events(events if events is not None else [data])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if any(result["status"] in CHANGED_STATUSES for result in results):
+        bump_catalogue_version()
+
+    if events is None:
+        if results[0]["status"] == "invalid":
+            raise ValidationError(results[0]["error"])
+        return jsonify({"message": "Sync successful"})
+
+    return jsonify(
+        {
+            "message": "Sync successful",
+            "last_seq": covered_seq(),
+            "applied": sum(
+                1
+                for result in results
+                if result["status"] not in ("invalid", "skipped")
+            ),
+            "results": results,
+        }
+    )
+
+
+@book_bp.route("/sync/state", methods=["GET"])
+def sync_state():
+    return jsonify(
+        {
+            state.stream: {
+                "last_seq": state.last_seq,
+                "updated_at": state.updated_at.isoformat(),
+            }
+            for state in db.session.scalars(
+                select(SyncState).order_by(SyncState.stream)
+            )
+        }
+    )
+
+
+@book_bp.route("/sync/books/digest", methods=["GET"])
+def books_digest():
+    return jsonify(catalogue_digest(Book, request.args))
 
-    elif data["action"] == "delete":
-        book = db.session.get(Book, data["book_id"])
-        if book:
-            db.session.delete(book)
 
-    db.session.commit()
-    return jsonify({"message": "Sync successful"})
+@book_bp.route("/metrics/cache", methods=["GET"])
+def cache_metrics():
+    return jsonify(get_catalogue_cache().stats())
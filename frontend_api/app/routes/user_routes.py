@@ -1,14 +1,26 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import select
 from app.models.user import User
 from app import db
 from app.utils.errors import (
     ValidationError,
     LibraryError,
 )
+from app.utils.outbox import enqueue_loan_event, notify_loan_dispatcher
+from app.utils.streaming import STREAM_BATCH_SIZE, stream_json_array, wants_stream
 
 user_bp = Blueprint("user_routes", __name__)
 
 
+def serialize_user(user):
+    return {
+        "id": user.id,
+        "email": user.email,
+        "firstname": user.firstname,
+        "lastname": user.lastname,
+    }
+
+
 @user_bp.route("/user", methods=["GET"])
 def index():
     return jsonify({"health": "healthy"})
@@ -29,7 +41,20 @@ def enroll_user():
     )
 
     db.session.add(user)
+    db.session.flush()
+    # The backend keeps its own copy of the user directory, fed by these.
+    enqueue_loan_event(
+        {
+            "action": "enroll",
+            "user_id": user.id,
+            "email": user.email,
+            "firstname": user.firstname,
+            "lastname": user.lastname,
+            "enrolled_at": user.created_at.isoformat(),
+        }
+    )
     db.session.commit()
+    notify_loan_dispatcher()
 
     return (
         jsonify(
@@ -49,15 +74,13 @@ def enroll_user():
 
 @user_bp.route("/users", methods=["GET"])
 def list_users():
+    if wants_stream(request.args):
+        rows = db.session.execute(
+            select(User.id, User.email, User.firstname, User.lastname)
+            .order_by(User.id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        return stream_json_array(rows, serialize_user)
+
     users = db.session.query(User)
-    return jsonify(
-        [
-            {
-                "id": user.id,
-                "email": user.email,
-                "firstname": user.firstname,
-                "lastname": user.lastname,
-            }
-            for user in users
-        ]
-    )
+    return jsonify([serialize_user(user) for user in users])
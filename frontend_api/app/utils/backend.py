@@ -0,0 +1,60 @@
+import json
+
+import requests
+from flask import current_app
+
+from app.utils.bus import get_event_bus
+
+
+def sync_loans_with_backend(events):
+    """Deliver a batch of sequenced loan events to the backend API.
+
+    Returns the backend's summary of the batch. Network and HTTP failures are
+    raised as ``requests`` exceptions so the caller can retry.
+    """
+    response = requests.post(
+        f"{current_app.config['BACKEND_API_URL']}/admin/sync/loans",
+        json={"events": events},
+        timeout=(3, 30),
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def publish_loan_events(events):
+    """Hand a batch of sequenced loan events to the event bus for the backend.
+
+    The backend's consumer applies them asynchronously, so there is no
+    summary to return.
+    """
+    get_event_bus().publish("loans", events)
+    return None
+
+
+def fetch_catalogue_snapshot():
+    """Stream the backend's catalogue snapshot, one decoded line at a time.
+
+    The snapshot is served gzip-compressed; ``requests`` inflates it as it
+    arrives, so neither copy of it is ever held whole.
+    """
+    response = requests.get(
+        f"{current_app.config['BACKEND_API_URL']}/admin/books/snapshot",
+        stream=True,
+        timeout=(3, 60),
+    )
+    response.raise_for_status()
+    with response:
+        for line in response.iter_lines(chunk_size=64 * 1024):
+            if line:
+                yield json.loads(line)
+
+
+def fetch_catalogue_events(after_seq, limit):
+    """Return up to ``limit`` catalogue events after ``after_seq``, in order."""
+    response = requests.get(
+        f"{current_app.config['BACKEND_API_URL']}/admin/sync/books/events",
+        params={"after": after_seq, "limit": limit},
+        timeout=(3, 30),
+    )
+    response.raise_for_status()
+    return response.json()["events"]
@@ -0,0 +1,149 @@
+import logging
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from app import db
+from app.models.book import (
+    BOOK_FACET_DDL,
+    BOOK_SEARCH_DDL,
+    CATALOGUE_VERSION_BUMP,
+    CATALOGUE_VERSION_DDL,
+    Book,
+)
+from app.models.sync_state import SyncState
+from app.utils.backend import fetch_catalogue_events, fetch_catalogue_snapshot
+from app.utils.cache import bump_catalogue_version
+from app.utils.errors import LibraryError
+from app.utils.sync import CATALOGUE_STREAM, apply_catalogue_events, covered_seq
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_CHUNK_SIZE = 5000
+CATCH_UP_PAGE_SIZE = 1000
+# Row-by-row triggers that a bulk load replaces with one statement each.
+INSERT_TRIGGERS = ("book_fts_ai", "book_facet_ai", "catalogue_version_ai")
+
+
+def _set_aside_book_indexes():
+    """Drop what a bulk load would otherwise maintain one row at a time."""
+    for trigger in INSERT_TRIGGERS:
+        db.session.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    for index in Book.__table__.indexes:
+        db.session.execute(DropIndex(index, if_exists=True))
+
+
+def _restore_book_indexes():
+    # Building an index over rows already in place is a single sorted pass.
+    for index in Book.__table__.indexes:
+        db.session.execute(CreateIndex(index, if_not_exists=True))
+    for statement in BOOK_SEARCH_DDL + BOOK_FACET_DDL + CATALOGUE_VERSION_DDL:
+        db.session.execute(text(statement))
+
+
+def _load_snapshot(lines):
+    """Insert every book in the snapshot; returns ``(seq, count)``."""
+    header = next(lines, {}).get("snapshot")
+    if header is None:
+        raise LibraryError("Snapshot has no header")
+
+    count = 0
+    chunk = []
+    for line in lines:
+        if "end" in line:
+            if line["end"]["count"] != count + len(chunk):
+                raise LibraryError("Snapshot row count does not match")
+            break
+        chunk.append(line)
+        if len(chunk) >= BOOTSTRAP_CHUNK_SIZE:
+            db.session.execute(insert(Book.__table__), chunk)
+            count += len(chunk)
+            chunk = []
+    else:
+        raise LibraryError("Snapshot ended early")
+    if chunk:
+        db.session.execute(insert(Book.__table__), chunk)
+        count += len(chunk)
+    return header["seq"], count
+
+
+def _index_loaded_books():
+    """Fill the search index and facet counts in one pass each.
+
+    The catalogue version is bumped once for the whole load.
+    """
+    db.session.execute(
+        text(
+            "INSERT INTO book_fts(rowid, title, author) "
+            "SELECT id, title, author FROM book WHERE available"
+        )
+    )
+    db.session.execute(
+        text(
+            "INSERT INTO book_facet(publisher, category, available_count) "
+            "SELECT publisher, category, COUNT(*) FROM book WHERE available "
+            "GROUP BY publisher, category"
+        )
+    )
+    db.session.execute(text(CATALOGUE_VERSION_BUMP))
+
+
+def catch_up(fetch_events=fetch_catalogue_events, page_size=CATCH_UP_PAGE_SIZE):
+    """Apply backend events newer than the catalogue, in order, page by page."""
+    applied = 0
+    while True:
+        events = fetch_events(covered_seq(), page_size)
+        if not events:
+            return applied
+        apply_catalogue_events(events)
+        db.session.commit()
+        applied += len(events)
+
+
+def bootstrap_catalogue(
+    fetch_snapshot=fetch_catalogue_snapshot, fetch_events=fetch_catalogue_events
+):
+    """Fill an empty catalogue from the backend's snapshot, then catch up.
+
+    The books are bulk-inserted with the catalogue's indexes and per-row
+    search and facet triggers set aside, then indexed in one pass each, all
+    in a single transaction that also records the snapshot's sequence
+    number. Events after it are then pulled and applied in order; anything
+    the dispatcher delivers that the snapshot already covers is skipped.
+    """
+    if db.session.scalar(select(Book.id).limit(1)) is not None:
+        raise LibraryError("The catalogue is not empty; bootstrap fills a new replica")
+
+    try:
+        db.session.merge(SyncState(stream=CATALOGUE_STREAM, last_seq=0))
+        db.session.flush()
+        _set_aside_book_indexes()
+        seq, count = _load_snapshot(fetch_snapshot())
+        _index_loaded_books()
+        _restore_book_indexes()
+        db.session.get(SyncState, CATALOGUE_STREAM).last_seq = seq
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Schema changes may not roll back with the rows on every driver.
+        _restore_book_indexes()
+        db.session.commit()
+        raise
+    logger.info("Loaded %d books from the snapshot at seq %d", count, seq)
+
+    caught_up = catch_up(fetch_events)
+    bump_catalogue_version()
+    return {"seq": seq, "books": count, "caught_up": caught_up}
+
+
+@click.command("bootstrap-catalogue")
+@with_appcontext
+def bootstrap_command():
+    """Fill an empty catalogue from the backend's snapshot."""
+    summary = bootstrap_catalogue()
+    click.echo(
+        f"Loaded {summary['books']} books from seq {summary['seq']} "
+        f"and applied {summary['caught_up']} newer events"
+    )
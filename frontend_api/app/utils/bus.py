@@ -0,0 +1,92 @@
+import threading
+import zlib
+from itertools import groupby
+
+from flask import current_app
+from kombu import Connection, Exchange, Queue
+
+EXCHANGE = Exchange("library.events", type="direct", durable=True)
+# How long to keep retrying a publish before giving up; the caller retries
+# later from the outbox.
+PUBLISH_RETRY_POLICY = {"max_retries": 3, "interval_start": 0.2, "interval_step": 0.5}
+
+
+class EventBus:
+    """Publishes sync events to partitioned kombu queues.
+
+    Each topic is split into a fixed number of queues (``partitions``) and an
+    event always lands in the partition its key hashes to, so events about
+    the same book keep their order while different partitions are consumed
+    in parallel. Any kombu URL works: ``memory://`` for tests,
+    ``filesystem://`` for a single host, ``amqp://`` for a broker.
+    """
+
+    def __init__(self, url, transport_options=None, partitions=None):
+        self.url = url
+        self.transport_options = transport_options or {}
+        self.partitions = dict(partitions or {})
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        return Connection(self.url, transport_options=self.transport_options)
+
+    def partition_count(self, topic):
+        return self.partitions.get(topic, 1)
+
+    def queue(self, topic, partition):
+        name = f"{topic}.{partition}"
+        return Queue(name, EXCHANGE, routing_key=name, durable=True)
+
+    def queues(self, topic):
+        return [self.queue(topic, p) for p in range(self.partition_count(topic))]
+
+    def partition_for(self, topic, key):
+        # crc32 rather than hash(), which is salted per process.
+        return zlib.crc32(str(key).encode()) % self.partition_count(topic)
+
+    def publish(self, topic, events, key=lambda event: None):
+        """Publish ``events`` in order, one message per partition they touch.
+
+        Runs of events for the same partition are sent as a single message,
+        so a batch costs a handful of messages rather than one per event.
+        """
+        with self._lock:
+            if self._connection is None:
+                self._connection = self.connect()
+            producer = self._connection.Producer(serializer="json")
+            for partition, run in groupby(
+                events, key=lambda event: self.partition_for(topic, key(event))
+            ):
+                queue = self.queue(topic, partition)
+                producer.publish(
+                    {"events": list(run)},
+                    exchange=EXCHANGE,
+                    routing_key=queue.routing_key,
+                    declare=[queue],
+                    delivery_mode="persistent",
+                    retry=True,
+                    retry_policy=PUBLISH_RETRY_POLICY,
+                )
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.release()
+                self._connection = None
+
+
+def create_event_bus(config):
+    if not config["EVENT_BUS_URL"]:
+        return None
+    return EventBus(
+        config["EVENT_BUS_URL"],
+        transport_options=config["EVENT_BUS_TRANSPORT_OPTIONS"],
+        # Loans carry one sequence across all books, so they must stay in a
+        # single ordered queue.
+        partitions={"catalogue": config["EVENT_BUS_PARTITIONS"], "loans": 1},
+    )
+
+
+def get_event_bus():
+    return current_app.extensions.get("event_bus")
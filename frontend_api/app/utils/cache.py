@@ -0,0 +1,152 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, current_app, request
+from sqlalchemy import select
+
+from app import db
+from app.models.book import CatalogueVersion
+
+# Response headers that belong to the cached representation.
+CACHED_HEADERS = ("Content-Type", "X-Next-Cursor", "Link")
+
+
+class CatalogueCache:
+    """Serialized catalogue responses keyed by catalogue version.
+
+    The version is the database's :class:`CatalogueVersion` counter, which
+    triggers bump on every change to ``book``, so writes made by other
+    processes, such as a worker, are seen too. Each read passes it to
+    :meth:`observe` first; once it has moved on, entries built against the
+    older version can never be served again and are dropped straight away.
+    ETags carry the row's epoch as well, so they stay valid across processes
+    and restarts but not across a rebuilt database.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.epoch = ""
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, epoch, version):
+        """Catch up with the catalogue's current ``epoch`` and ``version``."""
+        with self._lock:
+            if (epoch, version) != (self.epoch, self.version):
+                self.epoch = epoch
+                self.version = version
+                self._entries.clear()
+
+    def etag(self, key, epoch, version):
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return f"{epoch}-{version}-{digest}"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, epoch, version, entry):
+        with self._lock:
+            # The catalogue changed while the response was being built, so it
+            # may already be stale.
+            stale = (epoch, version) != (self.epoch, self.version)
+            if stale or self.max_entries <= 0:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "epoch": self.epoch,
+                "version": self.version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def get_catalogue_cache():
+    return current_app.extensions["catalogue_cache"]
+
+
+def read_catalogue_version():
+    """Return the catalogue's ``(epoch, version)``, ``("", 0)`` if unchanged."""
+    row = db.session.execute(
+        select(CatalogueVersion.epoch, CatalogueVersion.version).where(
+            CatalogueVersion.id == 1
+        )
+    ).first()
+    return tuple(row) if row else ("", 0)
+
+
+def bump_catalogue_version():
+    """Drop responses made stale by a change this process just committed.
+
+    The next read would notice anyway; this only frees the memory sooner.
+    """
+    get_catalogue_cache().observe(*read_catalogue_version())
+
+
+def _request_key():
+    return f"{request.path}?{urlencode(sorted(request.args.items(multi=True)))}"
+
+
+def cached_catalogue_response(view):
+    """Serve a catalogue read from the cache, answering 304 when possible."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_catalogue_cache()
+        key = _request_key()
+        epoch, version = read_catalogue_version()
+        cache.observe(epoch, version)
+        etag = cache.etag(key, epoch, version)
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        entry = cache.get(key)
+        if entry is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.is_streamed:
+                response.set_etag(etag)
+                return response
+            if response.status_code != 200:
+                return response
+            headers = {
+                name: response.headers[name]
+                for name in CACHED_HEADERS
+                if name in response.headers
+            }
+            entry = (response.get_data(), headers)
+            cache.set(key, epoch, version, entry)
+
+        body, headers = entry
+        response = Response(body, headers=headers)
+        response.set_etag(etag)
+        return response
+
+    return wrapper
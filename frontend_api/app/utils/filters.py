@@ -0,0 +1,93 @@
+from itertools import product
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.book import Book, BookFacet
+from app.utils.errors import ValidationError
+
+MAX_FILTER_COMBINATIONS = 50
+
+
+def parse_multi_value(args, name):
+    """Collect ``?name=a,b&name=c`` style filter values into a list."""
+    values = []
+    for raw in args.getlist(name):
+        for value in raw.split(","):
+            value = value.strip()
+            if value and value not in values:
+                values.append(value)
+    return values
+
+
+def available_books_page(publishers=None, categories=None, after_id=None, limit=100):
+    """Return up to ``limit`` available books with ``id > after_id``, in id order.
+
+    A plain ``publisher IN (...)`` lookup forces SQLite to sort every matching
+    row before applying the limit. Instead each (publisher, category)
+    combination becomes its own branch that walks a composite index already in
+    id order and stops after ``limit`` rows; the branches are then merged, so a
+    page costs O(combinations * limit) regardless of catalogue size.
+    """
+    combinations = list(product(publishers or [None], categories or [None]))
+    if len(combinations) > MAX_FILTER_COMBINATIONS:
+        raise ValidationError(
+            f"Too many filter combinations (max {MAX_FILTER_COMBINATIONS})"
+        )
+
+    branches = []
+    for publisher, category in combinations:
+        branch = select(Book).filter_by(available=True)
+        if publisher is not None:
+            branch = branch.filter_by(publisher=publisher)
+        if category is not None:
+            branch = branch.filter_by(category=category)
+        if after_id is not None:
+            branch = branch.filter(Book.id > after_id)
+        branches.append(branch.order_by(Book.id).limit(limit))
+
+    if len(branches) == 1:
+        return db.session.scalars(branches[0]).all()
+
+    # SQLite only allows ORDER BY/LIMIT inside a compound select when each
+    # member is wrapped in its own subquery.
+    merged = union_all(*(select(branch.subquery()) for branch in branches)).subquery()
+    book = aliased(Book, merged)
+    return db.session.scalars(select(book).order_by(merged.c.id).limit(limit)).all()
+
+
+def iter_available_books(publishers=None, categories=None, batch_size=1000):
+    """Yield every matching available book in id order, one page at a time."""
+    after_id = None
+    while True:
+        books = available_books_page(publishers, categories, after_id, batch_size)
+        yield from books
+        if len(books) < batch_size:
+            return
+        after_id = books[-1].id
+
+
+def facet_counts(publishers=None, categories=None):
+    """Available-book counts per publisher and per category.
+
+    Publisher counts are narrowed by the selected categories and category
+    counts by the selected publishers. Both are summed from the trigger
+    maintained ``book_facet`` table, so the cost depends on the number of
+    facet pairs rather than on the size of the catalogue.
+    """
+    by_publisher = select(BookFacet.publisher, func.sum(BookFacet.available_count))
+    if categories:
+        by_publisher = by_publisher.where(BookFacet.category.in_(categories))
+    by_category = select(BookFacet.category, func.sum(BookFacet.available_count))
+    if publishers:
+        by_category = by_category.where(BookFacet.publisher.in_(publishers))
+
+    return {
+        "publishers": dict(
+            db.session.execute(by_publisher.group_by(BookFacet.publisher)).all()
+        ),
+        "categories": dict(
+            db.session.execute(by_category.group_by(BookFacet.category)).all()
+        ),
+    }
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import db
+from app.models.book import Book, BorrowedBook
+from app.utils.errors import (
+    BookNotAvailableError,
+    ResourceNotFoundError,
+    ValidationError,
+)
+from app.utils.outbox import enqueue_loan_event
+
+
+def parse_borrow_days(value):
+    try:
+        borrow_days = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError("Days must be a valid number")
+    if borrow_days <= 0:
+        raise ValidationError("Borrow days must be positive")
+    return borrow_days
+
+
+def claim_book(book_id, user, borrow_days):
+    """Lend a book to a user inside the caller's transaction.
+
+    Availability is flipped with a single conditional UPDATE, so when several
+    requests race for the same book exactly one of them matches the row and
+    the others see it as unavailable. The loan is queued for the backend in
+    the same transaction. The caller commits.
+    """
+    claimed = db.session.execute(
+        update(Book)
+        .filter_by(id=book_id, available=True)
+        .values(available=False)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        if db.session.get(Book, book_id) is None:
+            raise ResourceNotFoundError("Book", book_id)
+        raise BookNotAvailableError(book_id)
+
+    borrow_date = datetime.now()
+    return_date = borrow_date + timedelta(days=borrow_days)
+    loan = BorrowedBook(
+        book_id=book_id,
+        user_id=user.id,
+        borrow_date=borrow_date,
+        return_date=return_date,
+    )
+    db.session.add(loan)
+    db.session.flush()
+    enqueue_loan_event(
+        {
+            "action": "borrow",
+            "loan_id": loan.id,
+            "book_id": book_id,
+            "user_email": user.email,
+            "borrow_date": borrow_date.isoformat(),
+            "return_date": return_date.isoformat(),
+        }
+    )
+    return return_date
@@ -0,0 +1,35 @@
+from uuid import uuid4
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from app import db
+from app.models.outbox import LoanOutbox, OutboxEpoch
+
+
+def enqueue_loan_event(payload):
+    """Queue a loan event for the backend in the caller's transaction."""
+    entry = LoanOutbox(payload=payload)
+    db.session.add(entry)
+    return entry
+
+
+def notify_loan_dispatcher():
+    """Wake the in-process dispatcher, if any, once new events are committed."""
+    dispatcher = current_app.extensions.get("loan_dispatcher")
+    if dispatcher is not None:
+        dispatcher.wake()
+
+
+def loan_outbox_epoch():
+    """Return the epoch loan events are sent under, creating it on first use."""
+    query = select(OutboxEpoch.epoch).where(OutboxEpoch.id == 1)
+    epoch = db.session.scalar(query)
+    if epoch is None:
+        db.session.execute(
+            insert(OutboxEpoch).values(id=1, epoch=uuid4().hex).on_conflict_do_nothing()
+        )
+        db.session.commit()
+        epoch = db.session.scalar(query)
+    return epoch
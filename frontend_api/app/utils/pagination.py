@@ -0,0 +1,43 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+from app.utils.errors import ValidationError
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(**position):
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Turn an opaque cursor back into the position it was built from."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid cursor")
+    if not isinstance(position, dict):
+        raise ValidationError("Invalid cursor")
+    return position
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValidationError("Limit must be a valid number")
+    if limit <= 0:
+        raise ValidationError("Limit must be positive")
+    return min(limit, maximum)
+
+
+def next_page_link(path, args, cursor):
+    params = [(key, value) for key, value in args.items(multi=True) if key != "after"]
+    params.append(("after", cursor))
+    return f'<{path}?{urlencode(params)}>; rel="next"'
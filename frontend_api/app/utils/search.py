@@ -0,0 +1,53 @@
+import re
+
+from sqlalchemy import text
+
+from app import db
+from app.utils.errors import ValidationError
+
+# Title matches weigh more than author matches when ranking.
+TITLE_WEIGHT = 10.0
+AUTHOR_WEIGHT = 5.0
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_SEARCH_SQL = f"""
+    SELECT book.id, book.title, book.author, book.publisher, book.category,
+           bm25(book_fts, {TITLE_WEIGHT}, {AUTHOR_WEIGHT}) AS score
+    FROM book_fts JOIN book ON book.id = book_fts.rowid
+    WHERE book_fts MATCH :match {{after}}
+    ORDER BY score, book.id
+    LIMIT :limit
+"""
+
+
+def build_match_query(q):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    tokens = _TOKEN.findall(q or "")
+    if not tokens:
+        raise ValidationError("Search query must contain at least one word")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_available_books(q, after=None, limit=20):
+    """Return matching book rows, each with its ``score``, best match first.
+
+    ``after`` is the ``(score, id)`` of the last row of the previous page;
+    bm25 is deterministic for a given index, so ranking pages are keyset
+    paginated the same way as the plain catalogue. Any change to the index
+    moves the scores, though, so a position is only meaningful while the
+    catalogue is unchanged; the route ties its cursors to the catalogue
+    version and rejects stale ones.
+    """
+    params = {"match": build_match_query(q), "limit": limit}
+    after_clause = ""
+    if after is not None:
+        after_clause = (
+            "AND (score > :after_score "
+            "OR (score = :after_score AND book.id > :after_id))"
+        )
+        params["after_score"], params["after_id"] = after
+
+    return db.session.execute(
+        text(_SEARCH_SQL.format(after=after_clause)), params
+    ).all()
@@ -0,0 +1,52 @@
+import json
+import logging
+from itertools import chain, islice
+
+from flask import Response, stream_with_context
+
+from app.utils.errors import LibraryError
+
+logger = logging.getLogger(__name__)
+
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_stream(args):
+    return args.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def stream_json_array(rows, serialize, batch_size=STREAM_BATCH_SIZE):
+    """Stream ``rows`` as a JSON array without building the list in memory.
+
+    Rows are encoded ``batch_size`` at a time, so only one batch of rows and
+    its encoded text are alive at once however long the result set is. The
+    first row is fetched before the response starts, so a bad request or a
+    failing query still gets the normal error response. Once the status has
+    been sent a failure can only be reported in the body: the array is left
+    unclosed and an ``{"error": ...}`` line follows, so a client can always
+    tell a truncated stream from a complete one, which ends with ``]``.
+    """
+    rows = iter(rows)
+    first = list(islice(rows, 1))
+
+    def generate():
+        yield "["
+        separator = ""
+        batch = []
+        try:
+            for row in chain(first, rows):
+                batch.append(json.dumps(serialize(row)))
+                if len(batch) >= batch_size:
+                    yield separator + ",".join(batch)
+                    separator = ","
+                    batch = []
+        except Exception as e:
+            logger.exception("JSON array stream failed")
+            message = e.message if isinstance(e, LibraryError) else "Stream failed"
+            yield "\n" + json.dumps({"error": message}) + "\n"
+            return
+        if batch:
+            yield separator + ",".join(batch)
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
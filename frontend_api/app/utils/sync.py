@@ -0,0 +1,234 @@
+import logging
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import delete, insert, select, update
+
+from app import db
+from app.models.book import Book
+from app.models.sync_state import SyncState
+from app.utils.bus import get_event_bus
+from app.utils.cache import bump_catalogue_version
+from app.utils.errors import LibraryError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+BOOK_FIELDS = ("title", "author", "publisher", "category")
+MAX_SYNC_EVENTS = 5000
+# Sequence numbers of the backend's catalogue events.
+CATALOGUE_STREAM = "backend_catalogue"
+# Outcomes that modified the catalogue.
+CHANGED_STATUSES = ("added", "updated", "deleted")
+# Keeps IN (...) lists well below SQLite's bound-parameter limit.
+CHUNK_SIZE = 500
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _existing_ids(ids):
+    existing = set()
+    for chunk in _chunks(list(set(ids))):
+        existing.update(db.session.scalars(select(Book.id).where(Book.id.in_(chunk))))
+    return existing
+
+
+def event_book_id(event):
+    """The book an event is about, if it names one."""
+    if event.get("book_id") is not None:
+        return event["book_id"]
+    book = event.get("book")
+    return book.get("id") if isinstance(book, dict) else None
+
+
+def _parse_event(event):
+    """Return ``(action, book_id, values)`` or raise ValidationError."""
+    if not isinstance(event, dict):
+        raise ValidationError("Event must be an object")
+
+    action = event.get("action")
+    if action == "delete":
+        book_id = event.get("book_id")
+        if book_id is None and isinstance(event.get("book"), dict):
+            book_id = event["book"].get("id")
+        if not isinstance(book_id, int):
+            raise ValidationError("Delete events need an integer book_id")
+        return action, book_id, None
+
+    if action not in ("add", "update"):
+        raise ValidationError(f"Unknown sync action: {action}")
+
+    book = event.get("book")
+    if not isinstance(book, dict) or not isinstance(book.get("id"), int):
+        raise ValidationError(f"{action.capitalize()} events need a book with an id")
+    values = {field: book[field] for field in BOOK_FIELDS if field in book}
+    if action == "add" and len(values) != len(BOOK_FIELDS):
+        raise ValidationError("Missing required fields")
+    return action, book["id"], values
+
+
+def _apply_adds(events, outcomes):
+    existing = _existing_ids([book_id for _, book_id, _ in events])
+    rows = []
+    for index, book_id, values in events:
+        if book_id in existing:
+            outcomes[index] = "exists"
+            continue
+        existing.add(book_id)
+        rows.append({"id": book_id, **values})
+        outcomes[index] = "added"
+    for chunk in _chunks(rows):
+        db.session.execute(insert(Book), chunk)
+
+
+def _apply_updates(events, outcomes):
+    existing = _existing_ids([book_id for _, book_id, _ in events])
+    rows = []
+    for index, book_id, values in events:
+        if book_id not in existing:
+            outcomes[index] = "not_found"
+            continue
+        if values:
+            rows.append({"id": book_id, **values})
+        outcomes[index] = "updated"
+    # Bulk UPDATE by primary key wants rows that set the same columns.
+    for _, group in groupby(rows, key=lambda row: sorted(row)):
+        for chunk in _chunks(list(group)):
+            db.session.execute(update(Book), chunk)
+
+
+def _apply_deletes(events, outcomes):
+    ids = [book_id for _, book_id, _ in events]
+    existing = _existing_ids(ids)
+    for index, book_id, _ in events:
+        if book_id in existing:
+            outcomes[index] = "deleted"
+            existing.discard(book_id)
+        else:
+            outcomes[index] = "not_found"
+    for chunk in _chunks(list(set(ids))):
+        db.session.execute(
+            delete(Book)
+            .where(Book.id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+
+
+_APPLIERS = {"add": _apply_adds, "update": _apply_updates, "delete": _apply_deletes}
+
+
+def covered_seq(stream=CATALOGUE_STREAM):
+    """The last backend event already reflected in the catalogue."""
+    state = db.session.get(SyncState, stream)
+    return state.last_seq if state is not None else 0
+
+
+def _move_mark(stream, last_seq, seq):
+    if db.session.get(SyncState, stream) is None:
+        db.session.add(SyncState(stream=stream, last_seq=0))
+        db.session.flush()
+    # Moving the mark only from the value we read means two overlapping
+    # deliveries cannot both apply the same events.
+    moved = db.session.execute(
+        update(SyncState)
+        .where(SyncState.stream == stream, SyncState.last_seq == last_seq)
+        .values(last_seq=seq, updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    if moved.rowcount != 1:
+        raise LibraryError("Catalogue events were applied concurrently", 409)
+
+
+def apply_catalogue_events(events, stream=CATALOGUE_STREAM):
+    """Apply catalogue sync events in order inside the caller's transaction.
+
+    Backend events carry increasing ``seq`` numbers, and ``stream`` records
+    the highest one applied. An event at or below that mark, or below one
+    earlier in the batch, is a duplicate or has been overtaken, and is
+    ``skipped`` with a single comparison; the snapshot the catalogue was
+    bootstrapped from covers every stream. Events without a ``seq`` are
+    always applied. Consecutive events with the same action are applied
+    with one bulk statement per chunk instead of one statement per book.
+    Returns a list of ``{"action", "book_id", "status"}`` outcomes in the
+    order of ``events``; the caller commits.
+    """
+    if len(events) > MAX_SYNC_EVENTS:
+        raise ValidationError(f"Cannot sync more than {MAX_SYNC_EVENTS} events")
+
+    last_seq = covered_seq(stream)
+    covered = max(last_seq, covered_seq())
+    parsed = []
+    results = []
+    for index, event in enumerate(events):
+        seq = event.get("seq") if isinstance(event, dict) else None
+        if isinstance(seq, int) and seq <= covered:
+            results.append(
+                {
+                    "action": event.get("action"),
+                    "book_id": event_book_id(event),
+                    "status": "skipped",
+                }
+            )
+            continue
+        if isinstance(seq, int):
+            covered = seq
+        try:
+            action, book_id, values = _parse_event(event)
+        except ValidationError as e:
+            results.append(
+                {
+                    "action": None,
+                    "book_id": None,
+                    "status": "invalid",
+                    "error": e.message,
+                }
+            )
+            continue
+        parsed.append((action, index, book_id, values))
+        results.append({"action": action, "book_id": book_id, "status": None})
+
+    outcomes = {}
+    for action, run in groupby(parsed, key=lambda event: event[0]):
+        _APPLIERS[action]([event[1:] for event in run], outcomes)
+
+    if covered > last_seq:
+        _move_mark(stream, last_seq, covered)
+
+    for index, status in outcomes.items():
+        results[index]["status"] = status
+    return results
+
+
+def apply_catalogue_batch(events):
+    """Apply and commit a batch of catalogue events taken off the event bus.
+
+    Only events within a partition arrive in ``seq`` order, so each
+    partition keeps its own high-water mark.
+    """
+    bus = get_event_bus()
+    partitions = {}
+    for index, event in enumerate(events):
+        key = event_book_id(event) if isinstance(event, dict) else None
+        partitions.setdefault(bus.partition_for("catalogue", key), []).append(index)
+
+    results = [None] * len(events)
+    try:
+        for partition, indexes in partitions.items():
+            outcomes = apply_catalogue_events(
+                [events[index] for index in indexes],
+                stream=f"{CATALOGUE_STREAM}/{partition}",
+            )
+            for index, result in zip(indexes, outcomes):
+                results[index] = result
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if any(result["status"] in CHANGED_STATUSES for result in results):
+        bump_catalogue_version()
+    for result in results:
+        if result["status"] == "invalid":
+            logger.error("Rejected catalogue event: %s", result["error"])
+    return results
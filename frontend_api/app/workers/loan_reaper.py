@@ -0,0 +1,127 @@
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+
+from app import db
+from app.models.book import Book, BorrowedBook
+from app.utils.cache import bump_catalogue_version
+from app.utils.outbox import enqueue_loan_event, notify_loan_dispatcher
+
+logger = logging.getLogger(__name__)
+
+
+class LoanReaper:
+    """Returns overdue loans to the catalogue.
+
+    The reaper sleeps until the earliest ``return_date`` among loans that are
+    still out, which it finds through the partial index on active loans,
+    then releases every due loan in batches. Each return is queued for the
+    backend in the same transaction. ``clock`` is injectable so tests can
+    move time by hand.
+    """
+
+    def __init__(self, app, clock=datetime.now, batch_size=500, max_sleep=60):
+        self.app = app
+        self.clock = clock
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_due(self):
+        with self.app.app_context():
+            return db.session.scalar(
+                select(func.min(BorrowedBook.return_date)).where(
+                    BorrowedBook.returned_at.is_(None)
+                )
+            )
+
+    def seconds_until_next_due(self):
+        due = self.next_due()
+        if due is None:
+            return self.max_sleep
+        wait = (due - self.clock()).total_seconds()
+        return min(max(wait, 0), self.max_sleep)
+
+    def release_batch(self):
+        """Release up to ``batch_size`` due loans; returns how many."""
+        now = self.clock()
+        with self.app.app_context():
+            due = db.session.scalars(
+                select(BorrowedBook.id)
+                .where(
+                    BorrowedBook.returned_at.is_(None),
+                    BorrowedBook.return_date <= now,
+                )
+                .order_by(BorrowedBook.return_date)
+                .limit(self.batch_size)
+            ).all()
+            if not due:
+                return 0
+
+            # Only books whose loan this call actually closed are released,
+            # so a concurrent reaper can never free a book that has since
+            # been lent out again.
+            released = db.session.execute(
+                update(BorrowedBook)
+                .where(
+                    BorrowedBook.id.in_(due),
+                    BorrowedBook.returned_at.is_(None),
+                )
+                .values(returned_at=now)
+                .returning(BorrowedBook.id, BorrowedBook.book_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.session.execute(
+                update(Book)
+                .where(Book.id.in_([loan.book_id for loan in released]))
+                .values(available=True)
+                .execution_options(synchronize_session=False)
+            )
+            for loan in sorted(released):
+                enqueue_loan_event(
+                    {
+                        "action": "return",
+                        "loan_id": loan.id,
+                        "book_id": loan.book_id,
+                        "returned_at": now.isoformat(),
+                    }
+                )
+            db.session.commit()
+            bump_catalogue_version()
+            notify_loan_dispatcher()
+
+        return len(released)
+
+    def release_due(self):
+        released = 0
+        while True:
+            count = self.release_batch()
+            released += count
+            if count < self.batch_size:
+                return released
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                released = self.release_due()
+                if released:
+                    logger.info("Returned %d overdue loans to the catalogue", released)
+                wait = self.seconds_until_next_due()
+            except Exception:
+                logger.exception("Loan reaper iteration failed")
+                wait = self.max_sleep
+            self._stop.wait(wait)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.run, name="loan-reaper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
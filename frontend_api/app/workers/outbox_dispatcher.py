@@ -0,0 +1,151 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from app import db
+from app.models.outbox import LoanOutbox
+from app.utils.backend import sync_loans_with_backend
+from app.utils.outbox import loan_outbox_epoch
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    """Drains the loan outbox to the backend in id order.
+
+    Each pass sends the oldest pending events as one batch, each tagged with
+    its outbox id as ``seq`` and the outbox epoch as ``source``. When
+    delivery fails the batch stays pending and is retried with exponential
+    backoff; later events wait behind it so the backend always applies loans
+    in the order they were committed, and a batch that is delivered twice is
+    ignored the second time.
+    """
+
+    def __init__(
+        self,
+        app,
+        send=sync_loans_with_backend,
+        clock=datetime.now,
+        batch_size=500,
+        poll_interval=1.0,
+        base_backoff=1.0,
+        max_backoff=300.0,
+    ):
+        self.app = app
+        self.send = send
+        self.clock = clock
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def backoff(self, attempts):
+        return min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+
+    def _pending(self, limit):
+        return db.session.scalars(
+            select(LoanOutbox)
+            .where(LoanOutbox.dispatched_at.is_(None))
+            .order_by(LoanOutbox.id)
+            .limit(limit)
+        ).all()
+
+    def dispatch_batch(self):
+        """Send one batch; returns the number of events delivered."""
+        now = self.clock()
+        with self.app.app_context():
+            source = loan_outbox_epoch()
+            entries = self._pending(self.batch_size)
+            if not entries or entries[0].next_attempt_at > now:
+                return 0
+
+            ids = [entry.id for entry in entries]
+            try:
+                summary = self.send(
+                    [
+                        {**entry.payload, "seq": entry.id, "source": source}
+                        for entry in entries
+                    ]
+                )
+            except Exception as exc:
+                attempts = entries[0].attempts + 1
+                db.session.execute(
+                    update(LoanOutbox)
+                    .where(LoanOutbox.id.in_(ids))
+                    .values(
+                        attempts=LoanOutbox.attempts + 1,
+                        last_error=str(exc)[:1000],
+                        next_attempt_at=now + timedelta(seconds=self.backoff(attempts)),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+                logger.warning(
+                    "Outbox delivery of %d events failed (attempt %d): %s",
+                    len(ids),
+                    attempts,
+                    exc,
+                )
+                return 0
+
+            for rejected in (summary or {}).get("rejected", []):
+                logger.error(
+                    "Backend rejected loan event %s: %s",
+                    rejected.get("seq"),
+                    rejected.get("error"),
+                )
+            db.session.execute(
+                update(LoanOutbox)
+                .where(LoanOutbox.id.in_(ids))
+                .values(attempts=LoanOutbox.attempts + 1, dispatched_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return len(ids)
+
+    def drain(self):
+        delivered = 0
+        while True:
+            count = self.dispatch_batch()
+            delivered += count
+            if count < self.batch_size:
+                return delivered
+
+    def seconds_until_next_attempt(self):
+        with self.app.app_context():
+            head = self._pending(1)
+        if not head:
+            return self.poll_interval
+        wait = (head[0].next_attempt_at - self.clock()).total_seconds()
+        return min(max(wait, 0), self.max_backoff)
+
+    def run(self):
+        while not self._stopped:
+            try:
+                self.drain()
+                wait = self.seconds_until_next_attempt()
+            except Exception:
+                logger.exception("Outbox dispatcher iteration failed")
+                wait = self.poll_interval
+            self._wake.wait(wait or self.poll_interval)
+            self._wake.clear()
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.run, name="loan-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,56 @@
+"""book full text search
+
+Revision ID: 53d58fa9082d
+Revises: a1c0e91e1172
+Create Date: 2026-10-18 08:42:08.945615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '53d58fa9082d'
+down_revision = 'a1c0e91e1172'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5("
+        "title, author, content='book', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book "
+        "WHEN new.available BEGIN "
+        "INSERT INTO book_fts(rowid, title, author) "
+        "VALUES (new.id, new.title, new.author); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book "
+        "WHEN old.available BEGIN "
+        "INSERT INTO book_fts(book_fts, rowid, title, author) "
+        "VALUES ('delete', old.id, old.title, old.author); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS book_fts_au "
+        "AFTER UPDATE OF title, author, available ON book BEGIN "
+        "INSERT INTO book_fts(book_fts, rowid, title, author) "
+        "SELECT 'delete', old.id, old.title, old.author WHERE old.available; "
+        "INSERT INTO book_fts(rowid, title, author) "
+        "SELECT new.id, new.title, new.author WHERE new.available; END"
+    )
+    # index the books that are already in the catalogue
+    op.execute(
+        "INSERT INTO book_fts(rowid, title, author) "
+        "SELECT id, title, author FROM book WHERE available"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS book_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS book_fts_ai")
+    op.execute("DROP TABLE IF EXISTS book_fts")
@@ -0,0 +1,35 @@
+"""enrollment events for existing users
+
+Revision ID: 8199a5005b37
+Revises: fe96942a7411
+Create Date: 2026-10-18 09:16:33.255298
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8199a5005b37'
+down_revision = 'fe96942a7411'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # queue every existing user for the backend's user directory
+    op.execute(
+        "INSERT INTO loan_outbox(payload, created_at, attempts, next_attempt_at) "
+        "SELECT json_object('action', 'enroll', 'user_id', id, 'email', email, "
+        "'firstname', firstname, 'lastname', lastname, 'enrolled_at', "
+        "replace(coalesce(created_at, datetime('now', 'localtime')), ' ', 'T')), "
+        "datetime('now', 'localtime'), 0, datetime('now', 'localtime') "
+        "FROM user ORDER BY id"
+    )
+
+
+def downgrade():
+    op.execute(
+        "DELETE FROM loan_outbox WHERE dispatched_at IS NULL "
+        "AND json_extract(payload, '$.action') = 'enroll'"
+    )
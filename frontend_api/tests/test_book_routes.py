@@ -1,7 +1,18 @@
+import json
+import threading
+import time
+
 import pytest
+from sqlalchemy import delete, event, insert
 from app import create_app, db
-from app.models.book import Book
+from app.models.book import Book, BookFacet, BorrowedBook, CatalogueVersion
+from app.models.outbox import LoanOutbox
 from app.models.user import User
+from app.routes import book_routes
+from app.routes.book_routes import serialize_book
+from app.utils.cache import CatalogueCache
+from app.utils.errors import ValidationError
+from app.utils.filters import available_books_page
 
 
 @pytest.fixture
@@ -96,6 +107,18 @@ def test_borrow_book(client):
 
     assert borrowed.available is False
 
+    # ...and that the loan is queued for the backend in the same commit
+    loan = BorrowedBook.query.one()
+    event = LoanOutbox.query.one().payload
+    assert event == {
+        "action": "borrow",
+        "loan_id": loan.id,
+        "book_id": book.id,
+        "user_email": "test@example.com",
+        "borrow_date": loan.borrow_date.isoformat(),
+        "return_date": response.json["return_date"],
+    }
+
 
 def test_borrow_book_already_borrowed(client):
     """Test trying to borrow an already borrowed book."""
@@ -195,3 +218,799 @@ def test_sync_books_delete(client):
 
     book = db.session.get(Book, 20)
     assert book is None  # Ensure book is deleted
+
+
+def test_list_books_paginates_with_cursor(client):
+    """Test walking the catalogue page by page with the next cursor."""
+    db.session.add_all(
+        [
+            Book(
+                title=f"Paged {i}",
+                author="Author",
+                publisher="Pub",
+                category="Fiction",
+                available=True,
+            )
+            for i in range(5)
+        ]
+    )
+    db.session.commit()
+
+    response = client.get("/books?limit=2")
+    assert response.status_code == 200
+    assert [b["title"] for b in response.json] == ["Paged 0", "Paged 1"]
+    cursor = response.headers["X-Next-Cursor"]
+    assert 'rel="next"' in response.headers["Link"]
+
+    response = client.get(f"/books?limit=2&after={cursor}")
+    assert [b["title"] for b in response.json] == ["Paged 2", "Paged 3"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/books?limit=2&after={cursor}")
+    assert [b["title"] for b in response.json] == ["Paged 4"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_list_books_cursor_with_filters(client):
+    """Test that the cursor keeps the publisher and category filters."""
+    db.session.add_all(
+        [
+            Book(
+                title=f"Book {i}",
+                author="Author",
+                publisher="Wiley" if i % 2 else "Manning",
+                category="Science",
+                available=True,
+            )
+            for i in range(6)
+        ]
+    )
+    db.session.commit()
+
+    response = client.get("/books?publisher=Wiley&limit=2")
+    assert [b["title"] for b in response.json] == ["Book 1", "Book 3"]
+    link = response.headers["Link"]
+    assert "publisher=Wiley" in link
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/books?publisher=Wiley&limit=2&after={cursor}")
+    assert [b["title"] for b in response.json] == ["Book 5"]
+
+
+def test_list_books_invalid_cursor(client):
+    """Test that a tampered cursor is rejected."""
+    response = client.get("/books?after=not-a-cursor")
+    assert response.status_code == 400
+
+    response = client.get("/books?limit=0")
+    assert response.status_code == 400
+
+
+def test_list_books_multi_value_filters(client):
+    """Test comma separated publisher and category filters."""
+    db.session.add_all(
+        [
+            Book(title="W1", author="A", publisher="Wiley", category="science"),
+            Book(title="M1", author="A", publisher="Manning", category="science"),
+            Book(title="A1", author="A", publisher="Apress", category="science"),
+            Book(title="W2", author="A", publisher="Wiley", category="fiction"),
+            Book(title="M2", author="A", publisher="Manning", category="history"),
+        ]
+    )
+    db.session.commit()
+
+    response = client.get("/books?publisher=Wiley,Manning&category=science")
+    assert [b["title"] for b in response.json] == ["W1", "M1"]
+
+    response = client.get("/books?publisher=Wiley&publisher=Manning")
+    assert [b["title"] for b in response.json] == ["W1", "M1", "W2", "M2"]
+
+    response = client.get("/books?publisher=Wiley,Manning&limit=3")
+    assert [b["title"] for b in response.json] == ["W1", "M1", "W2"]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/books?publisher=Wiley,Manning&limit=3&after={cursor}")
+    assert [b["title"] for b in response.json] == ["M2"]
+
+
+@pytest.mark.parametrize(
+    "publishers, categories, index",
+    [
+        (None, None, "ix_book_available_id"),
+        (["Wiley"], None, "ix_book_available_publisher_id"),
+        (["Wiley", "Manning"], None, "ix_book_available_publisher_id"),
+        (None, ["science"], "ix_book_available_category_id"),
+        (["Wiley"], ["science"], "ix_book_available_publisher_category_id"),
+        (
+            ["Wiley", "Manning"],
+            ["science", "fiction"],
+            "ix_book_available_publisher_category_id",
+        ),
+    ],
+)
+@pytest.mark.parametrize("after_id", [None, 1])
+def test_filter_paths_use_indexes(client, publishers, categories, index, after_id):
+    """Test that every filter path is answered from a composite index."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        available_books_page(publishers, categories, after_id, 11)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+    statement, parameters = statements[-1]
+    plan = [
+        row[3]
+        for row in db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+    ]
+    searches = [step for step in plan if step.startswith(("SEARCH", "SCAN"))]
+    book_searches = [step for step in searches if step.startswith("SEARCH book")]
+    assert book_searches
+    assert all(f"USING INDEX {index}" in step for step in book_searches)
+    assert not any(step.startswith("SCAN book") for step in searches)
+
+
+def test_search_books(client):
+    """Test ranked prefix search over titles and authors."""
+    db.session.add_all(
+        [
+            Book(
+                title="Learning Python",
+                author="Mark Lutz",
+                publisher="O'Reilly",
+                category="technology",
+            ),
+            Book(
+                title="Fluent Python",
+                author="Luciano Ramalho",
+                publisher="O'Reilly",
+                category="technology",
+            ),
+            Book(
+                title="Dune",
+                author="Frank Herbert",
+                publisher="Ace",
+                category="fiction",
+            ),
+        ]
+    )
+    db.session.commit()
+
+    response = client.get("/books/search?q=pyth")
+    assert response.status_code == 200
+    assert {b["title"] for b in response.json} == {"Learning Python", "Fluent Python"}
+
+    response = client.get("/books/search?q=herb")
+    assert [b["title"] for b in response.json] == ["Dune"]
+
+    response = client.get("/books/search?q=fluent ramal")
+    assert [b["title"] for b in response.json] == ["Fluent Python"]
+
+    response = client.get("/books/search?q=")
+    assert response.status_code == 400
+
+
+def test_search_books_paginates(client):
+    """Test walking ranked search results with the next cursor."""
+    db.session.add_all(
+        [
+            Book(
+                title=f"Python volume {i}",
+                author="Guido",
+                publisher="Pub",
+                category="technology",
+            )
+            for i in range(5)
+        ]
+    )
+    db.session.commit()
+
+    seen = []
+    url = "/books/search?q=python&limit=2"
+    while url:
+        response = client.get(url)
+        seen.extend(b["id"] for b in response.json)
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/books/search?q=python&limit=2&after={cursor}" if cursor else None
+
+    assert sorted(seen) == sorted(set(seen))
+    assert len(seen) == 5
+
+
+def test_search_cursor_rejected_after_catalogue_change(client):
+    """Test that a search cursor from before a catalogue change is refused."""
+    db.session.add_all(
+        [
+            Book(title=f"Python {i}", author="G", publisher="P", category="C")
+            for i in range(3)
+        ]
+    )
+    db.session.commit()
+    cursor = client.get("/books/search?q=python&limit=1").headers["X-Next-Cursor"]
+    assert client.get(f"/books/search?q=python&after={cursor}").status_code == 200
+
+    db.session.add(Book(title="Python 3", author="G", publisher="P", category="C"))
+    db.session.commit()
+    response = client.get(f"/books/search?q=python&after={cursor}")
+    assert response.status_code == 409
+    assert "start again from the first page" in response.json[0]["error"]
+
+
+def test_search_index_follows_sync_and_borrow(client):
+    """Test that the search index tracks sync adds, deletes and borrows."""
+    user = User(id=1, firstname="Test", lastname="User", email="test@example.com")
+    db.session.add(user)
+    db.session.commit()
+
+    for book_id, title in [(1, "Kotlin in Action"), (2, "Kotlin Cookbook")]:
+        client.post(
+            "/sync/books",
+            json={
+                "action": "add",
+                "book": {
+                    "id": book_id,
+                    "title": title,
+                    "author": "JetBrains",
+                    "publisher": "Manning",
+                    "category": "technology",
+                },
+            },
+        )
+    response = client.get("/books/search?q=kotlin")
+    assert {b["id"] for b in response.json} == {1, 2}
+
+    client.post("/books/1/borrow", json={"user_id": 1, "days": 7})
+    response = client.get("/books/search?q=kotlin")
+    assert [b["id"] for b in response.json] == [2]
+
+    client.post("/sync/books", json={"action": "delete", "book_id": 2})
+    response = client.get("/books/search?q=kotlin")
+    assert response.json == []
+
+
+def test_list_books_etag_not_modified(client):
+    """Test that an unchanged catalogue is served with only a version lookup."""
+    db.session.add(Book(title="Cached", author="A", publisher="P", category="C"))
+    db.session.commit()
+
+    response = client.get("/books")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        response = client.get("/books", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+
+        response = client.get("/books")
+        assert response.status_code == 200
+        assert response.json[0]["title"] == "Cached"
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+    # One primary-key read of the catalogue version per request.
+    assert len(statements) == 2
+    assert all("FROM catalogue_version" in statement for statement in statements)
+
+    stats = client.get("/metrics/cache").json
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+    # The ETag depends only on the database, so another process or a restart
+    # still answers 304; a rebuilt database starts a new epoch.
+    client.application.extensions["catalogue_cache"] = CatalogueCache()
+    response = client.get("/books", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    db.session.execute(delete(CatalogueVersion))
+    db.session.add(Book(title="Rebuilt", author="A", publisher="P", category="C"))
+    db.session.commit()
+    assert db.session.get(CatalogueVersion, 1).version == 1
+    response = client.get("/books", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_catalogue_cache_invalidated_by_sync_and_borrow(client):
+    """Test that sync and borrow bump the catalogue version."""
+    user = User(id=1, firstname="Test", lastname="User", email="test@example.com")
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.get("/books")
+    assert response.json == []
+    etag = response.headers["ETag"]
+
+    client.post(
+        "/sync/books",
+        json={
+            "action": "add",
+            "book": {
+                "id": 5,
+                "title": "Fresh",
+                "author": "A",
+                "publisher": "P",
+                "category": "C",
+            },
+        },
+    )
+    response = client.get("/books", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [b["id"] for b in response.json] == [5]
+    assert client.get("/books/5").json["available"] is True
+
+    client.post("/books/5/borrow", json={"user_id": 1, "days": 3})
+    assert client.get("/books").json == []
+    assert client.get("/books/5").json["available"] is False
+
+
+def test_catalogue_cache_sees_changes_from_other_processes(client):
+    """Test that a change committed without this process's help is served."""
+    db.session.add(Book(id=1, title="Old", author="A", publisher="P", category="C"))
+    db.session.commit()
+    etag = client.get("/books/1").headers["ETag"]
+    assert client.get("/books/1").json["title"] == "Old"
+
+    # As a worker process would, bypassing this process's cache entirely.
+    db.session.execute(db.update(Book).where(Book.id == 1).values(title="New"))
+    db.session.commit()
+
+    response = client.get("/books/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["title"] == "New"
+
+
+def test_catalogue_cache_lru_eviction():
+    """Test that the cache keeps at most max_entries, evicting the oldest."""
+    cache = CatalogueCache(max_entries=2)
+    cache.set("a", "", 0, (b"a", {}))
+    cache.set("b", "", 0, (b"b", {}))
+    cache.get("a")
+    cache.set("c", "", 0, (b"c", {}))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"a", {})
+    assert cache.stats()["evictions"] == 1
+
+    cache.observe("", 1)
+    assert cache.get("a") is None
+    cache.set("d", "", 0, (b"d", {}))
+    assert cache.get("d") is None
+    cache.observe("f00d", 1)
+    cache.set("e", "", 1, (b"e", {}))
+    assert cache.get("e") is None
+
+
+def test_concurrent_borrows_never_double_lend(client):
+    """Test that racing borrowers get each book exactly once."""
+    app = client.application
+    books = [
+        Book(title=f"Contended {i}", author="A", publisher="P", category="C")
+        for i in range(20)
+    ]
+    users = [
+        User(email=f"racer{i}@example.com", firstname="Racer", lastname=str(i))
+        for i in range(8)
+    ]
+    db.session.add_all(books + users)
+    db.session.commit()
+    book_ids = [book.id for book in books]
+    user_ids = [user.id for user in users]
+
+    results = []
+    start = threading.Barrier(len(user_ids))
+
+    def borrower(user_id):
+        local_client = app.test_client()
+        start.wait()
+        for book_id in book_ids:
+            response = local_client.post(
+                f"/books/{book_id}/borrow", json={"user_id": user_id, "days": 7}
+            )
+            results.append((book_id, response.status_code, response.json))
+
+    threads = [threading.Thread(target=borrower, args=(uid,)) for uid in user_ids]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # Exactly one borrower wins each book; everyone else is told it is out.
+    for book_id in book_ids:
+        attempts = [(status, body) for bid, status, body in results if bid == book_id]
+        assert len(attempts) == len(user_ids)
+        assert [status for status, _ in attempts].count(200) == 1
+        assert all(
+            status == 400
+            and body[0] == {"error": f"Book with ID {book_id} is not available"}
+            for status, body in attempts
+            if status != 200
+        )
+
+    db.session.expire_all()
+    loans = db.session.query(BorrowedBook).all()
+    assert sorted(loan.book_id for loan in loans) == sorted(book_ids)
+    assert not any(book.available for book in db.session.query(Book))
+
+    print(
+        f"\n{len(results)} borrow attempts, {len(loans)} loans in {elapsed:.3f}s "
+        f"({len(results) / elapsed:.0f} borrows/sec)"
+    )
+
+
+def test_borrow_many_books(client):
+    """Test borrowing a basket of books in one request."""
+    books = [
+        Book(title=f"Basket {i}", author="A", publisher="P", category="C")
+        for i in range(3)
+    ]
+    user = User(id=1, firstname="Test", lastname="User", email="test@example.com")
+    db.session.add_all(books + [user])
+    db.session.commit()
+
+    payload = {
+        "user_id": 1,
+        "items": [{"book_id": book.id, "days": i + 1} for i, book in enumerate(books)],
+    }
+    response = client.post("/borrows", json=payload)
+
+    assert response.status_code == 200
+    assert response.json["borrowed"] == 3
+    assert [loan["status"] for loan in response.json["loans"]] == [200, 200, 200]
+    assert all("return_date" in loan for loan in response.json["loans"])
+    assert db.session.query(BorrowedBook).count() == 3
+    assert not any(book.available for book in db.session.query(Book))
+
+
+def test_borrow_many_books_is_all_or_nothing(client):
+    """Test that one unavailable book fails the whole atomic basket."""
+    free = Book(title="Free", author="A", publisher="P", category="C")
+    taken = Book(
+        title="Taken", author="A", publisher="P", category="C", available=False
+    )
+    user = User(id=1, firstname="Test", lastname="User", email="test@example.com")
+    db.session.add_all([free, taken, user])
+    db.session.commit()
+
+    payload = {
+        "user_id": 1,
+        "items": [{"book_id": free.id, "days": 7}, {"book_id": taken.id, "days": 7}],
+    }
+    response = client.post("/borrows", json=payload)
+
+    assert response.status_code == 400
+    assert f"Book with ID {taken.id} is not available" in response.json[0]["error"]
+    db.session.expire_all()
+    assert db.session.get(Book, free.id).available is True
+    assert db.session.query(BorrowedBook).count() == 0
+    assert db.session.query(LoanOutbox).count() == 0
+
+
+def test_borrow_many_books_partial(client):
+    """Test that partial mode keeps the loans that succeeded."""
+    free = Book(title="Free", author="A", publisher="P", category="C")
+    taken = Book(
+        title="Taken", author="A", publisher="P", category="C", available=False
+    )
+    user = User(id=1, firstname="Test", lastname="User", email="test@example.com")
+    db.session.add_all([free, taken, user])
+    db.session.commit()
+
+    payload = {
+        "user_id": 1,
+        "mode": "partial",
+        "items": [
+            {"book_id": free.id, "days": 7},
+            {"book_id": taken.id, "days": 7},
+            {"book_id": 999, "days": 7},
+            {"book_id": free.id, "days": -1},
+        ],
+    }
+    response = client.post("/borrows", json=payload)
+
+    assert response.status_code == 200
+    assert response.json["borrowed"] == 1
+    assert [loan["status"] for loan in response.json["loans"]] == [200, 400, 404, 400]
+    db.session.expire_all()
+    assert db.session.get(Book, free.id).available is False
+    assert db.session.query(BorrowedBook).count() == 1
+    assert [entry.payload["book_id"] for entry in db.session.query(LoanOutbox)] == [
+        free.id
+    ]
+
+
+def test_borrow_many_books_unknown_user(client):
+    """Test that the user is validated once for the whole basket."""
+    book = Book(title="Free", author="A", publisher="P", category="C")
+    db.session.add(book)
+    db.session.commit()
+
+    payload = {"user_id": 42, "items": [{"book_id": book.id, "days": 7}]}
+    response = client.post("/borrows", json=payload)
+
+    assert response.status_code == 404
+
+
+def test_sync_books_batch(client):
+    """Test applying a mixed batch of sync events in one request."""
+    db.session.add(
+        Book(id=1, title="Old Title", author="A", publisher="P", category="C")
+    )
+    db.session.commit()
+
+    def book(book_id, title):
+        return {
+            "id": book_id,
+            "title": title,
+            "author": "Batch Author",
+            "publisher": "Batch Pub",
+            "category": "Batch Cat",
+        }
+
+    payload = {
+        "events": [
+            {"action": "add", "book": book(2, "Two")},
+            {"action": "add", "book": book(3, "Three")},
+            {"action": "add", "book": book(1, "Duplicate")},
+            {"action": "update", "book": {"id": 1, "title": "New Title"}},
+            {"action": "delete", "book_id": 3},
+            {"action": "delete", "book_id": 99},
+            {"action": "add", "book": book(3, "Three again")},
+            {"action": "rename", "book_id": 1},
+        ]
+    }
+    response = client.post("/sync/books", json=payload)
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["results"]] == [
+        "added",
+        "added",
+        "exists",
+        "updated",
+        "deleted",
+        "not_found",
+        "added",
+        "invalid",
+    ]
+    assert response.json["applied"] == 7
+
+    db.session.expire_all()
+    assert db.session.get(Book, 1).title == "New Title"
+    assert db.session.get(Book, 2).title == "Two"
+    assert db.session.get(Book, 3).title == "Three again"
+
+
+def test_sync_books_skips_events_already_applied(client):
+    """Test that redelivered and overtaken events are skipped by seq."""
+
+    def add(seq, book_id, title):
+        return {
+            "seq": seq,
+            "action": "add",
+            "book": {
+                "id": book_id,
+                "title": title,
+                "author": "A",
+                "publisher": "P",
+                "category": "C",
+            },
+        }
+
+    batch = [add(1, 1, "One"), add(2, 2, "Two")]
+    response = client.post("/sync/books", json=batch)
+    assert response.json["applied"] == 2
+    assert response.json["last_seq"] == 2
+
+    # The dispatcher lost the response and sends the batch again, along
+    # with a stale delete that a newer update has already overtaken.
+    response = client.post(
+        "/sync/books",
+        json=batch
+        + [
+            {"seq": 4, "action": "update", "book": {"id": 1, "title": "New"}},
+            {"seq": 3, "action": "delete", "book_id": 1},
+        ],
+    )
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json["results"]] == [
+        "skipped",
+        "skipped",
+        "updated",
+        "skipped",
+    ]
+    assert response.json["results"][3]["book_id"] == 1
+    assert response.json["applied"] == 1
+    assert response.json["last_seq"] == 4
+
+    db.session.expire_all()
+    assert db.session.get(Book, 1).title == "New"
+    assert Book.query.count() == 2
+
+    response = client.get("/sync/state")
+    assert response.status_code == 200
+    assert response.json["backend_catalogue"]["last_seq"] == 4
+    assert "updated_at" in response.json["backend_catalogue"]
+
+
+def test_sync_books_bulk_import(client):
+    """Test that a large import arrives in a handful of requests."""
+    events = [
+        {
+            "action": "add",
+            "book": {
+                "id": i,
+                "title": f"Imported {i}",
+                "author": "Author",
+                "publisher": "Pub",
+                "category": "Cat",
+            },
+        }
+        for i in range(1, 10001)
+    ]
+    for start in range(0, len(events), 5000):
+        response = client.post("/sync/books", json=events[start : start + 5000])
+        assert response.status_code == 200
+        assert response.json["applied"] == 5000
+
+    assert db.session.query(Book).count() == 10000
+
+
+def test_sync_books_single_event_validation(client):
+    """Test that a malformed single event is rejected."""
+    response = client.post("/sync/books", json={"action": "add", "book": {"id": 1}})
+    assert response.status_code == 400
+
+
+def test_books_digest(client):
+    """Test range digests only change where the catalogue itself changes."""
+    client.post(
+        "/sync/books",
+        json={
+            "events": [
+                {
+                    "action": "add",
+                    "book": {
+                        "id": i,
+                        "title": f"T{i}",
+                        "author": "A",
+                        "publisher": "P",
+                        "category": "C",
+                    },
+                }
+                for i in range(1, 21)
+            ]
+        },
+    )
+    before = client.get("/sync/books/digest?parts=2").json
+    assert before["end"] == 21
+    assert [r["count"] for r in before["ranges"]] == [10, 10]
+
+    # Availability is not part of the catalogue, a new title is.
+    db.session.get(Book, 3).available = False
+    db.session.commit()
+    client.post(
+        "/sync/books", json={"action": "update", "book": {"id": 15, "title": "New"}}
+    )
+    after = client.get("/sync/books/digest?start=0&end=21&parts=2").json
+    assert after["ranges"][0] == before["ranges"][0]
+    assert after["ranges"][1]["digest"] != before["ranges"][1]["digest"]
+
+    rows = client.get("/sync/books/digest?start=14&end=16&rows=true").json["rows"]
+    assert [book_id for book_id, _ in rows] == [14, 15]
+    assert client.get("/sync/books/digest?parts=1000").status_code == 400
+
+
+def test_list_books_stream(client):
+    """Test streaming the whole filtered catalogue past the page size."""
+    db.session.execute(
+        insert(Book),
+        [
+            {
+                "title": f"Streamed {i}",
+                "author": "A",
+                "publisher": "Wiley" if i % 3 else "Manning",
+                "category": "science",
+            }
+            for i in range(2500)
+        ],
+    )
+    db.session.commit()
+
+    response = client.get("/books?stream=true&publisher=Wiley,Manning")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert [b["id"] for b in response.json] == list(range(1, 2501))
+
+    response = client.get("/books?stream=1&publisher=Manning")
+    assert len(response.json) == 834
+
+
+def test_list_books_stream_errors(client, monkeypatch):
+    """Test that streamed listings fail cleanly before and while streaming."""
+    publishers = ",".join(f"p{i}" for i in range(11))
+    categories = ",".join(f"c{i}" for i in range(5))
+    url = f"/books?publisher={publishers}&category={categories}"
+    for query in ("", "&stream=true"):
+        response = client.get(url + query)
+        assert response.status_code == 400
+        assert response.json[0] == {"error": "Too many filter combinations (max 50)"}
+
+    db.session.add_all(
+        [Book(title=f"B{i}", author="A", publisher="P", category="C") for i in range(3)]
+    )
+    db.session.commit()
+
+    def failing_serialize(book):
+        if book.id == 3:
+            raise ValidationError("Book 3 is corrupt")
+        return serialize_book(book)
+
+    monkeypatch.setattr(book_routes, "serialize_book", failing_serialize)
+    body = client.get("/books?stream=true").get_data(as_text=True)
+    with pytest.raises(ValueError):
+        json.loads(body)
+    assert json.loads(body.splitlines()[-1]) == {"error": "Book 3 is corrupt"}
+
+
+def test_book_facets(client):
+    """Test facet counts follow sync, borrow and delete."""
+    user = User(id=1, firstname="Test", lastname="User", email="test@example.com")
+    db.session.add(user)
+    db.session.commit()
+
+    def book(book_id, publisher, category):
+        return {
+            "action": "add",
+            "book": {
+                "id": book_id,
+                "title": "Faceted",
+                "author": "A",
+                "publisher": publisher,
+                "category": category,
+            },
+        }
+
+    client.post(
+        "/sync/books",
+        json=[
+            book(1, "Wiley", "science"),
+            book(2, "Wiley", "fiction"),
+            book(3, "Manning", "science"),
+            book(4, "Manning", "science"),
+        ],
+    )
+    response = client.get("/books/facets")
+    assert response.json == {
+        "publishers": {"Wiley": 2, "Manning": 2},
+        "categories": {"science": 3, "fiction": 1},
+    }
+
+    response = client.get("/books/facets?category=science")
+    assert response.json["publishers"] == {"Wiley": 1, "Manning": 2}
+    assert response.json["categories"] == {"science": 3, "fiction": 1}
+
+    response = client.get("/books/facets?publisher=Wiley")
+    assert response.json["categories"] == {"science": 1, "fiction": 1}
+
+    client.post("/books/3/borrow", json={"user_id": 1, "days": 7})
+    client.post("/sync/books", json={"action": "delete", "book_id": 2})
+    client.post(
+        "/sync/books",
+        json=[{"action": "update", "book": {"id": 1, "publisher": "Manning"}}],
+    )
+    response = client.get("/books/facets")
+    assert response.json == {
+        "publishers": {"Manning": 2},
+        "categories": {"science": 2},
+    }
+    assert db.session.query(BookFacet).count() == 1
@@ -0,0 +1,136 @@
+import pytest
+from sqlalchemy import text
+from app import create_app, db
+from app.models.book import Book, CatalogueVersion
+from app.models.sync_state import SyncState
+from app.utils.bootstrap import BOOTSTRAP_CHUNK_SIZE, bootstrap_catalogue
+from app.utils.errors import LibraryError
+
+
+@pytest.fixture
+def client():
+    """Flask test client with a test database."""
+    app = create_app()
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.session.remove()
+            db.drop_all()
+
+
+def snapshot(count, seq=3, truncated=False):
+    yield {"snapshot": {"seq": seq, "created_at": "2025-01-01T12:00:00"}}
+    for i in range(1, count + 1):
+        yield {
+            "id": i,
+            "title": "Dune" if i == 7 else f"Book {i}",
+            "author": "Frank Herbert" if i == 7 else "A",
+            "publisher": "Chilton" if i % 2 else "Ace",
+            "category": "science",
+        }
+    if not truncated:
+        yield {"end": {"seq": seq, "count": count}}
+
+
+class FakeEvents:
+    """Serves the backend's catalogue events after a sequence number."""
+
+    def __init__(self, events):
+        self.events = events
+        self.calls = []
+
+    def __call__(self, after_seq, limit):
+        self.calls.append(after_seq)
+        return [event for event in self.events if event["seq"] > after_seq][:limit]
+
+
+def triggers():
+    return {
+        row[0]
+        for row in db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        )
+    }
+
+
+def test_bootstrap_loads_snapshot_and_catches_up(client):
+    """Test a cold catalogue is bulk-loaded, indexed and brought up to date."""
+    count = BOOTSTRAP_CHUNK_SIZE + 10
+    expected_triggers = triggers()
+    events = FakeEvents(
+        [
+            {"seq": 4, "action": "update", "book": {"id": 1, "title": "Renamed"}},
+            {"seq": 5, "action": "delete", "book_id": 2},
+        ]
+    )
+
+    summary = bootstrap_catalogue(lambda: snapshot(count), events)
+
+    assert summary == {"seq": 3, "books": count, "caught_up": 2}
+    assert events.calls == [3, 5]
+    assert Book.query.count() == count - 1
+    assert db.session.get(Book, 1).title == "Renamed"
+    assert db.session.get(SyncState, "backend_catalogue").last_seq == 5
+    # The load bumps the catalogue version once, then each event does.
+    assert db.session.get(CatalogueVersion, 1).version == 3
+
+    # The search index and facet counts were built by the bulk load...
+    assert [b["id"] for b in client.get("/books/search?q=herb").json] == [7]
+    assert client.get("/books/facets").json["publishers"] == {
+        "Chilton": count // 2,
+        "Ace": count // 2 - 1,
+    }
+    # ...and the triggers that keep them current are back.
+    assert triggers() == expected_triggers
+    client.post(
+        "/sync/books",
+        json={
+            "seq": 6,
+            "action": "add",
+            "book": {
+                "id": count + 1,
+                "title": "Children of Dune",
+                "author": "Frank Herbert",
+                "publisher": "Ace",
+                "category": "science",
+            },
+        },
+    )
+    assert len(client.get("/books/search?q=herb").json) == 2
+
+
+def test_events_covered_by_the_snapshot_are_skipped(client):
+    """Test a redelivered event older than the snapshot changes nothing."""
+    bootstrap_catalogue(lambda: snapshot(5, seq=10), FakeEvents([]))
+
+    response = client.post(
+        "/sync/books",
+        json={
+            "events": [
+                {"seq": 9, "action": "delete", "book_id": 1},
+                {"seq": 11, "action": "delete", "book_id": 2},
+            ]
+        },
+    )
+    assert [result["status"] for result in response.json["results"]] == [
+        "skipped",
+        "deleted",
+    ]
+    assert response.json["applied"] == 1
+    assert db.session.get(Book, 1) is not None
+
+
+def test_bootstrap_refuses_partial_or_repeated_loads(client):
+    """Test a truncated snapshot loads nothing and a full catalogue is kept."""
+    expected_triggers = triggers()
+    with pytest.raises(LibraryError):
+        bootstrap_catalogue(lambda: snapshot(10, truncated=True), FakeEvents([]))
+    assert Book.query.count() == 0
+    assert triggers() == expected_triggers
+
+    bootstrap_catalogue(lambda: snapshot(10), FakeEvents([]))
+    with pytest.raises(LibraryError) as error:
+        bootstrap_catalogue(lambda: snapshot(10), FakeEvents([]))
+    assert "not empty" in error.value.message
+    assert Book.query.count() == 10
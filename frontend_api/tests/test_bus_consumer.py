@@ -0,0 +1,159 @@
+import pytest
+from app import create_app, db
+from app.models.book import Book
+from app.utils.bus import EventBus, get_event_bus
+from app.workers.bus_consumer import BusConsumer
+from app.utils.sync import CATALOGUE_STREAM, apply_catalogue_batch, covered_seq
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """Flask app with a test database and an in-memory event bus."""
+    monkeypatch.setenv("FLASK_EVENT_BUS_URL", "memory://")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        bus = get_event_bus()
+        yield app
+        purge(bus, "catalogue")
+        bus.close()
+        db.session.remove()
+        db.drop_all()
+
+
+def purge(bus, topic):
+    with bus.connect() as connection:
+        for queue in bus.queues(topic):
+            queue.bind(connection.default_channel).purge()
+
+
+def add(book_id, title="Title", seq=None):
+    event = {
+        "action": "add",
+        "book": {
+            "id": book_id,
+            "title": title,
+            "author": "A",
+            "publisher": "P",
+            "category": "C",
+        },
+    }
+    if seq is not None:
+        event["seq"] = seq
+    return event
+
+
+def book_key(event):
+    return event.get("book_id") or event["book"]["id"]
+
+
+class FlakyHandler:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    def __call__(self, events):
+        self.batches.append(events)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        return apply_catalogue_batch(events)
+
+
+def test_events_for_a_book_share_a_partition():
+    """Test that partitioning is stable and spreads books across queues."""
+    bus = EventBus("memory://", partitions={"catalogue": 4})
+    assert bus.partition_for("catalogue", 42) == bus.partition_for("catalogue", 42)
+    assert {bus.partition_for("catalogue", i) for i in range(100)} == {0, 1, 2, 3}
+    assert bus.partition_for("loans", 42) == 0
+
+
+def test_consumers_apply_published_catalogue_events(app):
+    """Test that consumers splitting the partitions apply every event in order."""
+    bus = get_event_bus()
+    events = [add(i) for i in range(1, 21)]
+    events += [{"action": "update", "book": {"id": 3, "title": "Renamed"}}]
+    events += [{"action": "delete", "book_id": 4}, add(4, "Re-added")]
+    bus.publish("catalogue", events, key=book_key)
+
+    partitions = bus.partition_count("catalogue")
+    consumers = [
+        BusConsumer(app, bus, "catalogue", apply_catalogue_batch, [p], batch_size=5)
+        for p in range(partitions)
+    ]
+    assert sum(consumer.drain() for consumer in consumers) == len(events)
+
+    assert Book.query.count() == 20
+    assert db.session.get(Book, 3).title == "Renamed"
+    assert db.session.get(Book, 4).title == "Re-added"
+    assert app.test_client().get("/metrics/cache").json["version"] > 0
+
+
+def test_batches_are_bounded_by_batch_size_and_prefetch(app):
+    """Test that a consumer never holds more than its prefetch window."""
+    bus = get_event_bus()
+    for i in range(1, 11):
+        bus.publish("catalogue", [add(i)], key=lambda event: 0)
+
+    handler = FlakyHandler()
+    partition = bus.partition_for("catalogue", 0)
+    consumer = BusConsumer(
+        app, bus, "catalogue", handler, [partition], batch_size=100, prefetch=3
+    )
+    assert consumer.drain() == 10
+    assert [len(batch) for batch in handler.batches] == [3, 3, 3, 1]
+
+
+def test_failed_batch_is_retried_before_newer_events(app):
+    """Test that a batch that fails is reapplied as-is, keeping book order."""
+    bus = get_event_bus()
+    bus.publish("catalogue", [add(1)], key=book_key)
+    bus.publish(
+        "catalogue",
+        [{"action": "update", "book": {"id": 1, "title": "New"}}],
+        key=book_key,
+    )
+
+    handler = FlakyHandler(failures=1)
+    consumer = BusConsumer(
+        app,
+        bus,
+        "catalogue",
+        handler,
+        [bus.partition_for("catalogue", 1)],
+        batch_size=1,
+        prefetch=1,
+    )
+    with pytest.raises(RuntimeError):
+        consumer.consume_batch()
+    assert Book.query.count() == 0
+
+    assert consumer.drain() == 2
+    assert [batch[0]["action"] for batch in handler.batches] == ["add", "add", "update"]
+    assert db.session.get(Book, 1).title == "New"
+
+
+def test_redelivered_events_are_skipped_per_partition(app):
+    """Test that each partition keeps its own mark and skips replays."""
+    bus = get_event_bus()
+    events = [add(i, seq=i) for i in range(1, 9)]
+    bus.publish("catalogue", events, key=book_key)
+    # The dispatcher retries after the broker took the first publish.
+    bus.publish("catalogue", events + [add(9, seq=9)], key=book_key)
+
+    handler = FlakyHandler()
+    for partition in range(bus.partition_count("catalogue")):
+        BusConsumer(app, bus, "catalogue", handler, [partition]).drain()
+
+    results = [
+        result for batch in handler.batches for result in apply_catalogue_batch(batch)
+    ]
+    assert Book.query.count() == 9
+    assert {result["status"] for result in results} == {"skipped"}
+
+    marks = {
+        partition: covered_seq(f"{CATALOGUE_STREAM}/{partition}")
+        for partition in range(bus.partition_count("catalogue"))
+    }
+    for book_id in range(1, 10):
+        assert marks[bus.partition_for("catalogue", book_id)] >= book_id
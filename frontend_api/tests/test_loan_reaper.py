@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.models.book import Book, BorrowedBook
+from app.models.outbox import LoanOutbox
+from app.models.user import User
+from app.workers.loan_reaper import LoanReaper
+from app.workers.runner import start_workers, stop_workers
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+@pytest.fixture
+def app():
+    """Flask app with a test database."""
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(datetime(2025, 1, 1, 12, 0))
+
+
+def lend(book_id, return_date):
+    db.session.execute(
+        db.update(Book).where(Book.id == book_id).values(available=False)
+    )
+    db.session.add(BorrowedBook(book_id=book_id, user_id=1, return_date=return_date))
+    db.session.commit()
+
+
+def seed_books(count):
+    db.session.add(User(id=1, firstname="Test", lastname="User", email="t@e.com"))
+    db.session.add_all(
+        [
+            Book(id=i, title=f"Book {i}", author="A", publisher="P", category="C")
+            for i in range(1, count + 1)
+        ]
+    )
+    db.session.commit()
+
+
+def test_sleeps_until_next_return_date(app, clock):
+    """Test that the reaper wakes at the earliest active return date."""
+    seed_books(2)
+    reaper = LoanReaper(app, clock=clock, max_sleep=3600)
+    assert reaper.seconds_until_next_due() == 3600
+
+    lend(1, clock.now + timedelta(minutes=30))
+    lend(2, clock.now + timedelta(minutes=10))
+    assert reaper.seconds_until_next_due() == 600
+
+    clock.advance(minutes=20)
+    assert reaper.seconds_until_next_due() == 0
+
+
+def test_releases_expired_loans_in_batches(app, clock):
+    """Test that due loans are returned and queued for the backend in batches."""
+    seed_books(5)
+    for book_id in range(1, 6):
+        lend(book_id, clock.now + timedelta(days=book_id))
+
+    reaper = LoanReaper(app, clock=clock, batch_size=2)
+
+    clock.advance(days=3)
+    assert reaper.release_due() == 3
+    events = [entry.payload for entry in db.session.query(LoanOutbox)]
+    assert [event["book_id"] for event in events] == [1, 2, 3]
+    assert {event["action"] for event in events} == {"return"}
+    assert {event["returned_at"] for event in events} == {clock.now.isoformat()}
+
+    db.session.expire_all()
+    available = {book.id: book.available for book in db.session.query(Book)}
+    assert available == {1: True, 2: True, 3: True, 4: False, 5: False}
+    active = db.session.query(BorrowedBook).filter(BorrowedBook.returned_at.is_(None))
+    assert sorted(loan.book_id for loan in active) == [4, 5]
+
+    assert reaper.release_due() == 0
+    assert reaper.seconds_until_next_due() == 60
+
+
+def test_counts_only_loans_it_returned(app, clock, monkeypatch):
+    """Test that loans another reaper returned first are not counted."""
+    seed_books(3)
+    for book_id in range(1, 4):
+        lend(book_id, clock.now - timedelta(days=1))
+
+    scalars = db.session.scalars
+
+    def racing_scalars(statement):
+        due = scalars(statement).all()
+        # Another reaper closes the first loan between our read and update.
+        db.session.execute(
+            db.update(BorrowedBook)
+            .where(BorrowedBook.id == due[0])
+            .values(returned_at=clock.now)
+        )
+        return SimpleNamespace(all=lambda: due)
+
+    monkeypatch.setattr(db.session, "scalars", racing_scalars, raising=False)
+    reaper = LoanReaper(app, clock=clock)
+    assert reaper.release_batch() == 2
+    assert db.session.query(LoanOutbox).count() == 2
+
+
+def test_workers_only_start_when_asked(monkeypatch):
+    """Test that building the app, as CLI commands do, starts no threads."""
+    monkeypatch.setenv("FLASK_LOAN_REAPER_ENABLED", "true")
+    app = create_app()
+    assert "loan_reaper" not in app.extensions
+
+    assert start_workers(app) == ["loan_reaper"]
+    assert app.extensions["loan_reaper"]._thread.is_alive()
+    reaper = app.extensions["loan_reaper"]
+    stop_workers(app)
+    assert not reaper._thread.is_alive()
+    assert "loan_reaper" not in app.extensions
+
+
+def test_released_books_reappear_in_catalogue(app, clock):
+    """Test that the catalogue cache sees books the reaper releases."""
+    seed_books(1)
+    client = app.test_client()
+    response = client.post("/books/1/borrow", json={"user_id": 1, "days": 1})
+    assert response.status_code == 200
+    assert client.get("/books").json == []
+
+    clock.now = datetime.now() + timedelta(days=2)
+    LoanReaper(app, clock=clock).release_due()
+
+    assert [book["id"] for book in client.get("/books").json] == [1]
+
+
+def test_due_loans_found_through_index(app, clock):
+    """Test that the due-date lookups use the active-loan index."""
+    reaper = LoanReaper(app, clock=clock)
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        reaper.next_due()
+        reaper.release_batch()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+    for statement, parameters in statements:
+        plan = " ".join(
+            row[3]
+            for row in db.session.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+        )
+        assert "ix_borrowed_book_active_return_date" in plan
@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+from app import create_app, db
+from app.models.book import Book
+from app.models.outbox import LoanOutbox, OutboxEpoch
+from app.models.user import User
+from app.workers.loan_reaper import LoanReaper
+from app.workers.outbox_dispatcher import OutboxDispatcher
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+class FakeBackend:
+    """Applies each sequence number once, like the admin API does."""
+
+    def __init__(self):
+        self.batches = []
+        self.applied = []
+        self.failures = 0
+
+    def __call__(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise requests.exceptions.ConnectionError("backend is down")
+        self.batches.append(events)
+        last_seq = self.applied[-1]["seq"] if self.applied else 0
+        fresh = [event for event in events if event["seq"] > last_seq]
+        self.applied.extend(fresh)
+        return {"applied": len(fresh), "skipped": len(events) - len(fresh)}
+
+
+@pytest.fixture
+def app():
+    """Flask app with a test database."""
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(datetime(2025, 1, 1, 12, 0))
+
+
+def queue_events(count, clock):
+    db.session.add_all(
+        [
+            LoanOutbox(
+                payload={"action": "return", "loan_id": i, "book_id": i},
+                created_at=clock.now,
+                next_attempt_at=clock.now,
+            )
+            for i in range(1, count + 1)
+        ]
+    )
+    db.session.commit()
+
+
+def test_drains_outbox_in_order_with_sequence_numbers(app, clock):
+    """Test that pending events are delivered oldest first, tagged with seq."""
+    queue_events(5, clock)
+    backend = FakeBackend()
+    dispatcher = OutboxDispatcher(app, send=backend, clock=clock, batch_size=2)
+
+    assert dispatcher.drain() == 5
+    assert [len(batch) for batch in backend.batches] == [2, 2, 1]
+    assert [event["seq"] for event in backend.applied] == [1, 2, 3, 4, 5]
+    assert LoanOutbox.query.filter(LoanOutbox.dispatched_at.is_(None)).count() == 0
+    assert dispatcher.drain() == 0
+
+
+def test_events_carry_the_outbox_epoch_as_source(app, clock):
+    """Test that every batch names the outbox it came from, and keeps it."""
+    queue_events(3, clock)
+    backend = FakeBackend()
+    dispatcher = OutboxDispatcher(app, send=backend, clock=clock, batch_size=2)
+
+    assert dispatcher.drain() == 3
+    epoch = db.session.get(OutboxEpoch, 1).epoch
+    assert len(epoch) == 32
+    assert {event["source"] for event in backend.applied} == {epoch}
+
+    # A rebuilt database numbers its outbox from 1 again, under a new epoch.
+    db.drop_all()
+    db.create_all()
+    queue_events(1, clock)
+    assert dispatcher.drain() == 1
+    assert backend.batches[-1][0]["seq"] == 1
+    assert backend.batches[-1][0]["source"] not in ("", epoch)
+
+
+def test_failed_delivery_is_retried_with_backoff(app, clock):
+    """Test that a failed batch stays queued and backs off exponentially."""
+    queue_events(3, clock)
+    backend = FakeBackend()
+    backend.failures = 2
+    dispatcher = OutboxDispatcher(
+        app, send=backend, clock=clock, batch_size=10, base_backoff=2
+    )
+
+    assert dispatcher.drain() == 0
+    assert dispatcher.seconds_until_next_attempt() == 2
+    assert "backend is down" in db.session.get(LoanOutbox, 1).last_error
+
+    clock.advance(seconds=2)
+    assert dispatcher.drain() == 0
+    assert dispatcher.seconds_until_next_attempt() == 4
+
+    clock.advance(seconds=4)
+    assert dispatcher.drain() == 3
+    assert [event["seq"] for event in backend.applied] == [1, 2, 3]
+
+
+def test_redelivered_batch_is_not_applied_twice(app, clock):
+    """Test that a batch resent after a lost acknowledgement is ignored."""
+    queue_events(2, clock)
+    backend = FakeBackend()
+    dispatcher = OutboxDispatcher(app, send=backend, clock=clock)
+    assert dispatcher.drain() == 2
+
+    # Pretend the acknowledgement never arrived, so the rows are still pending.
+    db.session.execute(db.update(LoanOutbox).values(dispatched_at=None))
+    db.session.commit()
+    queue_events(1, clock)
+
+    assert dispatcher.drain() == 3
+    assert [event["seq"] for event in backend.applied] == [1, 2, 3]
+
+
+def test_borrow_and_return_reach_backend_through_outbox(app, clock):
+    """Test the borrow/reap flow from frontend request to backend delivery."""
+    db.session.add(User(id=1, firstname="T", lastname="U", email="t@e.com"))
+    db.session.add(Book(id=1, title="T", author="A", publisher="P", category="C"))
+    db.session.commit()
+    backend = FakeBackend()
+    dispatcher = OutboxDispatcher(app, send=backend, clock=datetime.now)
+
+    client = app.test_client()
+    client.post("/books/1/borrow", json={"user_id": 1, "days": 1})
+    clock.now = datetime.now() + timedelta(days=2)
+    LoanReaper(app, clock=clock).release_due()
+
+    assert backend.batches == []
+    assert dispatcher.drain() == 2
+    assert [event["action"] for event in backend.batches[0]] == ["borrow", "return"]
+    assert {event["loan_id"] for event in backend.batches[0]} == {1}
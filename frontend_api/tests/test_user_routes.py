@@ -1,5 +1,12 @@
+import gc
+import os
+import time
+from datetime import datetime
+
 import pytest
+from sqlalchemy import text
 from app import create_app, db
+from app.models.outbox import LoanOutbox
 from app.models.user import User
 
 
@@ -41,6 +48,25 @@ def test_enroll_user(client):
     assert user.firstname == "John"
     assert user.lastname == "Doe"
 
+    # ...and queued for the backend's user directory
+    event = LoanOutbox.query.one().payload
+    assert event["action"] == "enroll"
+    assert event["user_id"] == user.id
+    assert event["email"] == "test@example.com"
+    assert event["enrolled_at"] == user.created_at.isoformat()
+
+
+def test_users_enrolled_apart_get_their_own_enrolled_at(client):
+    """Test that the enrollment time is taken per user, not at import."""
+    for name in ("early", "late"):
+        payload = {"email": f"{name}@example.com", "firstname": name, "lastname": "X"}
+        assert client.post("/users", json=payload).status_code == 201
+        time.sleep(0.01)
+
+    early, late = [entry.payload for entry in LoanOutbox.query.order_by(LoanOutbox.id)]
+    assert early["enrolled_at"] < late["enrolled_at"]
+    assert datetime.fromisoformat(late["enrolled_at"]) <= datetime.now()
+
 
 def test_enroll_user_missing_fields(client):
     """Test enrolling a user with missing fields."""
@@ -80,3 +106,64 @@ def test_list_users(client):
     assert len(response.json) == 2
     assert response.json[0]["email"] == "user1@example.com"
     assert response.json[1]["email"] == "user2@example.com"
+
+
+def test_list_users_stream(client):
+    """Test the streaming mode returns the same JSON array."""
+    db.session.add_all(
+        [
+            User(email=f"user{i}@example.com", firstname="User", lastname=str(i))
+            for i in range(3)
+        ]
+    )
+    db.session.commit()
+
+    response = client.get("/users?stream=true")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.json == client.get("/users").json
+
+
+def _resident_memory():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/statm"), reason="needs /proc to sample memory"
+)
+def test_list_users_stream_memory_is_flat(client):
+    """Test that streaming a million users keeps resident memory flat."""
+    rows = 1_000_000
+    db.session.execute(
+        text(
+            "INSERT INTO user (email, firstname, lastname, created_at) "
+            "WITH RECURSIVE seq(n) AS "
+            "(SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows) "
+            "SELECT 'user' || n || '@example.com', 'User', 'Number ' || n, "
+            "CURRENT_TIMESTAMP FROM seq"
+        ),
+        {"rows": rows},
+    )
+    db.session.commit()
+    gc.collect()
+
+    baseline = _resident_memory()
+    peak = baseline
+    received = 0
+    count = 0
+    response = client.get("/users?stream=true")
+    for chunk in response.response:
+        received += len(chunk)
+        count += chunk.count(b'"email"')
+        peak = max(peak, _resident_memory())
+    response.close()
+
+    assert count == rows
+    # The encoded array is ~80 MB and the equivalent list of dicts several
+    # hundred MB; streaming should only ever hold one batch of either.
+    assert received > 50 * 1024 * 1024
+    assert peak - baseline < 32 * 1024 * 1024
+    print(
+        f"\nstreamed {received / 1e6:.0f} MB, peak RSS growth {(peak - baseline) / 1e6:.1f} MB"
+    )